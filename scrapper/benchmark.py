@@ -0,0 +1,446 @@
+"""Benchmark de ingestión sin red.
+
+Levanta un servidor HTTP local que imita eutils, Scopus y crossref con respuestas generadas a
+partir de archivos grabados (por defecto `prueba.json`), apunta los motores de busqueda a ese
+servidor y corre `PubMed` y `ScopusSearch` completos contra una base de datos SQLite temporal o
+la base indicada en `--database-url`.
+
+Reporta artículos por segundo, llamadas HTTP por artículo, idas y vueltas a la base de datos por
+artículo y el pico de memoria (RSS). Con `--startup` mide en cambio el tiempo de importar
+`main.py` y el tiempo desde que arranca `python main.py job` hasta su primera petición HTTP.
+Cada ejecución se puede agregar a un archivo JSONL con `--output` y comparar contra la ultima
+ejecución con los mismos parametros usando `--baseline`.
+
+    Ejemplo de uso:
+    ```bash
+        python benchmark.py --articles 2000 --output bench.jsonl --baseline bench.jsonl
+        python benchmark.py --startup --output bench.jsonl --baseline bench.jsonl
+    ```
+"""
+
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from urllib.request import urlopen
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prueba.json")
+YEAR = "2021"
+# Uno de cada CROSSREF_MISS_EVERY DOI responde 404 en crossref
+CROSSREF_MISS_EVERY = 10
+
+
+def load_fixtures(path: str) -> list[dict]:
+    """Carga las entradas grabadas de Scopus, en JSON o como literal de Python.
+
+    Args:
+        path (str): Ruta del archivo
+
+    Returns:
+        list[dict]: Entradas de la busqueda de Scopus
+    """
+    with open(path, encoding="utf-8") as file:
+        content = file.read()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # prueba.json se grabó con `pprint`, no es JSON valido
+        return ast.literal_eval(content)
+
+
+class Corpus:
+    """Artículos sinteticos generados repitiendo las entradas grabadas con DOI y titulos unicos.
+
+    Args:
+        fixtures (list[dict]): Entradas grabadas de Scopus
+        articles (int): Artículos por motor de busqueda
+    """
+
+    def __init__(self, fixtures: list[dict], articles: int) -> None:
+        self.fixtures = fixtures
+        self.articles = articles
+
+    def entry(self, source: str, index: int) -> dict:
+        """Entrada de Scopus numero `index` del motor `source`"""
+        entry = dict(self.fixtures[index % len(self.fixtures)])
+        entry["dc:title"] = f"{entry['dc:title']} ({source} {index})"
+        entry["dc:identifier"] = f"SCOPUS_ID: {source}{index}"
+        if entry.get("prism:doi"):
+            entry["prism:doi"] = f"{entry['prism:doi']}.{source}{index}"
+        return entry
+
+    def scopus(self, start: int, count: int) -> list[dict]:
+        return [self.entry("s", index) for index in range(start, min(start + count, self.articles))]
+
+    def summary(self, uid: str) -> dict:
+        """Resumen de esummary del artículo de PubMed `uid`"""
+        entry = self.entry("p", int(uid))
+        ids = [{"idtype": "pubmed", "value": uid}]
+        if entry.get("prism:doi"):
+            ids.append({"idtype": "doi", "value": entry["prism:doi"]})
+        return {
+            "uid": uid,
+            "lang": ["eng"],
+            "source": entry.get("prism:publicationName", ""),
+            "pubdate": entry["prism:coverDate"],
+            "title": entry["dc:title"],
+            "authors": [{"name": entry["dc:creator"]}],
+            "articleids": ids,
+        }
+
+    def work(self, doi: str) -> dict:
+        """Registro de crossref de un DOI, None si debe responder 404"""
+        index = int("".join(filter(str.isdigit, doi.rsplit(".", 1)[-1])) or 0)
+        if index % CROSSREF_MISS_EVERY == CROSSREF_MISS_EVERY - 1:
+            return None
+        entry = self.entry(doi.rsplit(".", 1)[-1][0], index)
+        affiliations = [
+            {"name": affiliation.get("affilname", "")}
+            for affiliation in entry.get("affiliation", [])
+        ]
+        family, _, given = entry["dc:creator"].partition(" ")
+        return {
+            "DOI": doi,
+            "URL": f"https://doi.org/{doi}",
+            "ISSN": [entry.get("prism:issn", "")],
+            "publisher": entry.get("prism:publicationName", ""),
+            "reference-count": index % 50,
+            "author": [
+                {"family": family, "given": given, "sequence": "first", "affiliation": affiliations},
+                {
+                    "family": f"Coauthor{index % 97}",
+                    "given": "A.",
+                    "sequence": "additional",
+                    "ORCID": f"https://orcid.org/0000-0000-0000-{index % 97:04d}",
+                    "affiliation": affiliations,
+                },
+            ],
+            "funder": [{"name": f"Funder {index % 13}", "DOI": f"10.13039/{index % 13}"}],
+        }
+
+
+def serve(fixtures: list[dict], articles: int, ports) -> None:
+    """Corre el servidor local en un proceso aparte, para no medir su CPU ni su memoria.
+
+    Args:
+        fixtures (list[dict]): Entradas grabadas de Scopus
+        articles (int): Artículos por motor de busqueda
+        ports (Queue): Cola donde se entrega el puerto asignado
+    """
+    corpus = Corpus(fixtures, articles)
+    calls, first_request = Counter(), []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Sin esto cada respuesta espera el ACK retrasado del cliente (~40 ms)
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def reply(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def route(self, params: dict) -> None:
+            path = urlsplit(self.path).path
+            param = lambda name, default=None: params.get(name, [default])[0]
+            if path == "/stats":
+                return self.reply(
+                    200, {"calls": dict(calls), "first_request": (first_request or [None])[0]}
+                )
+            if not first_request:
+                first_request.append(time.time())
+            if path.endswith("/esearch.fcgi"):
+                calls["eutils"] += 1
+                start, count = int(param("retstart", 0)), int(param("retmax", 0))
+                ids = [str(index) for index in range(start, min(start + count, articles))]
+                return self.reply(200, {"esearchresult": {
+                    "count": str(articles), "webenv": "BENCH", "querykey": "1", "idlist": ids,
+                }})
+            if path.endswith("/esummary.fcgi"):
+                calls["eutils"] += 1
+                if param("id"):
+                    ids = param("id").split(",")
+                else:
+                    start, count = int(param("retstart", 0)), int(param("retmax", 500))
+                    ids = [str(index) for index in range(start, min(start + count, articles))]
+                result = {"uids": ids, **{uid: corpus.summary(uid) for uid in ids}}
+                return self.reply(200, {"result": result})
+            if path.endswith("/search/scopus"):
+                calls["scopus"] += 1
+                count = int(param("count", 25))
+                cursor = param("cursor")
+                start = int(param("start", 0)) if cursor is None else int(
+                    0 if cursor == "*" else cursor
+                )
+                results = {
+                    "opensearch:totalResults": str(articles),
+                    "entry": corpus.scopus(start, count) or [{"error": "Result set was empty"}],
+                }
+                if cursor is not None and start + count < articles:
+                    results["cursor"] = {"@next": str(start + count)}
+                return self.reply(200, {"search-results": results})
+            if path == "/works" and param("filter"):
+                calls["crossref"] += 1
+                dois = [doi.partition(":")[2] for doi in param("filter").split(",")]
+                items = [work for work in map(corpus.work, dois) if work is not None]
+                return self.reply(200, {"status": "ok", "message": {"items": items}})
+            if path.startswith("/works/"):
+                calls["crossref"] += 1
+                message = corpus.work(unquote(path[len("/works/"):]))
+                if message is None:
+                    return self.reply(404, {"status": "error"})
+                return self.reply(200, {"status": "ok", "message": message})
+            self.reply(404, {})
+
+        def do_GET(self) -> None:
+            self.route(parse_qs(urlsplit(self.path).query))
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", 0))
+            self.route(parse_qs(self.rfile.read(length).decode("utf-8")))
+
+    class Server(ThreadingHTTPServer):
+        def handle_error(self, request, client_address) -> None:
+            # Los Jobs de --startup se detienen con la conexion abierta
+            pass
+
+    server = Server(("127.0.0.1", 0), Handler)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_stub(args) -> tuple:
+    """Inicia el servidor local y devuelve su proceso y su url base"""
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve, args=(load_fixtures(args.fixtures), args.articles, ports), daemon=True
+    )
+    server.start()
+    return server, f"http://127.0.0.1:{ports.get(timeout=10)}"
+
+
+def stub_env(base: str) -> dict:
+    """Variables de entorno que apuntan los motores al servidor local"""
+    return {
+        "EUTILS_URL": f"{base}/entrez/eutils",
+        "SCOPUS_URL": f"{base}/content/search/scopus",
+        "CROSSREF_URL": base,
+        "CROSSREF_CACHE_PATH": "",
+        "RATE_LIMIT_DEFAULT": "1000000",
+        "METRICS_PORT": "0",
+    }
+
+
+def stub_stats(base: str) -> dict:
+    with urlopen(f"{base}/stats") as response:
+        return json.loads(response.read())
+
+
+def startup(args) -> dict:
+    """Mide el tiempo de importar `main.py` y el arranque en frio de un Job hasta su primera
+    petición HTTP, como mediana de `--repeat` procesos nuevos"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    imports = []
+    for _ in range(args.repeat):
+        output = subprocess.run(
+            [sys.executable, "-c",
+             "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"],
+            cwd=here, capture_output=True, text=True, check=True,
+        ).stdout
+        imports.append(float(output.strip().splitlines()[-1]))
+
+    from sqlalchemy import create_engine
+    from src.database.models import Base
+
+    cold_starts = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for attempt in range(args.repeat):
+            server, base = start_stub(args)
+            url = f"sqlite:///{os.path.join(workdir, f'startup{attempt}.sqlite')}"
+            Base.metadata.create_all(create_engine(url))
+            env = dict(os.environ, **stub_env(base), DATABASE_URL=url)
+            env.pop("CAPTURE_DIR", None)
+            started = time.time()
+            job = subprocess.Popen(
+                [sys.executable, "main.py", "job", "pubmed", YEAR],
+                cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            first_request = None
+            while first_request is None and time.time() - started < 60:
+                time.sleep(0.005)
+                first_request = stub_stats(base)["first_request"]
+            job.kill()
+            job.wait()
+            server.terminate()
+            if first_request is None:
+                sys.exit("[Benchmark] The job did not reach the API in 60 seconds")
+            cold_starts.append(first_request - started)
+
+    return {
+        "mode": "startup",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "import_seconds": round(statistics.median(imports), 4),
+        "cold_start_seconds": round(statistics.median(cold_starts), 4),
+    }
+
+
+def run(args) -> dict:
+    """Corre el benchmark y devuelve sus metricas"""
+    server, base = start_stub(args)
+    # La configuración se lee al importar los modulos, por lo que se define antes de importarlos
+    os.environ.update(stub_env(base))
+    os.environ.pop("CAPTURE_DIR", None)
+
+    from sqlalchemy import create_engine, event, func, select
+    from sqlalchemy.orm import sessionmaker
+    from src.database.models import Article, Base
+    from src.logs.logger import logger
+    from src.tools.search import PubMed, ScopusSearch
+
+    if not args.verbose:
+        # Los logs se siguen formateando, solo se descarta la salida
+        logger.handlers[0].setStream(open(os.devnull, "w"))
+
+    workdir = tempfile.TemporaryDirectory()
+    url = args.database_url or f"sqlite:///{os.path.join(workdir.name, 'bench.sqlite')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    round_trips = Counter()
+    event.listen(
+        engine, "before_cursor_execute", lambda *_: round_trips.update(("queries",))
+    )
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        if session.scalar(select(func.count()).select_from(Article)):
+            sys.exit("[Benchmark] The target database must be empty")
+
+    sources = {}
+    started = time.perf_counter()
+    for source_class in (PubMed, ScopusSearch):
+        source = source_class(session=Session())
+        before = round_trips["queries"]
+        start = time.perf_counter()
+        inserted = source(YEAR)
+        sources[source.name] = {
+            "inserted": inserted,
+            "seconds": round(time.perf_counter() - start, 3),
+            "db_round_trips": round_trips["queries"] - before,
+        }
+        del source
+    elapsed = time.perf_counter() - started
+
+    with Session() as session:
+        stored = session.scalar(select(func.count()).select_from(Article))
+    calls = stub_stats(base)["calls"]
+    server.terminate()
+    engine.dispose()
+    workdir.cleanup()
+
+    http_calls = sum(calls.values())
+    return {
+        "mode": "ingest",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "database": engine.dialect.name,
+        "articles": args.articles,
+        "stored": stored,
+        "seconds": round(elapsed, 3),
+        "articles_per_second": round(stored / elapsed, 1) if elapsed else None,
+        "http_calls": dict(calls),
+        "http_calls_per_article": round(http_calls / stored, 3) if stored else None,
+        "db_round_trips": round_trips["queries"],
+        "db_round_trips_per_article": round(round_trips["queries"] / stored, 3) if stored else None,
+        # ru_maxrss está en KB en Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "sources": sources,
+    }
+
+
+# Metricas que se comparan contra la linea base y si mayor es mejor
+COMPARED = {
+    "articles_per_second": True,
+    "http_calls_per_article": False,
+    "db_round_trips_per_article": False,
+    "peak_rss_mb": False,
+    "import_seconds": False,
+    "cold_start_seconds": False,
+}
+
+
+def compare(result: dict, path: str) -> None:
+    """Muestra la variación de cada metrica contra la ultima ejecución comparable del archivo"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as file:
+        previous = [json.loads(line) for line in file if line.strip()]
+    # Se comparan las ejecuciones del mismo modo y con los mismos parametros
+    parameters = ("mode", "articles", "database")
+    previous = [
+        run_ for run_ in previous
+        if all(run_.get(key, "ingest" if key == "mode" else None) == result.get(key)
+               for key in parameters)
+    ]
+    if not previous:
+        print(f"No comparable run in {path}")
+        return
+    baseline = previous[-1]
+    print(f"Compared with {baseline['revision']}:")
+    for metric, higher_is_better in COMPARED.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        better = change >= 0 if higher_is_better else change <= 0
+        print(f"  {metric}: {old} -> {new} ({change:+.1f}%{'' if better else ' REGRESSION'})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=2000, help="Artículos por motor")
+    parser.add_argument("--fixtures", default=FIXTURES, help="Entradas grabadas de Scopus")
+    parser.add_argument("--database-url", help="Base de datos vacia, SQLite temporal si se omite")
+    parser.add_argument("--output", help="Archivo JSONL donde se agrega el resultado")
+    parser.add_argument("--baseline", help="Archivo JSONL con ejecuciones anteriores")
+    parser.add_argument("--verbose", action="store_true", help="Muestra los logs de ingestión")
+    parser.add_argument("--startup", action="store_true", help="Mide el arranque en frio")
+    parser.add_argument("--repeat", type=int, default=5, help="Procesos medidos con --startup")
+    args = parser.parse_args()
+
+    result = startup(args) if args.startup else run(args)
+    if args.baseline:
+        compare(result, args.baseline)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as file:
+            file.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
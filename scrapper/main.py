@@ -1,52 +1,185 @@
-from src.tools.search import PubMed, ScopusSearch, AbstractSearch
-from src.database.models import Base
-from src.database.connection import LocalSession
-from threading import Thread
+# Solo se importan modulos livianos al cargar main.py, cada modo importa lo que necesita para
+# que los Jobs cortos no paguen el costo de sqlalchemy, requests y el driver de Postgres
+from src.tools.metrics import start_metrics_server
 from src.logs.logger import logger
-from sqlalchemy.orm import Session
+from threading import Thread
 import os
 import sys
 
 
 if len(sys.argv) > 1 and sys.argv[1] == "create":
     from src.database.connection import ENGINE
+    from src.database.models import Base
 
     Base.metadata.create_all(ENGINE)  # Creamos las tablas
 
+if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+    from src.database.connection import ENGINE
+    from src.database.migrations import upgrade
+
+    upgrade(ENGINE)  # Actualizamos las tablas existentes
+
 
-def t_runner(
-    min_year: str, max_year: str, session: Session, search_instance: AbstractSearch
-) -> None:
+def t_runner(min_year: str, max_year: str, session, search_instance) -> None:
     """Función que corre el hilo"""
     logger.info(f"Starting thread for {min_year} to {max_year}")
     for year in range(int(min_year), int(max_year)):
         logger.debug(f"Searching for {year}")
-        search_instance(str(year))
+        try:
+            search_instance(str(year))
+        except Exception as error:
+            # El año queda en su ultimo checkpoint y se retoma en la siguiente ejecución
+            logger.error(f"[{search_instance.name}] Year {year} failed: {error}")
 
 
-def main():
+def main_threads():
+    """Corre cada motor de busqueda en un hilo bloqueante (modo anterior)"""
+    from src.database.connection import LocalSession
+    from src.tools.registry import enabled_sources
+
     logger.debug("Starting main function...")
     min_year, max_year = os.getenv("MIN_YEAR", "2010"), os.getenv("MAX_YEAR", "2024")
-    session_pubmed = LocalSession()
-    session_scopus = LocalSession()
+    threads = []
+    for source_class in enabled_sources():
+        session = LocalSession()
+        thread = Thread(
+            target=t_runner,
+            args=(min_year, max_year, session, source_class(session=session)),
+        )
+        thread.start()
+        threads.append(thread)
 
-    pubmed = PubMed(session=session_pubmed)
-    scopus = ScopusSearch(session=session_scopus)
+    for thread in threads:
+        thread.join()
+    logger.debug("Ending main function...")
 
-    t_pubmed = Thread(
-        target=t_runner, args=(min_year, max_year, session_pubmed, pubmed)
-    )
-    t_scopus = Thread(
-        target=t_runner, args=(min_year, max_year, session_scopus, scopus)
-    )
 
-    t_pubmed.start()
-    t_scopus.start()
+def main_worker():
+    """Procesa la cola de trabajo compartida, se puede correr en varias replicas"""
+    from src.database.connection import LocalSession
+    from src.database.jobs import seed
+    from src.tools.registry import enabled_sources
+    from src.tools.worker import run_worker
+
+    logger.debug("Starting worker...")
+    min_year, max_year = os.getenv("MIN_YEAR", "2010"), os.getenv("MAX_YEAR", "2024")
+    session = LocalSession()
+    sources = [source_class(session=session) for source_class in enabled_sources()]
+    seed(session, [source.name for source in sources], min_year, max_year)
+    run_worker(session, sources)
+    logger.debug("Ending worker...")
+
+
+def main_years():
+    """Procesa los años de cada motor en paralelo con un pool de workers"""
+    from src.tools.registry import enabled_sources
+    from src.tools.scheduler import schedule
+
+    logger.debug("Starting scheduler...")
+    min_year, max_year = os.getenv("MIN_YEAR", "2010"), os.getenv("MAX_YEAR", "2024")
+    results = schedule(enabled_sources(), min_year, max_year)
+    logger.info(f"Articles inserted: {sum(result['inserted'] for result in results)}")
+    logger.debug("Ending scheduler...")
+
+
+def main_delta():
+    """Cosecha solo los artículos nuevos o modificados desde la marca de agua de cada motor. La
+    primera vez se toman los ultimos `DELTA_DAYS` días."""
+    from datetime import date, timedelta
+    from src.database.connection import LocalSession
+    from src.database.watermarks import load_watermark
+    from src.tools.registry import enabled_sources
+
+    until = date.today()
+    for source_class in enabled_sources():
+        session = LocalSession()
+        source = source_class(session=session)
+        since = load_watermark(session, source.name) or until - timedelta(
+            days=int(os.getenv("DELTA_DAYS", "7"))
+        )
+        try:
+            inserted = source.harvest_delta(since, until)
+        except NotImplementedError as error:
+            logger.error(f"[Delta] {error}")
+            continue
+        except Exception as error:
+            # La marca de agua no avanza, la siguiente ejecución repite el intervalo
+            logger.error(f"[Delta] {source.name} failed from {since}: {error}")
+            continue
+        logger.info(f"[Delta] {source.name}: {inserted} articles inserted up to {until}")
 
-    t_pubmed.join()
-    t_scopus.join()
+
+def main_job(source: str, year: str):
+    """Cosecha un solo año de un motor, pensado para un Job de Kubernetes por año y motor"""
+    from src.tools.registry import enabled_sources
+    from src.tools.scheduler import run_year
+
+    (source_class,) = enabled_sources(source)
+    result = run_year(source_class, year)
+    logger.info(f"Articles inserted: {result}")
+
+
+def main_replay(directory: str):
+    """Reconstruye la base de datos desde las respuestas capturadas"""
+    from src.database.connection import LocalSession
+    from src.tools.capture import replay
+
+    replay(directory, LocalSession())
+
+
+def main_export(directory: str, format_: str = "arrow"):
+    """Exporta las tablas a un snapshot columnar para el analisis fuera de Postgres"""
+    from src.analytics.export import export_snapshot
+    from src.database.connection import ENGINE
+
+    export_snapshot(ENGINE, directory, format_)
+
+
+def main_graph(path: str):
+    """Actualiza el indice del grafo de colaboración con los artículos nuevos"""
+    from src.analytics.graph import GraphIndex
+    from src.database.connection import LocalSession
+
+    graph = GraphIndex.load(path) if os.path.exists(path) else GraphIndex()
+    with LocalSession() as session:
+        graph.update(session)
+    graph.save(path)
+    logger.info(f"[Graph] Edges: {graph.stats()}")
+
+
+def main():
+    import asyncio
+    from src.database.connection import LocalSession
+    from src.tools.pipeline import AsyncPipeline
+    from src.tools.registry import enabled_sources
+
+    logger.debug("Starting main function...")
+    min_year, max_year = os.getenv("MIN_YEAR", "2010"), os.getenv("MAX_YEAR", "2024")
+    pipeline = AsyncPipeline(
+        [source_class(session=LocalSession()) for source_class in enabled_sources()]
+    )
+    totals = asyncio.run(pipeline.run(min_year, max_year))
+    logger.info(f"Articles processed: {totals}")
     logger.debug("Ending main function...")
 
 
 if __name__ == "__main__":
-    main()
+    start_metrics_server()
+    if len(sys.argv) > 1 and sys.argv[1] == "threads":
+        main_threads()
+    elif len(sys.argv) > 1 and sys.argv[1] == "worker":
+        main_worker()
+    elif len(sys.argv) > 1 and sys.argv[1] == "years":
+        main_years()
+    elif len(sys.argv) > 1 and sys.argv[1] == "delta":
+        main_delta()
+    elif len(sys.argv) > 3 and sys.argv[1] == "job":
+        main_job(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 2 and sys.argv[1] == "replay":
+        main_replay(sys.argv[2])
+    elif len(sys.argv) > 2 and sys.argv[1] == "export":
+        main_export(*sys.argv[2:4])
+    elif len(sys.argv) > 2 and sys.argv[1] == "graph":
+        main_graph(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,143 @@
+"""Exportación de la base de datos a snapshots columnares para el analisis fuera de Postgres.
+
+Cada snapshot es una carpeta con un archivo por tabla (artículos, autores, financiadores,
+afiliaciones y sus tablas de asociacion) y un `manifest.json` con la cantidad de filas. Las
+tablas se leen con cursores del lado del servidor de a `EXPORT_CHUNK_ROWS` filas dentro de una
+sola transacción, por lo que la memoria no depende del tamaño de la base de datos y todas las
+tablas corresponden al mismo momento.
+
+El formato `arrow` (IPC) se puede abrir con memory map sin copiar los datos (ver
+`src.analytics.snapshot`), `parquet` ocupa menos espacio. Requiere las dependencias de
+`requirements-analytics.txt`.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from sqlalchemy import Boolean, Date, DateTime, Integer, select
+from src.database.models import (
+    Affiliation,
+    Article,
+    Author,
+    Funder,
+    article_funder,
+    author_affiliation,
+    author_article,
+)
+from src.logs.logger import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError as error:
+    raise ImportError(
+        "The analytics export needs pyarrow, install requirements-analytics.txt"
+    ) from error
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+FORMATS = ("arrow", "parquet")
+# Tablas exportadas, por nombre de archivo
+TABLES = {
+    "articles": Article.__table__,
+    "authors": Author.__table__,
+    "funders": Funder.__table__,
+    "affiliations": Affiliation.__table__,
+    "article_authors": author_article,
+    "author_affiliations": author_affiliation,
+    "article_funders": article_funder,
+}
+
+
+def _arrow_type(column) -> pa.DataType:
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(table) -> pa.Schema:
+    """Esquema de Arrow equivalente a una tabla de sqlalchemy"""
+    return pa.schema(
+        [pa.field(column.name, _arrow_type(column), column.nullable) for column in table.columns]
+    )
+
+
+def _open_writer(path: str, schema: pa.Schema, format_: str):
+    if format_ == "parquet":
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    return ipc.new_file(path, schema)
+
+
+def _export_table(connection, table, path: str, format_: str, chunk_rows: int) -> int:
+    """Escribe una tabla de a bloques de `chunk_rows` filas y devuelve la cantidad de filas"""
+    schema = arrow_schema(table)
+    rows = 0
+    result = connection.execution_options(stream_results=True, yield_per=chunk_rows).execute(
+        select(table).order_by(*table.primary_key.columns)
+    )
+    with _open_writer(path, schema, format_) as writer:
+        for partition in result.partitions():
+            columns = list(zip(*partition))
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema,
+                )
+            )
+            rows += len(partition)
+    return rows
+
+
+def export_snapshot(
+    engine, directory: str, format_: str = "arrow", chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> str:
+    """Exporta las tablas a una carpeta nueva dentro de `directory`. El snapshot se escribe en
+    una carpeta temporal y se renombra al terminar, nunca queda un snapshot a medias. El nombre
+    lleva la fecha con microsegundos y un sufijo aleatorio, dos exportaciones simultaneas nunca
+    comparten carpeta.
+
+    Args:
+        engine (Engine): Motor de sqlalchemy de la base de datos
+        directory (str): Carpeta donde se guardan los snapshots
+        format_ (str): `arrow` o `parquet`
+        chunk_rows (int): Filas leidas y escritas por bloque
+
+    Returns:
+        str: Carpeta del snapshot
+    """
+    if format_ not in FORMATS:
+        raise ValueError(f"Unknown format {format_}, available formats: {', '.join(FORMATS)}")
+    created_at = datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+    target = os.path.join(directory, f"snapshot-{created_at}-{uuid.uuid4().hex[:8]}")
+    partial = target + ".partial"
+    os.makedirs(directory, exist_ok=True)
+    os.mkdir(partial)
+    options = {}
+    if engine.dialect.name == "postgresql":
+        # Todas las tablas se leen desde la misma foto de la base de datos
+        options = {"isolation_level": "REPEATABLE READ"}
+    manifest = {"created_at": created_at, "format": format_, "tables": {}}
+    try:
+        with engine.connect().execution_options(**options) as connection:
+            with connection.begin():
+                for name, table in TABLES.items():
+                    path = os.path.join(partial, f"{name}.{format_}")
+                    rows = _export_table(connection, table, path, format_, chunk_rows)
+                    manifest["tables"][name] = rows
+                    logger.info(f"[Export] {rows} rows of {table.name} exported")
+        with open(os.path.join(partial, "manifest.json"), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(partial, target)
+    except Exception:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    logger.info(f"[Export] Snapshot written to {target}")
+    return target
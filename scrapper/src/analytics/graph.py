@@ -0,0 +1,351 @@
+"""Indice en memoria del grafo de colaboración entre autores, artículos, afiliaciones y
+financiadores.
+
+Cada relación (artículo-autor, autor-afiliación y artículo-financiador) se guarda como una
+matriz de adyacencia CSR con arreglos de NumPy indexados por el id de la base de datos, por lo
+que recorrer un salto es tomar un rango de un arreglo en vez de hacer una consulta. El indice
+guarda los ids de los artículos que ya incluye y se actualiza con los artículos de la base de
+datos que no están entre ellos, asi un artículo con un id menor que se confirma tarde no se
+pierde. Se guarda en una carpeta de archivos `.npy` que se vuelven a abrir con memory map.
+
+Ejemplo de uso:
+```python
+    graph = GraphIndex.load("/data/graph") if os.path.exists("/data/graph") else GraphIndex()
+    graph.update(session)
+    graph.save("/data/graph")
+    graph.top_collaborators(author_id=42)
+```
+"""
+
+import json
+import os
+import shutil
+from sqlalchemy import select
+from src.database.models import Article, article_funder, author_affiliation, author_article
+from src.logs.logger import logger
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError(
+        "The graph index needs numpy, install requirements-analytics.txt"
+    ) from error
+
+# Vinculos leidos por consulta al actualizar el indice
+GRAPH_CHUNK_ROWS = int(os.getenv("GRAPH_CHUNK_ROWS", "100000"))
+# Artículos nuevos por consulta `IN` al leer sus vinculos
+GRAPH_IN_CHUNK = 10_000
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _csr(sources: np.ndarray, targets: np.ndarray) -> tuple:
+    """Matriz CSR de una lista de aristas ordenada por origen"""
+    indptr = np.zeros(int(sources.max(initial=-1)) + 2, dtype=np.int64)
+    np.cumsum(np.bincount(sources), out=indptr[1 : len(indptr)])
+    return indptr, targets.astype(np.int32)
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatena los vecinos de varios nodos sin recorrerlos en Python"""
+    nodes = nodes[nodes < len(indptr) - 1]
+    starts, lengths = indptr[nodes], indptr[nodes + 1] - indptr[nodes]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(lengths.sum())]
+
+
+def _ranked(nodes: np.ndarray, limit: int, exclude: int = None) -> list[tuple]:
+    """Nodos con mas apariciones y su cantidad, de mayor a menor"""
+    values, counts = np.unique(nodes, return_counts=True)
+    if exclude is not None:
+        keep = values != exclude
+        values, counts = values[keep], counts[keep]
+    order = np.lexsort((values, -counts))[:limit]
+    return list(zip(values[order].tolist(), counts[order].tolist()))
+
+
+class Relation:
+    """Aristas de una relación en formato CSR en ambos sentidos.
+
+    Args:
+        indptr (np.ndarray): Inicio de los vecinos de cada origen
+        indices (np.ndarray): Destinos, ordenados por origen y destino
+    """
+
+    def __init__(self, indptr: np.ndarray = None, indices: np.ndarray = None) -> None:
+        self.indptr = np.zeros(1, dtype=np.int64) if indptr is None else indptr
+        self.indices = _EMPTY if indices is None else indices
+        self.pending = []
+        self._backward = None
+
+    def __len__(self) -> int:
+        self._merge()
+        return len(self.indices)
+
+    def add(self, sources, targets) -> None:
+        """Agrega aristas, las repetidas se ignoran"""
+        if len(sources):
+            self.pending.append(
+                (np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64))
+            )
+
+    def _merge(self) -> None:
+        if not self.pending:
+            return
+        degrees = np.diff(self.indptr)
+        sources = np.concatenate(
+            [np.repeat(np.arange(len(degrees)), degrees)] + [s for s, _ in self.pending]
+        )
+        targets = np.concatenate([self.indices] + [t for _, t in self.pending])
+        keys = np.unique((sources << 32) | targets)
+        self.indptr, self.indices = _csr(keys >> 32, keys & 0xFFFFFFFF)
+        self.pending, self._backward = [], None
+
+    def forward(self) -> tuple:
+        """CSR de origen a destino"""
+        self._merge()
+        return self.indptr, self.indices
+
+    def backward(self) -> tuple:
+        """CSR de destino a origen"""
+        self._merge()
+        if self._backward is None:
+            sources = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            self._backward = _csr(self.indices[order].astype(np.int64), sources[order])
+        return self._backward
+
+    def neighbors(self, nodes, reverse: bool = False) -> np.ndarray:
+        """Vecinos de uno o varios nodos, con repeticiones si varios comparten un vecino"""
+        indptr, indices = self.backward() if reverse else self.forward()
+        return _gather(indptr, indices, np.atleast_1d(np.asarray(nodes, dtype=np.int64)))
+
+    def degrees(self, reverse: bool = False) -> np.ndarray:
+        """Cantidad de vecinos de cada nodo"""
+        indptr, _ = self.backward() if reverse else self.forward()
+        return np.diff(indptr)
+
+
+class GraphIndex:
+    """Grafo de autores, artículos, afiliaciones y financiadores.
+
+    Args:
+        article_ids (np.ndarray): Ids ordenados de los artículos incluidos en el indice
+        relations (dict): Relaciones ya construidas, por nombre
+    """
+
+    RELATIONS = ("article_authors", "author_affiliations", "article_funders")
+    # Relación y sentido en que se cuentan los vecinos de cada tipo de nodo
+    DEGREES = {
+        "author": ("article_authors", True),
+        "article": ("article_authors", False),
+        "affiliation": ("author_affiliations", True),
+        "funder": ("article_funders", True),
+    }
+
+    def __init__(self, article_ids: np.ndarray = None, relations: dict = None) -> None:
+        self.article_ids = np.zeros(0, dtype=np.int64) if article_ids is None else article_ids
+        self.relations = {name: Relation() for name in self.RELATIONS}
+        self.relations.update(relations or {})
+
+    def missing_articles(self, session, chunk_rows: int = GRAPH_CHUNK_ROWS) -> np.ndarray:
+        """Ids de los artículos de la base de datos que no están en el indice"""
+        missing = []
+        result = session.execute(
+            select(Article.id).order_by(Article.id),
+            execution_options={"stream_results": True, "yield_per": chunk_rows},
+        )
+        for partition in result.partitions():
+            ids = np.fromiter((row[0] for row in partition), dtype=np.int64, count=len(partition))
+            positions = np.searchsorted(self.article_ids, ids)
+            found = positions < len(self.article_ids)
+            found[found] = self.article_ids[positions[found]] == ids[found]
+            missing.append(ids[~found])
+        return np.concatenate(missing) if missing else np.zeros(0, dtype=np.int64)
+
+    def update(self, session, chunk_rows: int = GRAPH_CHUNK_ROWS) -> int:
+        """Agrega los vinculos de los artículos de la base de datos que no están en el indice.
+
+        Args:
+            session (Session): Sesion de sqlalchemy
+            chunk_rows (int): Vinculos leidos por consulta
+
+        Returns:
+            int: Cantidad de artículos nuevos
+        """
+        missing = self.missing_articles(session, chunk_rows)
+        for start in range(0, len(missing), GRAPH_IN_CHUNK):
+            ids = missing[start : start + GRAPH_IN_CHUNK].tolist()
+            queries = {
+                "article_authors": select(
+                    author_article.c.article_id, author_article.c.author_id
+                ).where(author_article.c.article_id.in_(ids)),
+                # Las afiliaciones de los autores de los artículos nuevos
+                "author_affiliations": select(
+                    author_affiliation.c.author_id, author_affiliation.c.affiliation_id
+                )
+                .distinct()
+                .join(
+                    author_article, author_article.c.author_id == author_affiliation.c.author_id
+                )
+                .where(author_article.c.article_id.in_(ids)),
+                "article_funders": select(
+                    article_funder.c.article_id, article_funder.c.funder_id
+                ).where(article_funder.c.article_id.in_(ids)),
+            }
+            for name, statement in queries.items():
+                result = session.execute(
+                    statement,
+                    execution_options={"stream_results": True, "yield_per": chunk_rows},
+                )
+                for partition in result.partitions():
+                    sources, targets = zip(*partition)
+                    self.relations[name].add(sources, targets)
+        session.commit()
+        if len(missing):
+            self.article_ids = np.union1d(self.article_ids, missing)
+        logger.info(f"[Graph] {len(missing)} articles added, {len(self.article_ids)} indexed")
+        return len(missing)
+
+    def save(self, path: str) -> None:
+        """Guarda el indice en la carpeta `path`, reemplazando la anterior al terminar.
+
+        Args:
+            path (str): Carpeta del indice
+        """
+        partial, previous = path + ".partial", path + ".previous"
+        shutil.rmtree(partial, ignore_errors=True)
+        os.makedirs(partial)
+        for name, relation in self.relations.items():
+            indptr, indices = relation.forward()
+            np.save(os.path.join(partial, f"{name}.indptr.npy"), indptr)
+            np.save(os.path.join(partial, f"{name}.indices.npy"), indices)
+        np.save(os.path.join(partial, "articles.npy"), self.article_ids)
+        with open(os.path.join(partial, "graph.json"), "w", encoding="utf-8") as file:
+            json.dump({"articles": len(self.article_ids)}, file)
+        if os.path.exists(path):
+            shutil.rmtree(previous, ignore_errors=True)
+            os.replace(path, previous)
+        os.replace(partial, path)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str) -> "GraphIndex":
+        """Abre un indice guardado con `save`, los arreglos se leen con memory map.
+
+        Args:
+            path (str): Carpeta del indice
+
+        Returns:
+            GraphIndex: Indice cargado
+        """
+        relations = {
+            name: Relation(
+                np.load(os.path.join(path, f"{name}.indptr.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, f"{name}.indices.npy"), mmap_mode="r"),
+            )
+            for name in cls.RELATIONS
+        }
+        articles = os.path.join(path, "articles.npy")
+        if os.path.exists(articles):
+            return cls(np.load(articles, mmap_mode="r"), relations)
+        # Indices guardados antes de registrar los ids, se toman los artículos con vinculos
+        article_ids = np.union1d(
+            np.flatnonzero(relations["article_authors"].degrees()),
+            np.flatnonzero(relations["article_funders"].degrees()),
+        )
+        return cls(article_ids.astype(np.int64), relations)
+
+    def stats(self) -> dict:
+        """Cantidad de vinculos de cada relación"""
+        return {name: len(relation) for name, relation in self.relations.items()}
+
+    def top_collaborators(self, author_id: int, limit: int = 10) -> list[tuple]:
+        """Coautores con mas artículos en comun.
+
+        Args:
+            author_id (int): Id del autor
+            limit (int): Cantidad maxima de coautores
+
+        Returns:
+            list[tuple]: Id del coautor y artículos en comun, de mayor a menor
+        """
+        authorship = self.relations["article_authors"]
+        articles = authorship.neighbors(author_id, reverse=True)
+        return _ranked(authorship.neighbors(articles), limit, exclude=author_id)
+
+    def connected_components(self) -> np.ndarray:
+        """Componentes conexas del grafo de coautoria, por propagación del menor id.
+
+        Returns:
+            np.ndarray: Menor id de autor de la componente de cada autor, -1 para los ids sin
+            artículos
+        """
+        authorship = self.relations["article_authors"]
+        article_ptr, article_authors = authorship.forward()
+        author_ptr, author_articles = authorship.backward()
+        has_authors = np.diff(article_ptr) > 0
+        has_articles = np.diff(author_ptr) > 0
+        labels = np.arange(len(author_ptr) - 1, dtype=np.int64)
+        article_labels = np.zeros(len(article_ptr) - 1, dtype=np.int64)
+        while True:
+            article_labels[has_authors] = np.minimum.reduceat(
+                labels[article_authors], article_ptr[:-1][has_authors]
+            )
+            updated = labels.copy()
+            updated[has_articles] = np.minimum(
+                labels[has_articles],
+                np.minimum.reduceat(article_labels[author_articles], author_ptr[:-1][has_articles]),
+            )
+            # Salto de punteros, cada etiqueta apunta a un autor de la misma componente
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+        labels[~has_articles] = -1
+        return labels
+
+    def component_sizes(self) -> np.ndarray:
+        """Cantidad de autores de cada componente conexa, de mayor a menor"""
+        labels = self.connected_components()
+        sizes = np.bincount(labels[labels >= 0])
+        return np.sort(sizes[sizes > 0])[::-1]
+
+    def degree_distribution(self, node: str) -> dict:
+        """Cantidad de nodos de un tipo por cantidad de vecinos, por ejemplo cuantos autores
+        tienen 1, 2 o 3 artículos.
+
+        Args:
+            node (str): `author` (artículos), `article` (autores), `affiliation` (autores) o
+            `funder` (artículos)
+
+        Returns:
+            dict: Nodos de cada grado, sin los de grado 0
+        """
+        if node not in self.DEGREES:
+            raise ValueError(
+                f"Unknown node type {node}, available types: {', '.join(self.DEGREES)}"
+            )
+        name, reverse = self.DEGREES[node]
+        counts = np.bincount(self.relations[name].degrees(reverse))
+        degrees = np.flatnonzero(counts)
+        degrees = degrees[degrees > 0]
+        return dict(zip(degrees.tolist(), counts[degrees].tolist()))
+
+    def funder_network(self, funder_id: int, limit: int = 10) -> dict:
+        """Artículos, autores y cofinanciadores de un financiador.
+
+        Args:
+            funder_id (int): Id del financiador
+            limit (int): Cantidad maxima de autores y cofinanciadores
+
+        Returns:
+            dict: Cantidad de artículos, y autores y cofinanciadores con su cantidad de
+            artículos financiados, de mayor a menor
+        """
+        funding = self.relations["article_funders"]
+        articles = funding.neighbors(funder_id, reverse=True)
+        return {
+            "articles": len(articles),
+            "authors": _ranked(self.relations["article_authors"].neighbors(articles), limit),
+            "cofunders": _ranked(funding.neighbors(articles), limit, exclude=funder_id),
+        }
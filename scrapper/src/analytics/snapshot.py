@@ -0,0 +1,179 @@
+"""Analisis de los snapshots exportados con `src.analytics.export`.
+
+Las tablas se abren con memory map (los archivos `arrow` sin copiar los datos) y todos los
+calculos son vectorizados con NumPy y pyarrow, sin recorrer las filas en Python.
+
+Ejemplo de uso:
+```python
+    snapshot = Snapshot(latest_snapshot("/data/snapshots"))
+    snapshot.articles_per_year()
+    snapshot.citation_stats(by_year=True)
+    snapshot.articles_per_country()
+```
+"""
+
+import glob
+import json
+import os
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError as error:
+    raise ImportError(
+        "The snapshot analytics need numpy and pyarrow, install requirements-analytics.txt"
+    ) from error
+
+# Mismo formato de año que `src.database.normalize.publication_year`
+_YEAR = r"\b(?P<year>1[5-9]\d{2}|20\d{2})\b"
+# Ultimo segmento de la afiliación, por ejemplo "Spain" en "Dept. of X, Univ. Y, Madrid, Spain"
+_COUNTRY = r",\s*(?P<country>[^,]+?)\s*$"
+
+
+def latest_snapshot(directory: str) -> str:
+    """Carpeta del snapshot completo mas reciente dentro de `directory`"""
+    snapshots = sorted(
+        path
+        for path in glob.glob(os.path.join(directory, "snapshot-*"))
+        if os.path.exists(os.path.join(path, "manifest.json"))
+    )
+    if not snapshots:
+        raise FileNotFoundError(f"No snapshots found in {directory}")
+    return snapshots[-1]
+
+
+def _grouped_stats(keys: np.ndarray, values: np.ndarray) -> dict:
+    """Cantidad, suma, promedio, mediana, percentil 90 y maximo de `values` por cada `key`"""
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    groups, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    if not len(groups):
+        return {}
+
+    def percentile(q: float) -> np.ndarray:
+        position = q * (counts - 1)
+        low, high = np.floor(position).astype(int), np.ceil(position).astype(int)
+        below, above = values[starts + low], values[starts + high]
+        return below + (position - low) * (above - below)
+
+    sums = np.add.reduceat(values, starts)
+    stats = {
+        "articles": counts,
+        "total": sums,
+        "mean": sums / counts,
+        "median": percentile(0.5),
+        "p90": percentile(0.9),
+        "max": np.maximum.reduceat(values, starts),
+    }
+    return {
+        group.item(): {name: column[index].item() for name, column in stats.items()}
+        for index, group in enumerate(groups)
+    }
+
+
+class Snapshot:
+    """Tablas de un snapshot abiertas con memory map.
+
+    Args:
+        path (str): Carpeta del snapshot
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        self.tables = {}
+
+    def table(self, name: str) -> pa.Table:
+        """Tabla del snapshot, se abre en el primer uso"""
+        if name not in self.tables:
+            path = os.path.join(self.path, f"{name}.{self.manifest['format']}")
+            if self.manifest["format"] == "parquet":
+                self.tables[name] = pq.read_table(path, memory_map=True)
+            else:
+                self.tables[name] = ipc.open_file(pa.memory_map(path)).read_all()
+        return self.tables[name]
+
+    def counts(self) -> dict:
+        """Cantidad de filas de cada tabla"""
+        return dict(self.manifest["tables"])
+
+    def article_years(self) -> pa.Table:
+        """Identificador y año de publicación de cada artículo, 0 si la fecha no tiene año"""
+        articles = self.table("articles")
+        years = pc.struct_field(pc.extract_regex(articles["publication_date"], _YEAR), [0])
+        return pa.table(
+            {"id": articles["id"], "year": pc.fill_null(pc.cast(years, pa.int64()), 0)}
+        )
+
+    def articles_per_year(self) -> dict:
+        """Cantidad de artículos por año de publicación"""
+        years = self.article_years()["year"].to_numpy()
+        groups, counts = np.unique(years, return_counts=True)
+        return dict(zip(groups.tolist(), counts.tolist()))
+
+    def citation_stats(self, by_year: bool = False) -> dict:
+        """Estadisticas de `reference_count` de los artículos que lo tienen.
+
+        Args:
+            by_year (bool): Si es True se calculan por año de publicación
+
+        Returns:
+            dict: Cantidad, suma, promedio, mediana, percentil 90 y maximo. Por año si `by_year`
+        """
+        references = self.table("articles")["reference_count"]
+        valid = pc.is_valid(references)
+        values = pc.filter(references, valid).to_numpy()
+        if by_year:
+            keys = pc.filter(self.article_years()["year"], valid).to_numpy()
+            return _grouped_stats(keys, values)
+        return _grouped_stats(np.zeros(len(values), dtype=np.int64), values).get(0, {})
+
+    def article_countries(self) -> pa.Table:
+        """Pares distintos de artículo y país de las afiliaciones de sus autores. El país es el
+        ultimo segmento del nombre de la afiliación, las afiliaciones sin comas no tienen país"""
+        affiliations = self.table("affiliations")
+        countries = pa.table(
+            {
+                "affiliation_id": affiliations["id"],
+                "country": pc.struct_field(pc.extract_regex(affiliations["name"], _COUNTRY), [0]),
+            }
+        ).filter(pc.is_valid(pc.field("country")))
+        authors = self.table("author_affiliations").join(
+            countries, keys="affiliation_id", join_type="inner"
+        )
+        return (
+            self.table("article_authors")
+            .join(authors, keys="author_id", join_type="inner")
+            .group_by(["article_id", "country"])
+            .aggregate([])
+        )
+
+    def articles_per_country(self, by_year: bool = False) -> dict:
+        """Cantidad de artículos con al menos un autor de cada país.
+
+        Args:
+            by_year (bool): Si es True las llaves son `(año, país)`
+
+        Returns:
+            dict: Artículos de cada país, de mayor a menor
+        """
+        pairs = self.article_countries()
+        keys = ["country"]
+        if by_year:
+            pairs = pairs.join(
+                self.article_years(), keys="article_id", right_keys="id", join_type="inner"
+            )
+            keys = ["year", "country"]
+        counts = pairs.group_by(keys).aggregate([("article_id", "count")])
+        counts = counts.sort_by(
+            [("article_id_count", "descending")] + [(key, "ascending") for key in keys]
+        )
+        columns = [counts[key].to_pylist() for key in keys]
+        return {
+            key if by_year else key[0]: count
+            for key, count in zip(zip(*columns), counts["article_id_count"].to_pylist())
+        }
@@ -0,0 +1,51 @@
+"""Checkpoints del avance de cada motor de busqueda por año.
+
+Un checkpoint se escribe en la misma transacción que el lote de artículos que describe, de esta
+forma al reiniciar un pod la busqueda continua exactamente desde la ultima página confirmada.
+"""
+
+from datetime import datetime
+from sqlalchemy import select
+from src.database.models import CrawlCheckpoint
+from src.database.tools import insert_statement
+
+# Campos del checkpoint que entregan los motores de busqueda
+FIELDS = ("offset", "total", "last_id", "webenv", "query_key", "cursor", "completed")
+
+
+def load_checkpoints(session, source: str) -> dict:
+    """Obtiene los checkpoints de un motor de busqueda.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        source (str): Nombre del motor de busqueda
+
+    Returns:
+        dict: Checkpoint de cada año, como diccionario con los campos de `FIELDS`
+    """
+    rows = session.scalars(select(CrawlCheckpoint).where(CrawlCheckpoint.source == source))
+    checkpoints = {
+        str(row.year): {field: getattr(row, field) for field in FIELDS} for row in rows
+    }
+    session.commit()
+    return checkpoints
+
+
+def save_checkpoint(session, source: str, year: str, checkpoint: dict) -> None:
+    """Guarda el checkpoint de un año sin confirmar la transacción, el llamador la confirma junto
+    con el lote de artículos.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        source (str): Nombre del motor de busqueda
+        year (str): Año de publicación
+        checkpoint (dict): Campos de `FIELDS` a guardar
+    """
+    values = {field: checkpoint[field] for field in FIELDS if field in checkpoint}
+    values["updated_at"] = datetime.utcnow()
+    statement = insert_statement(session, CrawlCheckpoint.__table__).values(
+        source=source, year=int(year), **values
+    )
+    session.execute(
+        statement.on_conflict_do_update(index_elements=["source", "year"], set_=values)
+    )
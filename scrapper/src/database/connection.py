@@ -1,10 +1,62 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 import os
+import threading
 
-# Postgres db connection
-ENGINE = create_engine(
-    f'postgresql://{os.getenv("DB_USER", "postgres")}:{os.getenv("DB_PASSWORD", "development123")}@{os.getenv("DB_HOST", "localhost")}:{os.getenv("DB_PORT", "5432")}/{os.getenv("DB_NAME", "raw_articles")}'
-)
+_engine = None
+_sessionmaker = None
+_lock = threading.Lock()
 
-LocalSession = sessionmaker(bind=ENGINE)
+
+def database_url() -> str:
+    """Url de la base de datos, `DATABASE_URL` o la de Postgres armada con las variables `DB_*`"""
+    return os.getenv(
+        "DATABASE_URL",
+        f'postgresql://{os.getenv("DB_USER", "postgres")}:{os.getenv("DB_PASSWORD", "development123")}@{os.getenv("DB_HOST", "localhost")}:{os.getenv("DB_PORT", "5432")}/{os.getenv("DB_NAME", "raw_articles")}',
+    )
+
+
+def pool_size() -> int:
+    """Conexiones del pool, `DB_POOL_SIZE` o por defecto una por cada hilo de año de cada motor
+    habilitado (ver `src.tools.scheduler`) mas dos para las sesiones del pipeline y de los jobs"""
+    if os.getenv("DB_POOL_SIZE"):
+        return int(os.getenv("DB_POOL_SIZE"))
+    from src.tools.registry import enabled_sources
+
+    return int(os.getenv("YEAR_WORKERS", "4")) * len(enabled_sources()) + 2
+
+
+def get_engine():
+    """Devuelve el motor de la base de datos, creandolo (e importando el driver) en el primer uso"""
+    global _engine, _sessionmaker
+    with _lock:
+        if _engine is None:
+            url = database_url()
+            options = {}
+            if url.startswith("postgresql"):
+                options = dict(
+                    pool_size=pool_size(),
+                    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "2")),
+                    pool_pre_ping=True,
+                    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+                    pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+                )
+            _engine = create_engine(url, **options)
+            _sessionmaker = sessionmaker(bind=_engine)
+        return _engine
+
+
+def dispose_engine() -> None:
+    """Descarta las conexiones heredadas del proceso padre, si el motor ya se creó"""
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+def __getattr__(name: str):
+    # ENGINE y LocalSession se crean al importarlos por primera vez, no al importar el modulo
+    if name == "ENGINE":
+        return get_engine()
+    if name == "LocalSession":
+        get_engine()
+        return _sessionmaker
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
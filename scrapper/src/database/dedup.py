@@ -0,0 +1,96 @@
+"""Deduplicación y combinación de artículos de distintas fuentes antes de escribirlos.
+
+Dos registros son el mismo artículo si tienen el mismo DOI normalizado o, cuando falta el DOI en
+alguno, el mismo hash de titulo normalizado y año (ver `src.database.normalize`). Los registros
+duplicados se combinan en un registro canonico que toma cada campo del primero que lo tenga y
+une sus autores y financiadores.
+"""
+
+from src.database.normalize import (
+    author_key,
+    funder_key,
+    normalize_doi,
+    publication_year,
+    title_hash,
+)
+
+# Campos del artículo que se pueden completar con los de otra fuente
+ARTICLE_FIELDS = ("doi", "publication_date", "publisher", "reference_count", "url", "issn")
+
+
+def article_keys(record: dict) -> tuple[str, str]:
+    """Llaves naturales de un artículo parseado.
+
+    Args:
+        record (dict): Artículo devuelto por un motor de busqueda
+
+    Returns:
+        tuple[str, str]: DOI normalizado y hash de titulo y año, cualquiera puede ser None
+    """
+    return (
+        normalize_doi(record.get("doi")),
+        title_hash(record.get("title"), publication_year(record.get("publication_date"))),
+    )
+
+
+def _union(first: list, second: list, key: callable) -> list:
+    merged = {key(item): item for item in second or []}
+    merged.update({key(item): item for item in first or []})
+    order = [key(item) for item in first or []] + [key(item) for item in second or []]
+    return [merged[k] for k in dict.fromkeys(order)]
+
+
+def merge_records(primary: dict, other: dict) -> dict:
+    """Combina dos registros del mismo artículo, `primary` tiene prioridad en cada campo.
+
+    Args:
+        primary (dict): Registro preferido
+        other (dict): Registro que completa los campos vacios de `primary`
+
+    Returns:
+        dict: Registro canonico
+    """
+    merged = dict(primary)
+    for field, value in other.items():
+        if merged.get(field) in (None, "", []) and value not in (None, "", []):
+            merged[field] = value
+    if primary.get("authors") and other.get("authors"):
+        merged["authors"] = _union(primary["authors"], other["authors"], author_key)
+    if primary.get("funders") and other.get("funders"):
+        merged["funders"] = _union(primary["funders"], other["funders"], funder_key)
+    return merged
+
+
+def deduplicate(batch: list[dict]) -> list[dict]:
+    """Combina los registros de un lote que corresponden al mismo artículo.
+
+    Args:
+        batch (list[dict]): Artículos devueltos por los motores de busqueda
+
+    Returns:
+        list[dict]: Un registro canonico por artículo con sus llaves `doi_key` y `title_hash`,
+        en el orden en que aparecieron
+    """
+    records, by_doi, by_title = [], {}, {}
+    for data in batch:
+        doi_key, hash_ = article_keys(data)
+        if hash_ is None:
+            continue
+        index = by_doi.get(doi_key) if doi_key else None
+        if index is None:
+            index = by_title.get(hash_)
+        if index is None:
+            records.append(dict(data, doi_key=doi_key, title_hash=hash_))
+            index = len(records) - 1
+        else:
+            current = records[index]
+            # El registro con crossref (autores) es el preferido
+            if data.get("authors") and not current.get("authors"):
+                records[index] = merge_records(dict(data, title_hash=hash_), current)
+            else:
+                records[index] = merge_records(current, data)
+            records[index]["doi_key"] = current["doi_key"] or doi_key
+        if doi_key:
+            by_doi.setdefault(doi_key, index)
+        by_title.setdefault(hash_, index)
+    return records
@@ -0,0 +1,94 @@
+"""Cache en memoria de las entidades ya resueltas (autores, afiliaciones y financiadores).
+
+Guarda el identificador de cada llave natural (ver `src.database.normalize`) en un LRU por tabla
+de tamaño acotado, asi los autores prolificos y las instituciones grandes se resuelven sin
+consultar la base de datos. Los identificadores obtenidos dentro de una transacción solo entran
+al cache cuando la transacción se confirma, si se deshace se descartan.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.tools.metrics import IDENTITY_CACHE_LOOKUPS
+
+# Entradas por tabla
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "50000"))
+_PENDING = "identity_pending"
+
+
+class IdentityCache:
+    """LRU de llave natural a identificador, seguro entre hilos.
+
+    Args:
+        name (str): Nombre de la tabla, se usa en las metricas
+        max_entries (int): Cantidad maxima de llaves guardadas
+    """
+
+    def __init__(self, name: str, max_entries: int = IDENTITY_CACHE_SIZE) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_many(self, keys) -> dict:
+        """Identificadores de las llaves que están en el cache"""
+        found = {}
+        with self.lock:
+            for key in keys:
+                id_ = self.entries.get(key)
+                if id_ is not None:
+                    self.entries.move_to_end(key)
+                    found[key] = id_
+        IDENTITY_CACHE_LOOKUPS.inc(len(found), table=self.name, result="hit")
+        IDENTITY_CACHE_LOOKUPS.inc(len(keys) - len(found), table=self.name, result="miss")
+        return found
+
+    def put_many(self, ids: dict) -> None:
+        """Guarda identificadores, eliminando las llaves menos usadas si se supera el maximo"""
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            for key, id_ in ids.items():
+                self.entries[key] = id_
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def identity_cache(model) -> IdentityCache:
+    """Devuelve el cache de la tabla del modelo, creandolo si no existe"""
+    name = model.__tablename__
+    with _CACHES_LOCK:
+        if name not in _CACHES:
+            _CACHES[name] = IdentityCache(name)
+        return _CACHES[name]
+
+
+def stage(session, model, ids: dict) -> None:
+    """Agrega identificadores al cache cuando se confirme la transacción actual de la sesion"""
+    if ids:
+        session.info.setdefault(_PENDING, []).append((identity_cache(model), ids))
+
+
+@event.listens_for(Session, "after_commit")
+def _promote(session) -> None:
+    for cache, ids in session.info.pop(_PENDING, []):
+        cache.put_many(ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard(session, previous_transaction) -> None:
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,113 @@
+"""Cola de trabajo en Postgres para repartir la cosecha entre varias replicas.
+
+Cada unidad de trabajo es un `(source, year, page)` de la tabla `harvest_jobs`. Las replicas
+reclaman unidades con `SELECT ... FOR UPDATE SKIP LOCKED`, por lo que dos pods nunca toman la
+misma unidad, y la marcan como terminada en la misma transacción que inserta sus artículos.
+Una unidad reclamada por un pod que murió vuelve a estar disponible pasado `JOB_LEASE_SECONDS`.
+"""
+
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select
+from src.database.models import HarvestJob
+from src.database.tools import insert_statement
+from src.logs.logger import logger
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "1800"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+def enqueue(session, source: str, year: int, pages: range) -> None:
+    """Agrega unidades de trabajo, ignorando las que ya existen.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        source (str): Nombre del motor de busqueda
+        year (int): Año de publicación
+        pages (range): Páginas a agregar
+    """
+    rows = [{"source": source, "year": int(year), "page": page} for page in pages]
+    if rows:
+        statement = insert_statement(session, HarvestJob.__table__)
+        session.execute(statement.values(rows).on_conflict_do_nothing())
+
+
+def seed(session, sources: list[str], min_year: str, max_year: str) -> None:
+    """Agrega la primera página de cada motor y año, las demas se agregan al procesarla.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        sources (list[str]): Nombres de los motores de busqueda
+        min_year (str): Primer año
+        max_year (str): Año final (no incluido)
+    """
+    for source in sources:
+        for year in range(int(min_year), int(max_year)):
+            enqueue(session, source, year, range(1))
+    session.commit()
+
+
+def claim(session, worker: str, sources: list[str]) -> HarvestJob:
+    """Reclama la siguiente unidad disponible para este worker.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        worker (str): Identificador del worker (nombre del pod)
+        sources (list[str]): Motores de busqueda que este worker sabe procesar
+
+    Returns:
+        HarvestJob: Unidad reclamada, None si no quedan unidades disponibles
+    """
+    now = datetime.utcnow()
+    job = session.scalars(
+        select(HarvestJob)
+        .where(
+            HarvestJob.source.in_(sources),
+            or_(
+                HarvestJob.status == "pending",
+                and_(
+                    HarvestJob.status == "running",
+                    HarvestJob.claimed_at < now - timedelta(seconds=JOB_LEASE_SECONDS),
+                ),
+            ),
+        )
+        .order_by(HarvestJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if job is None:
+        session.rollback()
+        return None
+    job.status, job.worker, job.claimed_at = "running", worker, now
+    job.attempts += 1
+    session.commit()
+    logger.debug(f"[JOBS] {worker} claimed {job}")
+    return job
+
+
+def in_progress(session, sources: list[str]) -> int:
+    """Cantidad de unidades de los motores que están pendientes o en curso"""
+    count = session.scalar(
+        select(func.count())
+        .select_from(HarvestJob)
+        .where(
+            HarvestJob.source.in_(sources),
+            HarvestJob.status.in_(("pending", "running")),
+        )
+    )
+    session.rollback()
+    return count
+
+
+def complete(session, job: HarvestJob) -> None:
+    """Marca la unidad como terminada, sin confirmar la transacción para que quede junto a los
+    artículos que se insertaron."""
+    job.status = "done"
+
+
+def fail(session, job: HarvestJob) -> None:
+    """Devuelve la unidad a la cola o la marca como fallida si agotó los intentos"""
+    session.rollback()
+    job.status = "failed" if job.attempts >= JOB_MAX_ATTEMPTS else "pending"
+    session.commit()
+    logger.error(f"[JOBS] {job} failed, attempt {job.attempts}, status {job.status}")
@@ -0,0 +1,168 @@
+"""Conjunto en memoria de los artículos que ya están en la base de datos.
+
+Permite descartar un artículo ya guardado antes de consultar crossref y la base de datos. Cada
+artículo se identifica por su DOI normalizado y por el hash de su titulo y año, ambos guardados como
+hashes de 64 bits en un arreglo ordenado (8 bytes por llave) para que el conjunto completo quepa
+en la memoria del pod.
+"""
+
+import hashlib
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from sqlalchemy import select
+from src.database.dedup import article_keys
+from src.database.models import Article
+from src.logs.logger import logger
+
+
+def _unique(keys) -> array:
+    """Arreglo sin repetidos a partir de llaves ordenadas"""
+    unique, last = array("Q"), None
+    for key in keys:
+        if key != last:
+            unique.append(key)
+            last = key
+    return unique
+
+
+def _digest(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def record_keys(record: dict) -> list[int]:
+    """Llaves de un artículo parseado: su DOI normalizado y el hash de su titulo y año"""
+    keys = []
+    doi, hash_ = article_keys(record)
+    if doi:
+        keys.append(_digest(f"doi:{doi}"))
+    if hash_:
+        keys.append(_digest(f"title:{hash_}"))
+    return keys
+
+
+class KnownArticles:
+    """Conjunto de artículos conocidos, seguro entre hilos.
+
+    Las llaves cargadas desde la base de datos se guardan en un arreglo ordenado y las que se
+    agregan durante la ejecución en un conjunto que se compacta en el arreglo al crecer. Las
+    llaves reservadas con `claim` quedan pendientes hasta que el lote se confirma (`add`) o
+    falla (`release`).
+    """
+
+    # Tamaño del conjunto de llaves nuevas a partir del cual se compacta en el arreglo
+    COMPACT_SIZE = 50_000
+    # Llaves que se ordenan juntas al cargar, acota la lista temporal que crea `sorted`
+    SORT_RUN = 1_000_000
+
+    def __init__(self) -> None:
+        self.sorted = array("Q")
+        self.recent = set()
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.sorted) + len(self.recent)
+
+    def _contains(self, key: int) -> bool:
+        if key in self.recent:
+            return True
+        index = bisect_left(self.sorted, key)
+        return index < len(self.sorted) and self.sorted[index] == key
+
+    def _compact(self) -> None:
+        self.sorted = _unique(heapq.merge(self.sorted, sorted(self.recent)))
+        self.recent = set()
+
+    def load(self, session, chunk_size: int = 10_000) -> None:
+        """Carga las llaves de todos los artículos de la base de datos. Las llaves se ordenan en
+        tramos de `SORT_RUN` que luego se mezclan, la memoria es de 8 bytes por llave y no la de
+        una lista de enteros de Python con todas las llaves.
+
+        Args:
+            session (Session): Sesion de sqlalchemy
+            chunk_size (int): Filas que se leen por bloque
+        """
+        runs, keys = [], array("Q")
+        result = session.execute(
+            select(Article.doi, Article.title, Article.publication_date).execution_options(
+                yield_per=chunk_size
+            )
+        )
+        for doi, title, date in result:
+            keys.extend(record_keys({"doi": doi, "title": title, "publication_date": date}))
+            if len(keys) >= self.SORT_RUN:
+                runs.append(_unique(sorted(keys)))
+                keys = array("Q")
+        runs.append(_unique(sorted(keys)))
+        session.commit()
+        merged = _unique(heapq.merge(*runs)) if len(runs) > 1 else runs[0]
+        with self.lock:
+            self.sorted = merged
+            self.recent = set()
+        logger.info(f"[KnownArticles] {len(self.sorted)} keys loaded")
+
+    def contains(self, record: dict) -> bool:
+        """Indica si el artículo parseado ya está en la base de datos"""
+        keys = record_keys(record)
+        with self.lock:
+            return any(self._contains(key) for key in keys)
+
+    def claim(self, record: dict) -> bool:
+        """Reserva un artículo parseado para enriquecerlo e insertarlo.
+
+        Si dos fuentes entregan el mismo artículo al mismo tiempo solo la primera lo reserva, asi
+        no se consulta crossref dos veces por el mismo artículo. La reserva se libera con `add`
+        cuando el lote se confirma o con `release` si falla.
+
+        Returns:
+            bool: False si el artículo ya estaba en la base de datos o reservado
+        """
+        keys = record_keys(record)
+        with self.lock:
+            if any(key in self.pending or self._contains(key) for key in keys):
+                return False
+            self.pending.update(keys)
+        return True
+
+    def release(self, records: list[dict]) -> None:
+        """Libera la reserva de artículos cuyo lote no se pudo confirmar, asi se pueden volver a
+        reservar al reintentar"""
+        with self.lock:
+            for record in records:
+                if record:
+                    self.pending.difference_update(record_keys(record))
+
+    def add(self, records: list[dict]) -> None:
+        """Agrega artículos que ya se confirmaron en la base de datos y libera su reserva. Los
+        que no tienen autores se descartan al insertar y no se agregan"""
+        with self.lock:
+            for record in records:
+                if not record:
+                    continue
+                keys = record_keys(record)
+                self.pending.difference_update(keys)
+                if record.get("authors"):
+                    self.recent.update(keys)
+            if len(self.recent) >= self.COMPACT_SIZE:
+                self._compact()
+
+
+_KNOWN = None
+_KNOWN_LOCK = threading.Lock()
+
+
+def get_known(session) -> KnownArticles:
+    """Devuelve el conjunto de artículos conocidos del proceso, cargandolo la primera vez.
+
+    Args:
+        session (Session): Sesion de sqlalchemy que se usa para la carga inicial
+    """
+    global _KNOWN
+    with _KNOWN_LOCK:
+        if _KNOWN is None:
+            known = KnownArticles()
+            known.load(session)
+            _KNOWN = known
+    return _KNOWN
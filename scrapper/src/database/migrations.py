@@ -0,0 +1,273 @@
+"""Revisiones del esquema para bases de datos creadas con versiones anteriores.
+
+`Base.metadata.create_all` solo crea tablas nuevas, las revisiones agregan columnas, llaves e
+indices a tablas existentes. Todas las sentencias son idempotentes (Postgres).
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from src.database.normalize import (
+    affiliation_key,
+    author_key,
+    funder_key,
+    normalize_doi,
+    publication_year,
+    title_hash,
+)
+from src.database.rollups import rebuild_rollups
+from src.logs.logger import logger
+
+# Tamaño de los bloques en que se recorren las tablas al calcular las llaves
+BACKFILL_CHUNK = 5000
+
+
+def _add_columns(connection: Connection, table: str, columns: dict) -> None:
+    for column, type_ in columns.items():
+        connection.execute(
+            text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {type_}")
+        )
+
+
+def _backfill(
+    connection: Connection, table: str, select_columns: list, keys: callable
+) -> None:
+    """Calcula las llaves naturales de las filas que no las tienen.
+    Si dos filas tienen la misma llave solo la mas antigua la recibe, las demas quedan en NULL
+    para que el indice unico se pueda crear.
+
+    Args:
+        connection (Connection): Conexion con la transacción de la migracion
+        table (str): Tabla a completar
+        select_columns (list): Columnas que se leen para calcular las llaves
+        keys (callable): Recibe una fila y devuelve un dict con las llaves de la fila
+    """
+    key_columns = list(keys({column: None for column in select_columns}))
+    seen = {column: set() for column in key_columns}
+    for column in key_columns:
+        seen[column].update(
+            connection.execute(
+                text(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL")
+            ).scalars()
+        )
+    last_id, updated = 0, 0
+    while True:
+        rows = connection.execute(
+            text(
+                f"SELECT id, {', '.join(select_columns)} FROM {table} "
+                f"WHERE id > :last_id AND {' AND '.join(c + ' IS NULL' for c in key_columns)} "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BACKFILL_CHUNK},
+        ).mappings().all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            values = keys(row)
+            for column, value in values.items():
+                if value in seen[column]:
+                    values[column] = None
+                elif value is not None:
+                    seen[column].add(value)
+            updates.append(dict(values, id=row["id"]))
+        connection.execute(
+            text(
+                f"UPDATE {table} SET {', '.join(f'{c} = :{c}' for c in key_columns)} "
+                "WHERE id = :id"
+            ),
+            updates,
+        )
+        last_id, updated = rows[-1]["id"], updated + len(rows)
+    logger.info(f"[MIGRATION] {updated} rows of {table} backfilled")
+
+
+def _primary_key(connection: Connection, table: str, columns: tuple) -> None:
+    """Elimina vinculos duplicados o incompletos y agrega la llave primaria compuesta"""
+    exists = connection.execute(
+        text(
+            "SELECT 1 FROM information_schema.table_constraints "
+            "WHERE table_name = :table AND constraint_type = 'PRIMARY KEY'"
+        ),
+        {"table": table},
+    ).first()
+    if exists:
+        return
+    first, second = columns
+    connection.execute(
+        text(f"DELETE FROM {table} WHERE {first} IS NULL OR {second} IS NULL")
+    )
+    connection.execute(
+        text(
+            f"DELETE FROM {table} a USING {table} b WHERE a.ctid < b.ctid "
+            f"AND a.{first} = b.{first} AND a.{second} = b.{second}"
+        )
+    )
+    connection.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY ({first}, {second})"))
+
+
+def _unique_index(connection: Connection, table: str, column: str) -> None:
+    connection.execute(
+        text(f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})")
+    )
+
+
+def natural_keys(connection: Connection) -> None:
+    """Agrega las llaves naturales de artículos, autores, afiliaciones y financiadores, y las
+    llaves primarias compuestas de las tablas de asociacion."""
+    _add_columns(
+        connection, "articles", {"doi_key": "VARCHAR(500)", "title_hash": "VARCHAR(40)"}
+    )
+    _add_columns(connection, "article_authors", {"identity_key": "VARCHAR(300)"})
+    _add_columns(connection, "affiliations", {"name_key": "VARCHAR(300)"})
+    _add_columns(connection, "article_funders", {"funder_key": "VARCHAR(300)"})
+
+    _backfill(
+        connection,
+        "articles",
+        ["doi", "title", "publication_date"],
+        lambda row: {
+            "doi_key": normalize_doi(row["doi"]),
+            "title_hash": title_hash(row["title"], publication_year(row["publication_date"])),
+        },
+    )
+    _backfill(
+        connection,
+        "article_authors",
+        ['"ORCID"', "family", "given"],
+        lambda row: {"identity_key": author_key(dict(row))},
+    )
+    _backfill(
+        connection,
+        "affiliations",
+        ["name"],
+        lambda row: {"name_key": affiliation_key(row["name"]) or None},
+    )
+    _backfill(
+        connection,
+        "article_funders",
+        ["name", "doi"],
+        lambda row: {"funder_key": funder_key(dict(row))},
+    )
+
+    _unique_index(connection, "articles", "doi_key")
+    _unique_index(connection, "articles", "title_hash")
+    _unique_index(connection, "article_authors", "identity_key")
+    _unique_index(connection, "affiliations", "name_key")
+    _unique_index(connection, "article_funders", "funder_key")
+
+    _primary_key(connection, "article_authors_relationship", ("author_id", "article_id"))
+    _primary_key(
+        connection, "author_affiliation_relationship", ("author_id", "affiliation_id")
+    )
+    _primary_key(connection, "article_funder_relationship", ("article_id", "funder_id"))
+
+
+def checkpoint_cursor(connection: Connection) -> None:
+    """Agrega el cursor de paginación de Scopus a los checkpoints."""
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS crawl_checkpoints ("
+            "source VARCHAR(45), year INTEGER, PRIMARY KEY (source, year))"
+        )
+    )
+    _add_columns(
+        connection,
+        "crawl_checkpoints",
+        {
+            '"offset"': "INTEGER NOT NULL DEFAULT 0",
+            "total": "INTEGER",
+            "last_id": "VARCHAR(200)",
+            "webenv": "VARCHAR(500)",
+            "query_key": "VARCHAR(20)",
+            "cursor": "VARCHAR(500)",
+            "completed": "BOOLEAN NOT NULL DEFAULT FALSE",
+            "updated_at": "TIMESTAMP",
+        },
+    )
+
+
+def title_year_hash(connection: Connection) -> None:
+    """Recalcula `title_hash` incluyendo el año de publicación. La columna queda marcada con un
+    comentario para no recalcularla en cada migracion."""
+    marker = "title|year"
+    comment = connection.execute(
+        text("SELECT col_description('articles'::regclass, attnum) FROM pg_attribute "
+             "WHERE attrelid = 'articles'::regclass AND attname = 'title_hash'")
+    ).scalar()
+    if comment == marker:
+        return
+    connection.execute(text("UPDATE articles SET title_hash = NULL"))
+    _backfill(
+        connection,
+        "articles",
+        ["title", "publication_date"],
+        lambda row: {
+            "title_hash": title_hash(row["title"], publication_year(row["publication_date"]))
+        },
+    )
+    connection.execute(text(f"COMMENT ON COLUMN articles.title_hash IS '{marker}'"))
+
+
+def harvest_jobs(connection: Connection) -> None:
+    """Agrega la cola de trabajo compartida por los workers."""
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS harvest_jobs ("
+            "id SERIAL PRIMARY KEY, source VARCHAR(45) NOT NULL, year INTEGER NOT NULL, "
+            "page INTEGER NOT NULL, status VARCHAR(20) NOT NULL DEFAULT 'pending', "
+            "worker VARCHAR(200), attempts INTEGER NOT NULL DEFAULT 0, claimed_at TIMESTAMP, "
+            "UNIQUE (source, year, page))"
+        )
+    )
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_harvest_jobs_status ON harvest_jobs (status)")
+    )
+
+
+def harvest_watermarks(connection: Connection) -> None:
+    """Agrega la tabla de marcas de agua de la cosecha incremental."""
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS harvest_watermarks ("
+            "source VARCHAR(45) PRIMARY KEY, harvested_until DATE NOT NULL, "
+            "updated_at TIMESTAMP)"
+        )
+    )
+
+
+def article_rollups(connection: Connection) -> None:
+    """Agrega los resumenes del dashboard y los calcula a partir de los artículos existentes."""
+    connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS article_rollups ("
+            "dimension VARCHAR(20), year INTEGER, key VARCHAR(300), label VARCHAR(200), "
+            "articles INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (dimension, year, key))"
+        )
+    )
+    if connection.execute(text("SELECT 1 FROM article_rollups LIMIT 1")).first():
+        return
+    rebuild_rollups(Session(bind=connection))
+
+
+# Revisiones en orden de aplicación
+REVISIONS = [
+    natural_keys,
+    checkpoint_cursor,
+    title_year_hash,
+    harvest_watermarks,
+    article_rollups,
+    harvest_jobs,
+]
+
+
+def upgrade(engine: Engine) -> None:
+    """Aplica todas las revisiones del esquema en una transacción.
+
+    Args:
+        engine (Engine): Motor de sqlalchemy de la base de datos
+    """
+    with engine.begin() as connection:
+        for revision in REVISIONS:
+            logger.info(f"[MIGRATION] Applying {revision.__name__}")
+            revision(connection)
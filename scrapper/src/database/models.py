@@ -1,4 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    String,
+    ForeignKey,
+    Table,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base, relationship
 from typing import Optional
 
@@ -7,18 +17,19 @@ Base = declarative_base()
 # and an article can have many authors
 
 # Association table
+# The composite primary keys avoid duplicated links
 author_article = Table(
     "article_authors_relationship",
     Base.metadata,
-    Column("author_id", Integer, ForeignKey("article_authors.id")),
-    Column("article_id", Integer, ForeignKey("articles.id")),
+    Column("author_id", Integer, ForeignKey("article_authors.id"), primary_key=True),
+    Column("article_id", Integer, ForeignKey("articles.id"), primary_key=True),
 )
 
 author_affiliation = Table(
     "author_affiliation_relationship",
     Base.metadata,
-    Column("author_id", Integer, ForeignKey("article_authors.id")),
-    Column("affiliation_id", Integer, ForeignKey("affiliations.id")),
+    Column("author_id", Integer, ForeignKey("article_authors.id"), primary_key=True),
+    Column("affiliation_id", Integer, ForeignKey("affiliations.id"), primary_key=True),
 )
 
 
@@ -29,6 +40,8 @@ class Funder(Base):
     doi: Optional[str] = Column(String(200))
     url: Optional[str] = Column(String(200))
     award: Optional[str] = Column(String(200))
+    # Normalized DOI or name, see src.database.normalize.funder_key
+    funder_key: Optional[str] = Column(String(300), unique=True, index=True)
 
     def __repr__(self):
         return f"<Funder(name={self.name})>"
@@ -40,8 +53,8 @@ class Funder(Base):
 article_funder = Table(
     "article_funder_relationship",
     Base.metadata,
-    Column("article_id", Integer, ForeignKey("articles.id")),
-    Column("funder_id", Integer, ForeignKey("article_funders.id")),
+    Column("article_id", Integer, ForeignKey("articles.id"), primary_key=True),
+    Column("funder_id", Integer, ForeignKey("article_funders.id"), primary_key=True),
 )
 
 
@@ -49,6 +62,8 @@ class Affiliation(Base):
     __tablename__ = "affiliations"
     id = Column(Integer, primary_key=True, autoincrement=True)
     name: Optional[str] = Column(String(200))
+    # Normalized name, see src.database.normalize.affiliation_key
+    name_key: Optional[str] = Column(String(300), unique=True, index=True)
 
 
 class Author(Base):
@@ -58,6 +73,8 @@ class Author(Base):
     given: Optional[str] = Column(String(45))
     sequence: Optional[str] = Column(String(45))
     ORCID: Optional[str] = Column(String(200))
+    # ORCID or normalized name, see src.database.normalize.author_key
+    identity_key: Optional[str] = Column(String(300), unique=True, index=True)
     affiliation = relationship(
         Affiliation, secondary=author_affiliation, backref="affiliations", uselist=True
     )
@@ -79,6 +96,9 @@ class Article(Base):
     reference_count: Optional[int] = Column(Integer)
     url: Optional[str] = Column(String(500))
     issn: Optional[str] = Column(String(20))
+    # Natural keys used for deduplication, see src.database.normalize
+    doi_key: Optional[str] = Column(String(500), unique=True, index=True)
+    title_hash: Optional[str] = Column(String(40), unique=True, index=True)
 
     authors = relationship(
         Author, secondary=author_article, backref="authors", uselist=True
@@ -93,3 +113,87 @@ class Article(Base):
 
     def __str__(self):
         return f"Article ({self.title}, {self.doi})"
+
+
+class HarvestJob(Base):
+    """Unit of work (source, year, page) shared by the scraper replicas"""
+
+    __tablename__ = "harvest_jobs"
+    __table_args__ = (UniqueConstraint("source", "year", "page"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source: str = Column(String(45), nullable=False)
+    year: int = Column(Integer, nullable=False)
+    page: int = Column(Integer, nullable=False)
+    # pending, running, done or failed
+    status: str = Column(String(20), nullable=False, default="pending", index=True)
+    worker: Optional[str] = Column(String(200))
+    attempts: int = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<HarvestJob(source={self.source}, year={self.year}, page={self.page})>"
+
+    def __str__(self):
+        return f"HarvestJob ({self.source}, {self.year}, {self.page})"
+
+
+class CrawlCheckpoint(Base):
+    """Progress of a source for a year, written together with the batch it describes"""
+
+    __tablename__ = "crawl_checkpoints"
+    source: str = Column(String(45), primary_key=True)
+    year: int = Column(Integer, primary_key=True)
+    # Index of the next result to request, and total results reported by the API
+    offset: int = Column(Integer, nullable=False, default=0)
+    total: Optional[int] = Column(Integer)
+    last_id: Optional[str] = Column(String(200))
+    # eutils history server session
+    webenv: Optional[str] = Column(String(500))
+    query_key: Optional[str] = Column(String(20))
+    # Scopus deep paging cursor
+    cursor: Optional[str] = Column(String(500))
+    completed: bool = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<CrawlCheckpoint(source={self.source}, year={self.year}, offset={self.offset})>"
+
+    def __str__(self):
+        return f"CrawlCheckpoint ({self.source}, {self.year}, {self.offset})"
+
+
+class HarvestWatermark(Base):
+    """High-water mark of the incremental harvest of a source"""
+
+    __tablename__ = "harvest_watermarks"
+    source: str = Column(String(45), primary_key=True)
+    # Last day whose new or modified records were harvested
+    harvested_until = Column(Date, nullable=False)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<HarvestWatermark(source={self.source}, until={self.harvested_until})>"
+
+    def __str__(self):
+        return f"HarvestWatermark ({self.source}, {self.harvested_until})"
+
+
+class ArticleRollup(Base):
+    """Article count of a dashboard dimension value per publication year, kept up to date by
+    the ingest path, see src.database.rollups"""
+
+    __tablename__ = "article_rollups"
+    # year, publisher, affiliation or funder
+    dimension: str = Column(String(20), primary_key=True)
+    # 0 when the publication date has no year
+    year: int = Column(Integer, primary_key=True)
+    # Publisher name, affiliation or funder id, empty for the year dimension
+    key: str = Column(String(300), primary_key=True)
+    label: Optional[str] = Column(String(200))
+    articles: int = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ArticleRollup(dimension={self.dimension}, year={self.year}, key={self.key})>"
+
+    def __str__(self):
+        return f"ArticleRollup ({self.dimension}, {self.year}, {self.key})"
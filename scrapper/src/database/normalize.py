@@ -0,0 +1,80 @@
+"""Normalizacion de las llaves naturales que se usan para deduplicar las tablas."""
+
+import hashlib
+import html
+import re
+import unicodedata
+
+_DOI_PREFIX = re.compile(r"^(https?://(dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+_ORCID = re.compile(r"(\d{4}-\d{4}-\d{4}-\d{3}[\dX])", re.IGNORECASE)
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_YEAR = re.compile(r"\b(1[5-9]\d{2}|20\d{2})\b")
+
+
+def normalize_text(value: str) -> str:
+    """Normaliza un texto libre: decodifica entidades HTML, elimina acentos, puntuacion y
+    mayusculas, y colapsa los espacios.
+
+    Args:
+        value (str): Texto a normalizar
+
+    Returns:
+        str: Texto normalizado, vacio si `value` es None
+    """
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", html.unescape(value))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(_NON_WORD.sub(" ", value.casefold()).split())
+
+
+def normalize_doi(doi: str) -> str:
+    """Normaliza un DOI quitando el prefijo de url y pasandolo a minusculas"""
+    if not doi:
+        return None
+    return _DOI_PREFIX.sub("", doi.strip()).lower() or None
+
+
+def normalize_orcid(orcid: str) -> str:
+    """Extrae el identificador de un ORCID que puede venir como url"""
+    if not orcid:
+        return None
+    match = _ORCID.search(orcid)
+    return match.group(1).upper() if match else None
+
+
+def publication_year(date: str) -> str:
+    """Año de una fecha de publicación en cualquiera de los formatos de las fuentes
+    (`2021-12-31`, `2021 Dec 3`, `31 December 2021`)"""
+    match = _YEAR.search(str(date)) if date else None
+    return match.group(1) if match else None
+
+
+def title_hash(title: str, year: str = None) -> str:
+    """Hash SHA-1 del titulo normalizado de un artículo y su año de publicación, el año evita
+    que artículos distintos con titulos genericos (por ejemplo "Editorial") se confundan"""
+    normalized = normalize_text(title)
+    if not normalized:
+        return None
+    return hashlib.sha1(f"{normalized}|{year or ''}".encode("utf-8")).hexdigest()
+
+
+def author_key(author: dict) -> str:
+    """Identidad de un autor: su ORCID si lo tiene, si no su nombre normalizado"""
+    orcid = normalize_orcid(author.get("ORCID"))
+    if orcid:
+        return f"orcid:{orcid}"
+    return f"name:{normalize_text(author.get('family'))}|{normalize_text(author.get('given'))}"
+
+
+def funder_key(funder: dict) -> str:
+    """Identidad de un financiador: su DOI si lo tiene, si no su nombre normalizado"""
+    doi = normalize_doi(funder.get("doi"))
+    if doi:
+        return f"doi:{doi}"
+    return f"name:{normalize_text(funder.get('name'))}"
+
+
+def affiliation_key(name: str) -> str:
+    """Identidad de una afiliación: su nombre normalizado"""
+    return normalize_text(name)
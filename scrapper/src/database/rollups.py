@@ -0,0 +1,129 @@
+"""Resumenes precalculados para el dashboard.
+
+La tabla `article_rollups` guarda la cantidad de artículos por año de publicación y, para cada
+año, por editorial, afiliación y financiador. `insert_batch` la actualiza en la misma
+transacción que inserta cada lote (ver `src.database.tools.update_rollups`), por lo que las
+consultas de este modulo leen unas pocas filas sin importar el tamaño de la base de datos.
+
+Ejemplo de uso:
+```python
+    with LocalSession() as session:
+        per_year = articles_per_year(session, 2015, 2024)
+        publishers = top(session, "publisher", year=2024, limit=10)
+```
+"""
+
+from sqlalchemy import delete, func, select
+from src.database.models import Article, ArticleRollup
+from src.database.tools import update_rollups
+from src.logs.logger import logger
+
+DIMENSIONS = ("year", "publisher", "affiliation", "funder")
+# Artículos que se recorren por bloque al reconstruir los resumenes
+REBUILD_CHUNK = 5000
+
+
+def _check(dimension: str) -> None:
+    if dimension not in DIMENSIONS:
+        raise ValueError(
+            f"Unknown dimension {dimension}, available dimensions: {', '.join(DIMENSIONS)}"
+        )
+
+
+def articles_per_year(session, start: int = None, end: int = None) -> dict:
+    """Cantidad de artículos por año de publicación.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        start (int): Primer año incluido, todos si es None
+        end (int): Ultimo año incluido, todos si es None
+
+    Returns:
+        dict: Artículos de cada año, ordenados por año. El año 0 agrupa las fechas sin año
+    """
+    statement = select(ArticleRollup.year, ArticleRollup.articles).where(
+        ArticleRollup.dimension == "year", ArticleRollup.articles > 0
+    )
+    if start is not None:
+        statement = statement.where(ArticleRollup.year >= start)
+    if end is not None:
+        statement = statement.where(ArticleRollup.year <= end)
+    return dict(session.execute(statement.order_by(ArticleRollup.year)).all())
+
+
+def top(session, dimension: str, year: int = None, limit: int = 10) -> list[tuple]:
+    """Valores de una dimensión con mas artículos.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        dimension (str): `publisher`, `affiliation` o `funder`
+        year (int): Año de publicación, todos los años si es None
+        limit (int): Cantidad maxima de valores
+
+    Returns:
+        list[tuple]: Llave, etiqueta y cantidad de artículos de cada valor, de mayor a menor
+    """
+    _check(dimension)
+    articles = func.sum(ArticleRollup.articles).label("articles")
+    statement = (
+        select(ArticleRollup.key, func.max(ArticleRollup.label), articles)
+        .where(ArticleRollup.dimension == dimension)
+        .group_by(ArticleRollup.key)
+        .having(articles > 0)
+        .order_by(articles.desc(), ArticleRollup.key)
+        .limit(limit)
+    )
+    if year is not None:
+        statement = statement.where(ArticleRollup.year == year)
+    return [tuple(row) for row in session.execute(statement)]
+
+
+def yearly(session, dimension: str, key: str) -> dict:
+    """Artículos por año de un valor de una dimensión, por ejemplo de una afiliación.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        dimension (str): `publisher`, `affiliation` o `funder`
+        key (str): Llave del valor devuelta por `top`
+
+    Returns:
+        dict: Artículos de cada año, ordenados por año
+    """
+    _check(dimension)
+    statement = (
+        select(ArticleRollup.year, ArticleRollup.articles)
+        .where(
+            ArticleRollup.dimension == dimension,
+            ArticleRollup.key == key,
+            ArticleRollup.articles > 0,
+        )
+        .order_by(ArticleRollup.year)
+    )
+    return dict(session.execute(statement).all())
+
+
+def rebuild_rollups(session) -> int:
+    """Recalcula los resumenes desde cero a partir de los artículos existentes, sin confirmar la
+    transacción. Se usa al migrar una base de datos creada antes de los resumenes.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+
+    Returns:
+        int: Cantidad de artículos contados
+    """
+    session.execute(delete(ArticleRollup))
+    last_id, counted = 0, 0
+    while True:
+        ids = session.scalars(
+            select(Article.id)
+            .where(Article.id > last_id)
+            .order_by(Article.id)
+            .limit(REBUILD_CHUNK)
+        ).all()
+        if not ids:
+            break
+        update_rollups(session, ids)
+        last_id, counted = ids[-1], counted + len(ids)
+    logger.info(f"[DATABASE] Rollups rebuilt from {counted} articles")
+    return counted
@@ -1,103 +1,422 @@
-from src.database.models import Author, Article, Funder, Affiliation
+from contextlib import contextmanager
+from sqlalchemy import bindparam, func, or_, select, update
+from src.database.models import (
+    Author,
+    Article,
+    Funder,
+    Affiliation,
+    ArticleRollup,
+    author_article,
+    author_affiliation,
+    article_funder,
+)
+from src.database.dedup import ARTICLE_FIELDS, deduplicate
+from src.database.identity import identity_cache, stage
+from src.database.normalize import (
+    affiliation_key,
+    author_key,
+    funder_key,
+    publication_year,
+)
 from src.logs.logger import logger
+from src.tools.metrics import INSERT_BATCH_SECONDS
 
+# Cantidad maxima de filas por sentencia INSERT ... VALUES
+CHUNK_SIZE = 1000
+# Campos de crossref que se actualizan en los artículos existentes al cosechar cambios
+REFRESHED_FIELDS = ("publisher", "reference_count", "url", "issn")
 
-def insert_data(session, data: dict) -> None:
-    """Inserta los datos devueltos por los motores de busqueda en la base de datos
+
+@contextmanager
+def batch_scope(session):
+    """Transacción de un lote: se confirma al salir del bloque o se deshace si hay un error.
+    Siempre se cierra la sesion, lo que vacia su mapa de identidad y devuelve la conexion al pool,
+    asi la memoria no crece con cada lote. La sesion se puede volver a usar en el siguiente lote.
 
     Args:
-        session (Session): Es una sesion de sqlalchemy para interactuar con la base de datos
-        data (dict): Es un diccionario con los datos a insertar en la base de datos
+        session (Session): Sesion de sqlalchemy
+
+    Yields:
+        Session: La misma sesion
     """
-    # Make authors
-    if not data:
-        logger.error("[DATABASE] No data to insert discarding...")
-        return
-    if not data.get("authors"):
-        logger.error("[DATABASE] No authors to insert discarding...")
-        return
-    authors = data.pop("authors")
-
-    logger.debug("[DATABASE] Inserting data into database")
-    # Make article
-    # Try to get the article by title
-    article_ = session.query(Article).filter_by(title=data["title"]).first()
-    if article_:
-        logger.info(f"[DATABASE] Article {article_} already exists")
-        return
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    """Divide una lista en bloques de `size` elementos"""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def insert_statement(session, table):
+    """Devuelve un INSERT con soporte de ON CONFLICT para el motor de la sesion"""
+    if session.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
     else:
-        logger.info("[DATABASE] Article does not exist, creating...")
-        article = Article(
-            doi=data["doi"],
-            title=data["title"],
-            publication_date=data["publication_date"],
-            publisher=data["publisher"],
-            reference_count=data["reference_count"],
-            url=data["url"],
-            issn=data["issn"],
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
+
+
+def _insert_returning(session, model, rows: list[dict], *columns) -> list:
+    """Inserta filas ignorando conflictos y devuelve las columnas pedidas de las filas creadas"""
+    created = []
+    if not rows:
+        return created
+    for chunk in _chunks(rows):
+        statement = (
+            insert_statement(session, model.__table__)
+            .values(chunk)
+            .on_conflict_do_nothing()
+            .returning(*columns)
         )
-        session.add(article)
-
-    for i, author in enumerate(authors):
-        # Try to get
-        author_ = (
-            session.query(Author)
-            .filter_by(family=author.get("family"), given=author.get("given"))
-            .first()
+        created.extend(session.execute(statement).all())
+    return created
+
+
+def _link(session, table, rows: list[dict]) -> None:
+    """Inserta filas en una tabla de asociacion ignorando los vinculos que ya existen"""
+    for chunk in _chunks(rows):
+        statement = insert_statement(session, table)
+        session.execute(statement.values(chunk).on_conflict_do_nothing())
+
+
+def _resolve(session, model, column: str, rows: dict) -> tuple[dict, set]:
+    """Obtiene los identificadores de las filas de `model` a partir de su llave natural,
+    creando con un upsert las que no existen. Las llaves resueltas anteriormente se toman del
+    cache de identidades sin consultar la base de datos.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        model (Base): Modelo de la tabla
+        column (str): Columna con indice unico que identifica una fila
+        rows (dict): Filas a resolver, indexadas por su llave natural
+
+    Returns:
+        tuple[dict, set]: Identificador de cada llave, y las llaves creadas
+    """
+    if not rows:
+        return {}, set()
+    key = getattr(model, column)
+    ids = identity_cache(model).get_many(list(rows))
+    cached = set(ids)
+
+    def lookup(keys: list) -> None:
+        for chunk in _chunks(keys):
+            ids.update(
+                (found, id_)
+                for id_, found in session.execute(
+                    select(model.id, key).where(key.in_(chunk))
+                )
+            )
+
+    lookup([k for k in rows if k not in cached])
+    missing = [k for k in rows if k not in ids]
+    created = set()
+    for id_, found in _insert_returning(
+        session, model, [dict(rows[k], **{column: k}) for k in missing], model.id, key
+    ):
+        ids[found] = id_
+        created.add(found)
+    # Filas creadas por otro proceso entre la busqueda y el INSERT
+    lost = [k for k in missing if k not in ids]
+    if lost:
+        lookup(lost)
+    stage(session, model, {k: id_ for k, id_ in ids.items() if k not in cached})
+    return ids, created
+
+
+def _rollup_counts(session, article_ids: list) -> dict:
+    """Cuenta los artículos que aportan a cada fila de `article_rollups`.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        article_ids (list): Identificadores de los artículos
+
+    Returns:
+        dict: Etiqueta y cantidad de artículos de cada `(dimension, year, key)`
+    """
+    counts = {}
+
+    def add(dimension: str, year: int, key: str, label: str) -> None:
+        counts.setdefault((dimension, year, key), [label, 0])[1] += 1
+
+    for chunk in _chunks(article_ids):
+        years = {}
+        for id_, date, publisher in session.execute(
+            select(Article.id, Article.publication_date, Article.publisher).where(
+                Article.id.in_(chunk)
+            )
+        ):
+            years[id_] = int(publication_year(date) or 0)
+            add("year", years[id_], "", None)
+            if publisher:
+                add("publisher", years[id_], publisher, publisher)
+        for article_id, id_, name in session.execute(
+            select(author_article.c.article_id, Affiliation.id, Affiliation.name)
+            .distinct()
+            .select_from(author_article)
+            .join(author_affiliation, author_affiliation.c.author_id == author_article.c.author_id)
+            .join(Affiliation, Affiliation.id == author_affiliation.c.affiliation_id)
+            .where(author_article.c.article_id.in_(chunk))
+        ):
+            add("affiliation", years[article_id], str(id_), name)
+        for article_id, id_, name in session.execute(
+            select(article_funder.c.article_id, Funder.id, Funder.name)
+            .select_from(article_funder)
+            .join(Funder, Funder.id == article_funder.c.funder_id)
+            .where(article_funder.c.article_id.in_(chunk))
+        ):
+            add("funder", years[article_id], str(id_), name)
+    return counts
+
+
+def update_rollups(session, article_ids: list, sign: int = 1) -> None:
+    """Suma (o resta con `sign=-1`) los artículos a las tablas de resumen del dashboard dentro
+    de la transacción actual, ver `src.database.rollups`.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        article_ids (list): Identificadores de los artículos
+        sign (int): 1 para agregar los artículos, -1 para quitarlos
+    """
+    if not article_ids:
+        return
+    # Ordenadas para que dos transacciones concurrentes bloqueen las filas en el mismo orden
+    rows = [
+        {"dimension": dimension, "year": year, "key": key, "label": label, "articles": sign * n}
+        for (dimension, year, key), (label, n) in sorted(
+            _rollup_counts(session, article_ids).items()
         )
-        if author_:
-            logger.debug(f"[DATABASE] Author {author_} already exists")
-            authors[i] = author_
-        else:
-            logger.debug("[DATABASE] Author does not exist, creating...")
-            authors[i] = Author(
-                family=author.get("family"),
-                given=author.get("given"),
-                sequence=author.get("sequence"),
-                ORCID=author.get("ORCID"),
+    ]
+    table = ArticleRollup.__table__
+    for chunk in _chunks(rows):
+        statement = insert_statement(session, table).values(chunk)
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["dimension", "year", "key"],
+                set_={
+                    "articles": table.c.articles + statement.excluded.articles,
+                    "label": func.coalesce(statement.excluded.label, table.c.label),
+                },
             )
-            if author.get("affiliation"):
-                for affiliation in author["affiliation"]:
-                    affiliation_ = (
-                        session.query(Affiliation).filter_by(name=affiliation).first()
-                    )
-                    if affiliation_:
-                        logger.debug(
-                            f"[DATABASE] Affiliation {affiliation_} already exists"
-                        )
-                        authors[i].affiliation.append(affiliation_)
-                    else:
-                        affiliation = Affiliation(name=affiliation)
-                        session.add(affiliation)
-                        session.commit()
-                        authors[i].affiliation.append(affiliation)
-
-    # funders
-    if data.get("funders"):
-        funders = data.pop("funders")
-        for funder in funders:
-            print(funder)
-            funder_ = session.query(Funder).filter_by(name=funder["name"]).first()
-            if funder_:
-                logger.debug(f"[DATABASE] Funder {funder_} already exists")
-                funders[funders.index(funder)] = funder_
-            else:
-                logger.debug("[DATABASE] Funder does not exist, creating...")
-                funders[funders.index(funder)] = Funder(
-                    name=funder["name"],
-                    doi=funder["doi"],
-                    award=None,
-                    url=None,
-                )
-        print(funders)
-        session.add_all(funders)
+        )
+
+
+def _fill_missing(session, existing: list, records: dict, refresh: bool = False) -> dict:
+    """Completa los campos vacios de los artículos existentes con los de los registros nuevos
+    del mismo artículo, y saca esos registros del lote.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        existing (list): Filas de los artículos existentes que coinciden con el lote
+        records (dict): Registros del lote indexados por `title_hash`
+        refresh (bool): Si es True los campos de `REFRESHED_FIELDS` que cambiaron se
+            reemplazan aunque no estén vacios
+
+    Returns:
+        dict: Registros del lote que no existen en la base de datos
+    """
+    by_doi = {data["doi_key"]: data for data in records.values() if data["doi_key"]}
+    taken_dois = {row.doi_key for row in existing if row.doi_key}
+    columns = ARTICLE_FIELDS + ("doi_key",)
+    replace = REFRESHED_FIELDS if refresh else ()
+    updates, changed = [], []
+    for row in existing:
+        data = records.get(row.title_hash) or by_doi.get(row.doi_key)
+        if data is None or records.pop(data["title_hash"], None) is None:
+            continue
+        logger.debug(f"[DATABASE] Article {row.title} already exists")
+        values = {}
+        for field in ARTICLE_FIELDS:
+            current, value = getattr(row, field), data.get(field)
+            if field == "doi" or value is None or current == value:
+                continue
+            if current is None or field in replace:
+                values[field] = value
+        if row.doi_key is None and data["doi_key"] and data["doi_key"] not in taken_dois:
+            values.update(doi=data["doi"], doi_key=data["doi_key"])
+            taken_dois.add(data["doi_key"])
+        if values:
+            updates.append({"_id": row.id, **{f"_{c}": values.get(c) for c in columns}})
+            if "publisher" in values or "publication_date" in values:
+                changed.append(row.id)
+    if updates:
+        table = Article.__table__
+        # Los artículos que cambian de año o editorial se mueven en los resumenes
+        update_rollups(session, changed, -1)
+        session.execute(
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .values(
+                {
+                    c: func.coalesce(bindparam(f"_{c}"), table.c[c])
+                    if c in replace
+                    else func.coalesce(table.c[c], bindparam(f"_{c}"))
+                    for c in columns
+                }
+            ),
+            updates,
+        )
+        update_rollups(session, changed)
+        logger.debug(f"[DATABASE] {len(updates)} existing articles completed")
+    return records
+
+
+@INSERT_BATCH_SECONDS.timed
+def insert_batch(
+    session, batch: list[dict], commit: bool = True, refresh: bool = False
+) -> list[int]:
+    """Inserta un lote de artículos en la base de datos en una sola transacción.
+
+    Los registros del mismo artículo se combinan primero en uno solo (ver `src.database.dedup`).
+    Los artículos, autores, afiliaciones y financiadores existentes se resuelven por su llave
+    natural (ver `src.database.normalize`) con una consulta `IN` por tabla, los nuevos se insertan
+    con `INSERT ... ON CONFLICT DO NOTHING RETURNING` y las tablas de asociacion se escriben en
+    bloque. Los artículos que ya existen se completan con los campos que les falten, tambien con
+    los registros sin autores de crossref, que no se insertan como artículos nuevos. Los
+    resumenes del dashboard se actualizan en la misma transacción.
+
+    Args:
+        session (Session): Es una sesion de sqlalchemy para interactuar con la base de datos
+        batch (list[dict]): Artículos devueltos por los motores de busqueda
+        commit (bool): Si es False la transacción queda abierta para que el llamador la confirme
+        refresh (bool): Si es True los artículos existentes tambien se actualizan con los campos
+            de crossref que cambiaron (ver `REFRESHED_FIELDS`)
+
+    Returns:
+        list[int]: Identificadores de los artículos creados
+    """
+    records = {data["title_hash"]: data for data in deduplicate([data for data in batch if data])}
+    if len(records) < len(batch):
+        logger.debug(f"[DATABASE] {len(batch) - len(records)} records discarded or merged")
+    if not records:
+        return []
+    dois = {data["doi_key"] for data in records.values() if data["doi_key"]}
+
+    logger.debug(f"[DATABASE] Inserting batch of {len(records)} articles into database")
+    # Articles
+    existing = session.execute(
+        select(
+            Article.id,
+            Article.title,
+            Article.doi_key,
+            Article.title_hash,
+            *[getattr(Article, field) for field in ARTICLE_FIELDS],
+        ).where(or_(Article.doi_key.in_(list(dois)), Article.title_hash.in_(list(records))))
+    ).all()
+    records = _fill_missing(session, existing, records, refresh)
+    # Los registros sin autores solo completan artículos existentes
+    for hash_ in [hash_ for hash_, data in records.items() if not data.get("authors")]:
+        logger.error("[DATABASE] No authors to insert discarding...")
+        del records[hash_]
+    if not records:
+        return []
+    article_ids = dict(
+        (hash_, id_)
+        for id_, hash_ in _insert_returning(
+            session,
+            Article,
+            [
+                {
+                    "doi": data["doi"],
+                    "title": data["title"],
+                    "publication_date": data["publication_date"],
+                    "publisher": data["publisher"],
+                    "reference_count": data["reference_count"],
+                    "url": data["url"],
+                    "issn": data["issn"],
+                    "doi_key": data["doi_key"],
+                    "title_hash": data["title_hash"],
+                }
+                for data in records.values()
+            ],
+            Article.id,
+            Article.title_hash,
+        )
+    )
+
+    # Authors
+    authors = {}
+    for hash_ in article_ids:
+        for author in records[hash_]["authors"]:
+            authors.setdefault(author_key(author), author)
+    author_ids, new_authors = _resolve(
+        session,
+        Author,
+        "identity_key",
+        {
+            key: {
+                "family": author.get("family"),
+                "given": author.get("given"),
+                "sequence": author.get("sequence"),
+                "ORCID": author.get("ORCID"),
+            }
+            for key, author in authors.items()
+        },
+    )
+
+    # Affiliations, solo para los autores nuevos
+    names = {}
+    for key in new_authors:
+        for name in authors[key].get("affiliation") or []:
+            names.setdefault(affiliation_key(name), name)
+    affiliation_ids, _ = _resolve(
+        session, Affiliation, "name_key", {key: {"name": name} for key, name in names.items()}
+    )
+
+    # Funders
+    funders = {}
+    for hash_ in article_ids:
+        for funder in records[hash_].get("funders") or []:
+            funders.setdefault(funder_key(funder), funder)
+    funder_ids, _ = _resolve(
+        session,
+        Funder,
+        "funder_key",
+        {
+            key: {"name": funder["name"], "doi": funder["doi"], "award": None, "url": None}
+            for key, funder in funders.items()
+        },
+    )
+
+    # Relationships
+    author_links, affiliation_links, funder_links = set(), set(), set()
+    for hash_, article_id in article_ids.items():
+        data = records[hash_]
+        for author in data["authors"]:
+            author_links.add((author_ids[author_key(author)], article_id))
+        for funder in data.get("funders") or []:
+            funder_links.add((article_id, funder_ids[funder_key(funder)]))
+    for key in new_authors:
+        for name in authors[key].get("affiliation") or []:
+            affiliation_links.add((author_ids[key], affiliation_ids[affiliation_key(name)]))
+    _link(session, author_article, [{"author_id": a, "article_id": b} for a, b in author_links])
+    _link(
+        session,
+        author_affiliation,
+        [{"author_id": a, "affiliation_id": b} for a, b in affiliation_links],
+    )
+    _link(session, article_funder, [{"article_id": a, "funder_id": b} for a, b in funder_links])
+    update_rollups(session, list(article_ids.values()))
+
+    if commit:
         session.commit()
-        article.funders.extend(funders)
-
-    session.add_all(authors)
-    session.commit()
-    # relationship author_article
-    for author in authors:
-        article.authors.append(author)
-    session.commit()
-    logger.info("[DATABASE] Data inserted successfully")
+    logger.info(f"[DATABASE] {len(article_ids)} articles inserted successfully")
+    return list(article_ids.values())
+
+
+def insert_data(session, data: dict) -> None:
+    """Inserta los datos devueltos por los motores de busqueda en la base de datos
+
+    Args:
+        session (Session): Es una sesion de sqlalchemy para interactuar con la base de datos
+        data (dict): Es un diccionario con los datos a insertar en la base de datos
+    """
+    insert_batch(session, [data])
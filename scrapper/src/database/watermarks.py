@@ -0,0 +1,43 @@
+"""Marcas de agua de la cosecha incremental de cada motor de busqueda.
+
+La marca de un motor es el ultimo día cuyos artículos nuevos o modificados ya se insertaron. Solo
+se avanza cuando la cosecha del intervalo terminó, si falla la siguiente ejecución repite el
+mismo intervalo.
+"""
+
+from datetime import date, datetime
+from sqlalchemy import select
+from src.database.models import HarvestWatermark
+from src.database.tools import insert_statement
+
+
+def load_watermark(session, source: str) -> date:
+    """Obtiene la marca de agua de un motor de busqueda.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        source (str): Nombre del motor de busqueda
+
+    Returns:
+        date: Ultimo día cosechado, None si el motor nunca se cosechó de forma incremental
+    """
+    until = session.scalar(
+        select(HarvestWatermark.harvested_until).where(HarvestWatermark.source == source)
+    )
+    session.commit()
+    return until
+
+
+def save_watermark(session, source: str, until: date) -> None:
+    """Guarda la marca de agua de un motor sin confirmar la transacción.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        source (str): Nombre del motor de busqueda
+        until (date): Ultimo día cosechado
+    """
+    values = {"harvested_until": until, "updated_at": datetime.utcnow()}
+    statement = insert_statement(session, HarvestWatermark.__table__).values(
+        source=source, **values
+    )
+    session.execute(statement.on_conflict_do_update(index_elements=["source"], set_=values))
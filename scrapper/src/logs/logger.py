@@ -7,7 +7,6 @@ console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter('[%(asctime)s][%(levelname)s]: %(message)s'))
 logger.addHandler(console_handler)
 # Set level to DEBUG for development
-print(os.getenv("DEV_MODE", None))
 if os.getenv("DEV_MODE", None) == 'True':
     logger.setLevel(logging.DEBUG)
 else:
@@ -0,0 +1,159 @@
+"""Cache persistente en disco de las respuestas de crossref.
+
+Las respuestas se guardan comprimidas en una base SQLite, indexadas por el hash del DOI
+normalizado, con un tiempo de vida (`CROSSREF_CACHE_TTL`, en segundos) y una cantidad maxima de
+entradas (`CROSSREF_CACHE_MAX_ENTRIES`) sobre la que se eliminan las menos usadas recientemente.
+`CROSSREF_CACHE_PATH` indica el archivo, si está vacio el cache queda desactivado.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from src.logs.logger import logger
+from src.tools.metrics import CROSSREF_CACHE_LOOKUPS
+
+# Valor devuelto cuando el DOI no está en el cache
+MISS = object()
+
+
+def doi_digest(doi: str) -> str:
+    """Hash del DOI normalizado que se usa como llave del cache"""
+    return hashlib.sha256(doi.strip().lower().encode("utf-8")).hexdigest()
+
+
+class CrossrefCache:
+    """Cache LRU con TTL de registros de crossref guardado en SQLite.
+
+    Ejemplo de uso:
+    ```python
+        cache = CrossrefCache("crossref.sqlite")
+        message = cache.get("10.1000/xyz")
+        if message is MISS:
+            cache.set("10.1000/xyz", fetch(...))
+    ```
+
+    Args:
+        path (str): Archivo de la base SQLite
+        ttl (int): Segundos que una respuesta se considera vigente
+        max_entries (int): Cantidad maxima de respuestas guardadas
+    """
+
+    def __init__(self, path: str, ttl: int = 30 * 24 * 3600, max_entries: int = 200_000) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS crossref ("
+            "key TEXT PRIMARY KEY, payload BLOB, stored_at REAL, accessed_at REAL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS crossref_accessed ON crossref (accessed_at)"
+        )
+        self.connection.commit()
+        (self.size,) = self.connection.execute("SELECT COUNT(*) FROM crossref").fetchone()
+
+    def get(self, doi: str) -> dict:
+        """Busca el registro de crossref de un DOI.
+
+        Args:
+            doi (str): DOI del artículo
+
+        Returns:
+            dict: Registro guardado (None si crossref no lo encontró) o `MISS` si no está en el cache
+        """
+        key, now = doi_digest(doi), time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT payload, stored_at FROM crossref WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                CROSSREF_CACHE_LOOKUPS.inc(result="miss")
+                return MISS
+            self.connection.execute(
+                "UPDATE crossref SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.connection.commit()
+            self.hits += 1
+            CROSSREF_CACHE_LOOKUPS.inc(result="hit")
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, doi: str, message: dict) -> None:
+        """Guarda el registro de crossref de un DOI, eliminando las entradas menos usadas si se
+        supera el maximo.
+
+        Args:
+            doi (str): DOI del artículo
+            message (dict): Registro de crossref, None si el DOI no existe en crossref
+        """
+        now = time.time()
+        payload = zlib.compress(json.dumps(message).encode("utf-8"))
+        key = doi_digest(doi)
+        with self.lock:
+            exists = self.connection.execute(
+                "SELECT 1 FROM crossref WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO crossref VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self.size += 0 if exists else 1
+            if self.size > self.max_entries:
+                removed = self.connection.execute(
+                    "DELETE FROM crossref WHERE key IN ("
+                    "SELECT key FROM crossref ORDER BY accessed_at LIMIT ?)",
+                    (self.size - self.max_entries,),
+                ).rowcount
+                self.evictions += removed
+                self.size -= removed
+            self.connection.commit()
+
+    def stats(self) -> dict:
+        """Contadores de uso del cache"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self.size,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+# Ruta que no se pudo abrir, el cache queda desactivado en vez de reintentarlo en cada consulta
+_FAILED_PATH = None
+
+
+def get_cache() -> CrossrefCache:
+    """Devuelve el cache de crossref configurado en el entorno, None si está desactivado o si
+    no se puede abrir su archivo (por ejemplo un directorio sin permisos de escritura)"""
+    global _CACHE, _FAILED_PATH
+    path = os.getenv("CROSSREF_CACHE_PATH", ".cache/crossref.sqlite")
+    with _CACHE_LOCK:
+        if _CACHE is None and path and path != _FAILED_PATH:
+            try:
+                _CACHE = CrossrefCache(
+                    path,
+                    ttl=int(os.getenv("CROSSREF_CACHE_TTL", str(30 * 24 * 3600))),
+                    max_entries=int(os.getenv("CROSSREF_CACHE_MAX_ENTRIES", "200000")),
+                )
+            except (OSError, sqlite3.Error) as error:
+                _FAILED_PATH = path
+                logger.warning(f"[CrossrefCache] Cannot open {path}, cache disabled: {error}")
+                return None
+            logger.info(f"[CrossrefCache] Using cache at {path}")
+    return _CACHE
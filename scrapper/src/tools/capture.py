@@ -0,0 +1,180 @@
+"""Captura de las respuestas crudas de las APIs y reproducción offline.
+
+Si `CAPTURE_DIR` está definido, cada respuesta de PubMed, Scopus y crossref se agrega como una
+linea JSON a segmentos comprimidos (`raw-*.ndjson.gz`) que rotan al superar
+`CAPTURE_SEGMENT_MB` megabytes sin comprimir. Cada linea se vacia al archivo al escribirla, si
+el proceso muere sin cerrar el segmento solo se pierde el final del archivo. `replay` vuelve a
+correr el parseo y la inserción desde esos archivos sin usar la red, por lo que la base de datos
+se puede reconstruir a la velocidad del disco.
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from src.logs.logger import logger
+
+CAPTURE_SEGMENT_MB = float(os.getenv("CAPTURE_SEGMENT_MB", "64"))
+
+
+class RawCapture:
+    """Escritor de segmentos NDJSON comprimidos, seguro entre hilos.
+
+    Args:
+        directory (str): Carpeta donde se escriben los segmentos
+        segment_bytes (int): Bytes sin comprimir a partir de los cuales se abre un segmento nuevo
+    """
+
+    def __init__(self, directory: str, segment_bytes: int) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        self.written = 0
+        self.segments = 0
+
+    def _open(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        name = "raw-{}-{}-{:04d}.ndjson.gz".format(
+            time.strftime("%Y%m%dT%H%M%S"), os.getpid(), self.segments
+        )
+        self.file = gzip.open(os.path.join(self.directory, name), "at", encoding="utf-8")
+        self.written = 0
+        self.segments += 1
+
+    def write(self, kind: str, payload, **meta) -> None:
+        """Agrega una respuesta al segmento actual.
+
+        Args:
+            kind (str): Tipo de respuesta: `pubmed.esummary`, `scopus.search` o `crossref.work`
+            payload: Respuesta cruda de la API
+            **meta: Datos adicionales, por ejemplo el DOI consultado
+        """
+        line = json.dumps(
+            {"kind": kind, "fetched_at": time.time(), **meta, "payload": payload},
+            ensure_ascii=False,
+        )
+        with self.lock:
+            if self.file is None or self.written >= self.segment_bytes:
+                self._open()
+            self.file.write(line + "\n")
+            # Z_SYNC_FLUSH dentro del mismo miembro gzip: las lineas escritas se pueden
+            # descomprimir aunque el segmento no se cierre, solo falta el trailer del miembro
+            self.file.flush()
+            self.written += len(line) + 1
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+_CAPTURE = None
+_CAPTURE_LOCK = threading.Lock()
+
+
+def capture(kind: str, payload, **meta) -> None:
+    """Guarda una respuesta cruda si la captura está activada (`CAPTURE_DIR`)"""
+    global _CAPTURE
+    directory = os.getenv("CAPTURE_DIR")
+    if not directory:
+        return
+    with _CAPTURE_LOCK:
+        if _CAPTURE is None:
+            _CAPTURE = RawCapture(directory, int(CAPTURE_SEGMENT_MB * 1024 * 1024))
+            atexit.register(_CAPTURE.close)
+            logger.info(f"[Capture] Writing raw responses to {directory}")
+    _CAPTURE.write(kind, payload, **meta)
+
+
+def read_segments(directory: str, kinds: tuple = None):
+    """Lee las respuestas capturadas en orden.
+
+    Args:
+        directory (str): Carpeta con los segmentos
+        kinds (tuple): Tipos de respuesta a leer, todos si es None
+
+    Yields:
+        dict: Cada linea capturada
+    """
+    for path in sorted(glob.glob(os.path.join(directory, "raw-*.ndjson.gz"))):
+        try:
+            yield from _read_segment(path, kinds)
+        except (EOFError, gzip.BadGzipFile, zlib.error) as error:
+            # Segmento que no se cerró correctamente, se leyó hasta el ultimo bloque completo
+            logger.error(f"[Capture] Truncated segment {path}: {error}")
+
+
+def _read_segment(path: str, kinds: tuple):
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Ultima linea de un segmento que no se cerró correctamente
+                logger.error(f"[Capture] Truncated line in {path}, skipping...")
+                continue
+            if kinds is None or record["kind"] in kinds:
+                yield record
+
+
+def replay(directory: str, session, batch_size: int = 500) -> int:
+    """Reconstruye la base de datos desde las respuestas capturadas, sin usar la red.
+
+    Los registros de crossref se indexan primero en un cache temporal en disco y luego cada
+    respuesta de PubMed y Scopus pasa por `parse`, `merge_crossref` e `insert_batch`.
+
+    Args:
+        directory (str): Carpeta con los segmentos
+        session (Session): Sesion de sqlalchemy
+        batch_size (int): Artículos por transacción
+
+    Returns:
+        int: Cantidad de artículos insertados
+    """
+    from src.database.tools import batch_scope, insert_batch
+    from src.tools.cache import MISS, CrossrefCache
+    from src.tools.search import PubMed, ScopusSearch, merge_crossref
+
+    pubmed, scopus = PubMed(session=session), ScopusSearch(session=session)
+    inserted = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        crossref = CrossrefCache(
+            os.path.join(workdir, "crossref.sqlite"), ttl=float("inf"), max_entries=2**62
+        )
+        for record in read_segments(directory, ("crossref.work",)):
+            crossref.set(record["doi"], record["payload"])
+
+        def enrich(search, publication: dict) -> dict:
+            result = search.parse(publication)
+            if result is None:
+                return None
+            message = crossref.get(result["doi"])
+            return merge_crossref(result, None if message is MISS else message)
+
+        batch = []
+        for record in read_segments(directory, ("pubmed.esummary", "scopus.search")):
+            if record["kind"] == "pubmed.esummary":
+                items = [(pubmed, article) for article in pubmed.split_summary(record["payload"])]
+            else:
+                entries = record["payload"].get("entry", [])
+                items = [(scopus, entry) for entry in entries if "error" not in entry]
+            batch.extend(enrich(search, publication) for search, publication in items)
+            if len(batch) >= batch_size:
+                with batch_scope(session):
+                    inserted += len(insert_batch(session, batch, commit=False))
+                batch = []
+        if batch:
+            with batch_scope(session):
+                inserted += len(insert_batch(session, batch, commit=False))
+        crossref.connection.close()
+    logger.info(f"[Capture] Replay finished, {inserted} articles inserted")
+    return inserted
@@ -0,0 +1,97 @@
+"""Cliente HTTP compartido por todos los motores de busqueda.
+
+Cada host tiene una `Session` de requests con conexiones keep-alive reutilizables, por lo que la
+conexion TCP+TLS se abre una sola vez por conexion del pool y no en cada petición.
+Todas las peticiones pasan por el limitador de cada host, y las respuestas 429/503 se reintentan
+respetando `Retry-After`.
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+import requests as req
+from requests.adapters import HTTPAdapter
+from src.logs.logger import logger
+from src.tools.metrics import HTTP_REQUEST_SECONDS, HTTP_RESPONSES, RATE_LIMIT_WAIT_SECONDS
+from src.tools.ratelimit import RATE_LIMITER, parse_retry_after
+
+# Respuestas que indican que la API nos está limitando
+THROTTLE_STATUS = (429, 503)
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+# Conexiones abiertas por host, deberia cubrir los workers que usan el mismo host a la vez
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+# Segundos de espera para conectar y para leer la respuesta
+HTTP_TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "60")),
+)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(host: str) -> req.Session:
+    """Devuelve la sesion keep-alive del host, creandola si no existe.
+
+    Args:
+        host (str): Host de la API
+
+    Returns:
+        req.Session: Sesion compartida por todos los hilos que llaman al host
+    """
+    with _sessions_lock:
+        if host not in _sessions:
+            session = req.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=2
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": "gzip, deflate"})
+            mailto = os.getenv("CROSSREF_MAILTO")
+            if mailto:
+                # Crossref asigna el pool "polite" a los clientes que se identifican
+                session.headers["User-Agent"] = f"AcademicDashboard/1.0 (mailto:{mailto})"
+            _sessions[host] = session
+        return _sessions[host]
+
+
+def request(method: str, url: str, **kwargs) -> req.Response:
+    """Realiza una petición HTTP respetando el limite de peticiones del host.
+
+    Args:
+        method (str): Metodo HTTP
+        url (str): Url de la petición
+        **kwargs: Argumentos de `requests.Session.request`
+
+    Returns:
+        req.Response: Respuesta de la API, la ultima recibida si se agotan los reintentos
+    """
+    host = urlsplit(url).hostname
+    session = get_session(host)
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    for attempt in range(MAX_RETRIES + 1):
+        RATE_LIMIT_WAIT_SECONDS.observe(RATE_LIMITER.acquire(host), host=host)
+        with HTTP_REQUEST_SECONDS.time(host=host):
+            response = session.request(method, url, **kwargs)
+        HTTP_RESPONSES.inc(host=host, status=response.status_code)
+        if response.status_code not in THROTTLE_STATUS:
+            RATE_LIMITER.reward(host)
+            return response
+        logger.info(
+            "[HTTP] {} answered {}, retry {} of {}".format(
+                host, response.status_code, attempt + 1, MAX_RETRIES
+            )
+        )
+        RATE_LIMITER.penalize(host, parse_retry_after(response.headers.get("Retry-After")))
+    return response
+
+
+def get(url: str, **kwargs) -> req.Response:
+    """Realiza una petición GET limitada por host"""
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> req.Response:
+    """Realiza una petición POST limitada por host"""
+    return request("POST", url, **kwargs)
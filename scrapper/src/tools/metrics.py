@@ -0,0 +1,209 @@
+"""Metricas de la ingestión en formato de texto de Prometheus.
+
+Contadores, gauges e histogramas con etiquetas, seguros entre hilos, que se exponen en
+`/metrics` en el puerto `METRICS_PORT` (el `containerPort: 5000` del deployment). Con el modo
+`YEAR_POOL=process` solo se exportan las metricas del proceso principal.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.logs.logger import logger
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "5000"))
+# Limites de los histogramas de latencia, en segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Todas las metricas creadas, en orden de creación
+REGISTRY = []
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base de una metrica con etiquetas.
+
+    Args:
+        name (str): Nombre de la metrica
+        help_ (str): Descripción que se muestra en `# HELP`
+        labels (tuple): Nombres de las etiquetas
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.help = help_
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def samples(self) -> list[str]:
+        with self.lock:
+            return [
+                f"{self.name}{_format_labels(self.labels, key)} {value}"
+                for key, value in self.values.items()
+            ]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    """Valor que solo aumenta"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Valor que sube y baja"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Distribución de valores en buckets acumulados.
+
+    Args:
+        buckets (tuple): Limites superiores de los buckets
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS
+    ) -> None:
+        Metric.__init__(self, name, help_, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """Mide la duración del bloque"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, function: callable) -> callable:
+        """Decorador que mide la duración de cada llamada a la función"""
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.time():
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                for bound, value in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {value}")
+                labels = _format_labels(self.labels, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "scrapper_http_request_seconds", "Duración de las peticiones HTTP por host", ("host",)
+)
+HTTP_RESPONSES = Counter(
+    "scrapper_http_responses_total", "Respuestas HTTP por host y codigo", ("host", "status")
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "scrapper_rate_limit_wait_seconds", "Espera por un token del limitador por host", ("host",)
+)
+CROSSREF_CACHE_LOOKUPS = Counter(
+    "scrapper_crossref_cache_lookups_total", "Consultas al cache de crossref", ("result",)
+)
+INSERT_BATCH_SECONDS = Histogram(
+    "scrapper_insert_batch_seconds", "Duración de la inserción de un lote de artículos"
+)
+IDENTITY_CACHE_LOOKUPS = Counter(
+    "scrapper_identity_cache_lookups_total", "Consultas al cache de identidades por tabla",
+    ("table", "result"),
+)
+ARTICLES_INGESTED = Counter(
+    "scrapper_articles_ingested_total", "Artículos insertados por motor y año", ("source", "year")
+)
+QUEUE_DEPTH = Gauge(
+    "scrapper_pipeline_queue_depth", "Páginas esperando entre etapas del pipeline",
+    ("source", "stage"),
+)
+
+
+def render() -> str:
+    """Todas las metricas en formato de texto de Prometheus"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> ThreadingHTTPServer:
+    """Expone `/metrics` en un hilo de fondo, `METRICS_PORT=0` lo desactiva.
+
+    Args:
+        port (int): Puerto donde se escucha
+
+    Returns:
+        ThreadingHTTPServer: Servidor iniciado, None si está desactivado
+    """
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"[Metrics] Serving metrics on port {port}")
+    return server
@@ -0,0 +1,242 @@
+"""Pipeline asincrono de ingestión, corre todos los motores de busqueda al mismo tiempo.
+
+Las etapas se solapan: mientras se descarga una página de resultados, los artículos de la
+página anterior se enriquecen con crossref y la página ya enriquecida se escribe en la base de
+datos junto a su checkpoint.
+Los clientes existentes son sincronos, por lo que cada llamada bloqueante se ejecuta en un hilo
+(`asyncio.to_thread`) y la concurrencia por host se limita con semáforos.
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator
+from src.logs.logger import logger
+from src.database.checkpoints import load_checkpoints, save_checkpoint
+from src.database.known import get_known
+from src.database.tools import batch_scope, insert_batch
+from src.tools.cache import get_cache
+from src.tools.metrics import ARTICLES_INGESTED, QUEUE_DEPTH
+from src.tools.search import CROSSREF_BATCH_SIZE, AbstractSearch, fetch_crossref_many
+
+CROSSREF_HOST = "api.crossref.org"
+# Fin de una etapa
+_DONE = object()
+
+
+def host_limit(host: str) -> int:
+    """Obtiene la cantidad de peticiones simultaneas permitidas para un host.
+    Se configura con `HOST_CONCURRENCY_<HOST>`, por ejemplo `HOST_CONCURRENCY_API_CROSSREF_ORG=4`.
+
+    Args:
+        host (str): Host de la API
+
+    Returns:
+        int: Peticiones simultaneas permitidas
+    """
+    key = "HOST_CONCURRENCY_" + host.upper().replace(".", "_").replace("-", "_")
+    return int(os.getenv(key, os.getenv("HOST_CONCURRENCY", "2")))
+
+
+class SearchAdapter:
+    """Adapta un `AbstractSearch` sincrono al pipeline asincrono.
+
+    Args:
+        search_instance (AbstractSearch): Motor de busqueda a adaptar
+        limits (dict): Semáforos por host compartidos por todo el pipeline
+    """
+
+    def __init__(self, search_instance: AbstractSearch, limits: dict) -> None:
+        self.search = search_instance
+        self.name = search_instance.name
+        self.limits = limits
+        # Artículos que ya están en la base de datos, se carga al iniciar el motor
+        self.known = None
+
+    def semaphore(self, host: str) -> asyncio.Semaphore:
+        """Devuelve el semáforo del host, creandolo si no existe"""
+        if host not in self.limits:
+            self.limits[host] = asyncio.Semaphore(host_limit(host))
+        return self.limits[host]
+
+    async def pages(self, year: str, checkpoint: dict = None) -> AsyncIterator[tuple]:
+        """Entrega las páginas de resultados del motor y sus checkpoints sin bloquear el loop"""
+        iterator = aiter(self.search.apages(year, checkpoint))
+        while True:
+            async with self.semaphore(self.search.host or self.name):
+                page = await anext(iterator, _DONE)
+            if page is _DONE:
+                return
+            yield page
+
+    async def lookup(self, dois: list[str]) -> dict:
+        """Obtiene los registros de crossref de un grupo de DOI con una consulta por lotes"""
+        async with self.semaphore(CROSSREF_HOST):
+            return await asyncio.to_thread(fetch_crossref_many, dois)
+
+    async def enrich(self, publications: list[dict]) -> list[dict]:
+        """Parsea los artículos de una página y completa con crossref los que no están en la base
+        de datos, consultando los grupos de DOI en paralelo. Los ya conocidos se entregan sin
+        crossref para que se combinen con el registro existente al insertar"""
+        claimed, duplicates = self.search.claim_page(publications, self.known)
+        dois = [result["doi"] for result in claimed]
+        messages = {}
+        try:
+            for found in await asyncio.gather(
+                *[
+                    self.lookup(dois[start : start + CROSSREF_BATCH_SIZE])
+                    for start in range(0, len(dois), CROSSREF_BATCH_SIZE)
+                ]
+            ):
+                messages.update(found)
+        except Exception:
+            self.known.release(claimed)
+            raise
+        return self.search.merge_page(claimed, duplicates, messages, self.known)
+
+    def _write(self, year: str, batch: list[dict], checkpoint: dict) -> list[int]:
+        try:
+            with batch_scope(self.search.session) as session:
+                inserted = insert_batch(session, batch, commit=False)
+                save_checkpoint(session, self.name, year, checkpoint)
+        except Exception:
+            self.known.release(batch)
+            raise
+        self.known.add(batch)
+        ARTICLES_INGESTED.inc(len(inserted), source=self.name, year=year)
+        return inserted
+
+    async def write(self, year: str, batch: list[dict], checkpoint: dict) -> list[int]:
+        """Inserta un lote de artículos junto a su checkpoint en una transacción"""
+        return await asyncio.to_thread(self._write, year, batch, checkpoint)
+
+
+class AsyncPipeline:
+    """Corre la ingestión de varios motores de busqueda y años de forma concurrente.
+
+    Cada página de resultados avanza por tres etapas que se solapan: descarga, enriquecimiento
+    (los DOI de la página se consultan a crossref en lotes paralelos) y escritura de la página
+    junto a su checkpoint.
+
+    Ejemplo de uso:
+    ```python
+        pipeline = AsyncPipeline([PubMed(session=s1), ScopusSearch(session=s2)])
+        asyncio.run(pipeline.run("2010", "2024"))
+    ```
+
+    Args:
+        sources (list[AbstractSearch]): Motores de busqueda a ejecutar
+        queue_size (int): Cantidad maxima de páginas esperando en cada cola entre etapas
+    """
+
+    def __init__(
+        self,
+        sources: list[AbstractSearch],
+        queue_size: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "4")),
+    ) -> None:
+        self.limits = {}
+        self.sources = [SearchAdapter(source, self.limits) for source in sources]
+        self.queue_size = queue_size
+
+    async def _fetch(
+        self, source: SearchAdapter, years: list[str], checkpoints: dict, queue: asyncio.Queue
+    ) -> None:
+        """Etapa 1: descarga las páginas de cada año"""
+        for year in years:
+            checkpoint = checkpoints.get(year)
+            if checkpoint and checkpoint["completed"]:
+                logger.info(f"[Pipeline] [{source.name}] Year {year} already harvested")
+                continue
+            logger.info(f"[Pipeline] [{source.name}] Fetching year {year}")
+            try:
+                async for publications, progress in source.pages(year, checkpoint):
+                    await queue.put((year, publications, progress))
+                    QUEUE_DEPTH.set(queue.qsize(), source=source.name, stage="fetched")
+            except Exception as error:
+                logger.error(
+                    f"[Pipeline] [{source.name}] Fetching year {year} failed: {error}"
+                )
+                await queue.put((year, None, None))
+                continue
+            await queue.put((year, [], {"completed": True}))
+        await queue.put(_DONE)
+
+    async def _enrich(self, source: SearchAdapter, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        """Etapa 2: parsea y enriquece con crossref los artículos de cada página"""
+        while (item := await inbox.get()) is not _DONE:
+            QUEUE_DEPTH.set(inbox.qsize(), source=source.name, stage="fetched")
+            year, publications, progress = item
+            batch = None
+            if publications is not None:
+                try:
+                    batch = await source.enrich(publications)
+                except Exception as error:
+                    logger.error(f"[Pipeline] [{source.name}] Enrichment failed: {error}")
+            await outbox.put((year, batch, progress))
+            QUEUE_DEPTH.set(outbox.qsize(), source=source.name, stage="enriched")
+        await outbox.put(_DONE)
+
+    async def _write(self, source: SearchAdapter, inbox: asyncio.Queue) -> int:
+        """Etapa 3: escribe cada página y su checkpoint en la base de datos. Desde la primera
+        página que falla (`batch` None o un error al insertar) no se escriben mas checkpoints de
+        ese año, asi la siguiente ejecución lo retoma desde la ultima página confirmada."""
+        written, failed = 0, set()
+        while (item := await inbox.get()) is not _DONE:
+            QUEUE_DEPTH.set(inbox.qsize(), source=source.name, stage="enriched")
+            year, batch, _ = item
+            if year in failed:
+                # La página se vuelve a descargar en la siguiente ejecución
+                source.known.release(batch or [])
+                continue
+            if batch is not None:
+                try:
+                    written += len(await source.write(*item))
+                    continue
+                except Exception as error:
+                    logger.error(f"[Pipeline] [{source.name}] Insert failed: {error}")
+            failed.add(year)
+            logger.error(
+                f"[Pipeline] [{source.name}] Year {year} stopped at its last checkpoint"
+            )
+        logger.info(f"[Pipeline] [{source.name}] {written} articles inserted")
+        return written
+
+    async def run_source(self, source: SearchAdapter, years: list[str]) -> int:
+        """Corre las tres etapas de un motor de busqueda"""
+        checkpoints = await asyncio.to_thread(
+            load_checkpoints, source.search.session, source.name
+        )
+        source.known = await asyncio.to_thread(get_known, source.search.session)
+        fetched = asyncio.Queue(self.queue_size)
+        enriched = asyncio.Queue(self.queue_size)
+        results = await asyncio.gather(
+            self._fetch(source, years, checkpoints, fetched),
+            self._enrich(source, fetched, enriched),
+            self._write(source, enriched),
+        )
+        return results[-1]
+
+    async def run(self, min_year: str, max_year: str) -> dict:
+        """Corre todos los motores de busqueda en paralelo para el rango de años.
+
+        Args:
+            min_year (str): Primer año a buscar
+            max_year (str): Año final (no incluido)
+
+        Returns:
+            dict: Cantidad de artículos insertados por motor, None si el motor falló
+        """
+        years = [str(year) for year in range(int(min_year), int(max_year))]
+        # Un motor que falla no detiene a los demas
+        totals = await asyncio.gather(
+            *[self.run_source(source, years) for source in self.sources], return_exceptions=True
+        )
+        cache = get_cache()
+        if cache is not None:
+            logger.info(f"[Pipeline] Crossref cache: {cache.stats()}")
+        results = {}
+        for source, total in zip(self.sources, totals):
+            if isinstance(total, BaseException):
+                logger.error(f"[Pipeline] [{source.name}] Source failed: {total}")
+                total = None
+            results[source.name] = total
+        return results
@@ -0,0 +1,156 @@
+"""Limitador de peticiones por host basado en token buckets.
+
+Cada host tiene su propio bucket, la tasa se configura con `RATE_LIMIT_<HOST>` (peticiones por
+segundo) y `RATE_BURST_<HOST>` (tamaño del bucket), donde `<HOST>` es el host en mayusculas con
+los puntos reemplazados por guiones bajos, por ejemplo `RATE_LIMIT_API_CROSSREF_ORG=20`.
+Si varios procesos comparten la cuota, `RATE_LIMIT_SCALE` indica la fracción de cada uno y
+`RATE_LIMIT_SCALE_<HOST>` la de un host en particular.
+Cuando la API responde 429 o 503 la tasa del host se reduce a la mitad y se respeta `Retry-After`,
+luego se recupera de forma gradual con cada respuesta exitosa.
+"""
+
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from src.logs.logger import logger
+
+EUTILS_HOST = "eutils.ncbi.nlm.nih.gov"
+# Tasas por defecto de cada API (peticiones por segundo)
+DEFAULT_RATES = {
+    # NCBI permite 3 req/s sin api key y 10 req/s con api key (ver `default_rate`)
+    EUTILS_HOST: 3.0,
+    "api.elsevier.com": 6.0,
+    # Pool "polite" de crossref
+    "api.crossref.org": 20.0,
+}
+DEFAULT_RATE = float(os.getenv("RATE_LIMIT_DEFAULT", "2"))
+# Fracción minima de la tasa configurada a la que puede bajar el backoff adaptativo
+MIN_RATE_FACTOR = 0.05
+
+
+def env_key(prefix: str, host: str) -> str:
+    """Nombre de la variable de entorno de un host"""
+    return prefix + host.upper().replace(".", "_").replace("-", "_")
+
+
+def default_rate(host: str) -> float:
+    """Tasa por defecto de un host, la de eutils depende de si hay `NCBI_API_KEY`"""
+    if host == EUTILS_HOST and os.getenv("NCBI_API_KEY"):
+        return 10.0
+    return DEFAULT_RATES.get(host, DEFAULT_RATE)
+
+
+def parse_retry_after(value: str) -> float:
+    """Convierte la cabecera `Retry-After` en segundos de espera.
+
+    Args:
+        value (str): Valor de la cabecera, en segundos o como fecha HTTP
+
+    Returns:
+        float: Segundos a esperar, None si la cabecera no es valida
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket seguro entre hilos con backoff adaptativo.
+
+    Args:
+        rate (float): Peticiones por segundo permitidas
+        burst (float): Cantidad maxima de tokens acumulados
+    """
+
+    def __init__(self, rate: float, burst: float = None) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Bloquea hasta que haya un token disponible.
+
+        Returns:
+            float: Segundos que se esperó
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, retry_after: float = None) -> None:
+        """Reduce la tasa a la mitad y bloquea el bucket el tiempo indicado por la API"""
+        with self.lock:
+            self.rate = max(self.rate / 2, self.max_rate * MIN_RATE_FACTOR)
+            self.tokens = 0
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    def reward(self) -> None:
+        """Recupera la tasa de forma gradual despues de una respuesta exitosa"""
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class RateLimiter:
+    """Registro de token buckets por host, compartido por todos los clientes HTTP."""
+
+    def __init__(self) -> None:
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        """Devuelve el bucket del host, creandolo con la configuracion del entorno si no existe"""
+        with self.lock:
+            if host not in self.buckets:
+                rate = float(os.getenv(env_key("RATE_LIMIT_", host), default_rate(host)))
+                # Fraccion de la cuota que le corresponde a este proceso
+                scale = os.getenv("RATE_LIMIT_SCALE", "1")
+                rate *= float(os.getenv(env_key("RATE_LIMIT_SCALE_", host), scale))
+                burst = os.getenv(env_key("RATE_BURST_", host))
+                self.buckets[host] = TokenBucket(rate, float(burst) if burst else None)
+                logger.debug(f"[RateLimiter] {host} limited to {rate} req/s")
+            return self.buckets[host]
+
+    def acquire(self, host: str) -> float:
+        """Espera un token del host"""
+        return self.bucket(host).acquire()
+
+    def penalize(self, host: str, retry_after: float = None) -> None:
+        """Aplica backoff al host"""
+        bucket = self.bucket(host)
+        bucket.penalize(retry_after)
+        logger.info(
+            f"[RateLimiter] {host} throttled, rate lowered to {bucket.rate:.2f} req/s"
+        )
+
+    def reward(self, host: str) -> None:
+        """Informa una respuesta exitosa del host"""
+        self.bucket(host).reward()
+
+
+RATE_LIMITER = RateLimiter()
@@ -0,0 +1,87 @@
+"""Registro de los motores de busqueda disponibles.
+
+Los motores incluidos se registran con el decorador `register`. Los paquetes externos pueden
+agregar motores sin modificar este repositorio declarando un entry point en el grupo
+`scientific_scrapper.sources`, por ejemplo en su `pyproject.toml`:
+
+    ```toml
+        [project.entry-points."scientific_scrapper.sources"]
+        openalex = "openalex_source:OpenAlexSearch"
+    ```
+
+Los motores que se ejecutan se eligen con `SOURCES`, una lista separada por comas de nombres
+registrados (por defecto `pubmed,scopus`).
+"""
+
+import os
+import threading
+from importlib.metadata import entry_points
+from src.logs.logger import logger
+
+ENTRY_POINT_GROUP = "scientific_scrapper.sources"
+
+_REGISTRY = {}
+_LOADED = False
+_LOCK = threading.Lock()
+
+
+def register(source_class: type) -> type:
+    """Decorador que registra un motor de busqueda bajo su atributo `name`.
+
+    Args:
+        source_class (type): Subclase de `AbstractSearch`
+
+    Returns:
+        type: La misma clase
+    """
+    existing = _REGISTRY.get(source_class.name)
+    if existing is not None and existing is not source_class:
+        raise ValueError(f"Source {source_class.name} is already registered by {existing}")
+    _REGISTRY[source_class.name] = source_class
+    return source_class
+
+
+def _load() -> None:
+    """Importa los motores incluidos y los declarados como entry points, una sola vez"""
+    global _LOADED
+    with _LOCK:
+        if _LOADED:
+            return
+        # Los motores incluidos se registran al importar el modulo
+        import src.tools.search  # noqa: F401
+
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                register(entry_point.load())
+            except Exception as error:
+                logger.error(f"[Registry] Could not load source {entry_point.name}: {error}")
+        _LOADED = True
+
+
+def available_sources() -> dict:
+    """Motores registrados, por nombre"""
+    _load()
+    return dict(_REGISTRY)
+
+
+def enabled_sources(names: str = None) -> list[type]:
+    """Clases de los motores habilitados, en el orden de la configuración.
+
+    Args:
+        names (str): Nombres separados por coma, por defecto la variable `SOURCES`
+
+    Returns:
+        list[type]: Clases de los motores habilitados
+    """
+    names = names or os.getenv("SOURCES", "pubmed,scopus")
+    registry = available_sources()
+    sources = []
+    for name in (name.strip() for name in names.split(",")):
+        if not name:
+            continue
+        if name not in registry:
+            raise ValueError(
+                f"Unknown source {name}, available sources: {', '.join(sorted(registry))}"
+            )
+        sources.append(registry[name])
+    return sources
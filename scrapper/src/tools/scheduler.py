@@ -0,0 +1,135 @@
+"""Reparte el rango de años de cada motor de busqueda en un pool de workers.
+
+Los años son independientes entre si, por lo que cada uno es una unidad de trabajo que corre en
+su propio worker, con su propia sesion de base de datos y su propia instancia del motor. Los
+workers de un mismo proceso comparten el limitador de peticiones por host; en modo `process` la
+tasa de cada host se divide entre los procesos que lo llaman (`RATE_LIMIT_SCALE_<HOST>`).
+"""
+
+import os
+import time
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+from src.logs.logger import logger
+from src.tools.ratelimit import env_key
+from src.tools.search import CROSSREF_URL, AbstractSearch
+
+YEAR_WORKERS = int(os.getenv("YEAR_WORKERS", "4"))
+# thread o process
+YEAR_POOL = os.getenv("YEAR_POOL", "thread")
+
+
+def host_processes(sources: list[type[AbstractSearch]], workers: int) -> dict:
+    """Cantidad de procesos que llaman a cada host en modo `process`: los del pool de cada
+    motor que usa el host, y los de todos los motores para crossref.
+
+    Args:
+        sources (list[type[AbstractSearch]]): Clases de los motores de busqueda
+        workers (int): Procesos del pool de cada motor
+
+    Returns:
+        dict: Procesos por host
+    """
+    processes = Counter()
+    for source_class in sources:
+        processes[source_class.host or source_class.name] += workers
+    processes[urlsplit(CROSSREF_URL).hostname] = workers * len(sources)
+    return dict(processes)
+
+
+def _process_initializer(workers: int, processes: dict) -> None:
+    """Prepara un proceso del pool: reparte la cuota de cada host entre los procesos que lo
+    llaman y descarta las conexiones heredadas del proceso padre"""
+    # Los hosts que no están en `processes` solo los llama el pool de este motor
+    os.environ["RATE_LIMIT_SCALE"] = str(1 / workers)
+    for host, count in processes.items():
+        os.environ[env_key("RATE_LIMIT_SCALE_", host)] = str(1 / count)
+    from src.database.connection import dispose_engine
+
+    dispose_engine()
+
+
+def run_year(source_class: type, year: str) -> dict:
+    """Cosecha un año de un motor de busqueda con una sesion propia.
+
+    Args:
+        source_class (type): Clase del motor de busqueda
+        year (str): Año de publicación
+
+    Returns:
+        dict: Motor, año, artículos insertados y segundos que tomó
+    """
+    from src.database.connection import LocalSession
+
+    session = LocalSession()
+    started = time.monotonic()
+    try:
+        inserted = source_class(session=session)(year)
+    finally:
+        session.close()
+    return {
+        "source": source_class.name,
+        "year": year,
+        "inserted": inserted or 0,
+        "seconds": time.monotonic() - started,
+    }
+
+
+def schedule(
+    sources: list[type[AbstractSearch]],
+    min_year: str,
+    max_year: str,
+    workers: int = YEAR_WORKERS,
+    mode: str = YEAR_POOL,
+) -> list[dict]:
+    """Cosecha todos los años de cada motor en un pool de `workers` por motor.
+
+    Args:
+        sources (list[type[AbstractSearch]]): Clases de los motores de busqueda
+        min_year (str): Primer año
+        max_year (str): Año final (no incluido)
+        workers (int): Años que se procesan en paralelo por motor
+        mode (str): `thread` o `process`
+
+    Returns:
+        list[dict]: Resultado de cada año, ver `run_year`
+    """
+    years = [str(year) for year in range(int(min_year), int(max_year))]
+    processes = host_processes(sources, workers)
+    pools, futures = [], {}
+    for source_class in sources:
+        if mode == "process":
+            pool = ProcessPoolExecutor(
+                workers, initializer=_process_initializer, initargs=(workers, processes)
+            )
+        else:
+            pool = ThreadPoolExecutor(workers, thread_name_prefix=source_class.name)
+        pools.append(pool)
+        for year in years:
+            futures[pool.submit(run_year, source_class, year)] = (source_class.name, year)
+
+    results = []
+    future: Future
+    for future in as_completed(futures):
+        source, year = futures[future]
+        try:
+            result = future.result()
+        except Exception as error:
+            logger.error(f"[Scheduler] {source} {year} failed: {error}")
+            continue
+        results.append(result)
+        logger.info(
+            "[Scheduler] {} {} done: {} articles in {:.1f}s ({:.2f} articles/s), {}/{} years".format(
+                source,
+                year,
+                result["inserted"],
+                result["seconds"],
+                result["inserted"] / result["seconds"] if result["seconds"] else 0.0,
+                len(results),
+                len(futures),
+            )
+        )
+    for pool in pools:
+        pool.shutdown()
+    return results
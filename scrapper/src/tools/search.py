@@ -1,11 +1,223 @@
 """Es un motor de ingestión de articulos cientificos para su posterior analisis."""
 
-from abc import ABC
-from time import sleep
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from functools import wraps
+from typing import AsyncIterator, Iterator
+import asyncio
 import os
-import requests as req
+from src.tools import client
+from src.tools.cache import MISS, get_cache
+from src.tools.capture import capture
+from src.tools.metrics import ARTICLES_INGESTED
+from src.tools.registry import register
 from src.logs.logger import logger
-from src.database.tools import insert_data
+from src.database.tools import batch_scope, insert_batch
+from src.database.checkpoints import load_checkpoints, save_checkpoint
+from src.database.watermarks import save_watermark
+from src.database.known import KnownArticles, get_known
+from src.database.normalize import normalize_doi
+
+# Las urls base se pueden cambiar para apuntar a un servidor local (ver benchmark.py)
+EUTILS_URL = os.getenv("EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+# Cantidad de identificadores por llamada a esummary (eutils permite hasta 10.000 con historial)
+PUBMED_BATCH_SIZE = int(os.getenv("PUBMED_BATCH_SIZE", "500"))
+SCOPUS_URL = os.getenv("SCOPUS_URL", "https://api.elsevier.com/content/search/scopus")
+CROSSREF_URL = os.getenv("CROSSREF_URL", "https://api.crossref.org")
+# Resultados por página, 25 es el maximo de una api key estandar (200 con suscripción)
+SCOPUS_PAGE_SIZE = int(os.getenv("SCOPUS_PAGE_SIZE", "25"))
+# Scopus no permite que `start` supere este valor
+SCOPUS_MAX_START = 5000
+# DOIs por consulta `/works?filter=doi:...` a crossref
+CROSSREF_BATCH_SIZE = int(os.getenv("CROSSREF_BATCH_SIZE", "50"))
+
+
+class SearchError(Exception):
+    """La API de un motor de busqueda respondió con un error. Se distingue de una busqueda sin
+    resultados para no marcar como cosechado un año o un intervalo que no se pudo descargar."""
+
+
+def eutils_key() -> dict:
+    """Parametro `api_key` de eutils si está configurado, con él NCBI permite 10 req/s en vez de 3"""
+    api_key = os.getenv("NCBI_API_KEY")
+    return {"api_key": api_key} if api_key else {}
+
+
+def fetch_crossref(doi: str, refresh: bool = False) -> dict:
+    """Obtiene el registro de crossref de un artículo a través de su DOI, usando primero el cache
+    en disco
+
+    Args:
+        doi (str): DOI del artículo
+        refresh (bool): Si es True no se lee el cache, la respuesta lo actualiza
+
+    Returns:
+        dict: Campo `message` de la respuesta de crossref o None si la petición falla
+    """
+    cache = get_cache()
+    if cache is not None and not refresh:
+        message = cache.get(doi)
+        if message is not MISS:
+            logger.debug("[crossref_helper] Cache hit for {}".format(doi))
+            capture("crossref.work", message, doi=doi)
+            return message
+    url = f"{CROSSREF_URL}/works/{doi}"
+    response = client.get(url)
+    if response.status_code != 200:
+        logger.debug(
+            "[crossref_helper] Response was not sucessful. Response status code: {}".format(
+                response.status_code
+            )
+        )
+        # Solo se guardan los DOI que no existen, los demas errores pueden ser temporales
+        if response.status_code == 404:
+            capture("crossref.work", None, doi=doi)
+            if cache is not None:
+                cache.set(doi, None)
+        return None
+    message = response.json()["message"]
+    capture("crossref.work", message, doi=doi)
+    if cache is not None:
+        cache.set(doi, message)
+    return message
+
+
+def _fetch_crossref_batch(dois: list[str]) -> dict:
+    """Resuelve varios DOI con una sola consulta `/works?filter=doi:A,doi:B`.
+
+    Args:
+        dois (list[str]): DOI de los artículos, sin comas
+
+    Returns:
+        dict: Registro de crossref de cada DOI (None si crossref no lo tiene), None si la
+        consulta falla
+    """
+    params = {
+        "filter": ",".join(f"doi:{doi}" for doi in dois),
+        "rows": len(dois),
+    }
+    try:
+        response = client.get(f"{CROSSREF_URL}/works", params=params)
+    except Exception as error:
+        logger.error(f"[crossref_helper] Batch lookup failed: {error}")
+        return None
+    if response.status_code != 200:
+        logger.error(
+            "[crossref_helper] Batch lookup failed with status code: {}".format(
+                response.status_code
+            )
+        )
+        return None
+    items = {
+        normalize_doi(item.get("DOI")): item
+        for item in response.json()["message"].get("items", [])
+    }
+    return {doi: items.get(normalize_doi(doi)) for doi in dois}
+
+
+def fetch_crossref_many(dois: list[str], refresh: bool = False) -> dict:
+    """Obtiene los registros de crossref de varios DOI. Se usa primero el cache en disco, los
+    que faltan se piden de a `CROSSREF_BATCH_SIZE` con el filtro `doi:` y si una consulta falla
+    sus DOI se piden uno por uno.
+
+    Args:
+        dois (list[str]): DOI de los artículos
+        refresh (bool): Si es True no se lee el cache, las respuestas lo actualizan
+
+    Returns:
+        dict: Campo `message` de crossref de cada DOI, None si no se encontró
+    """
+    cache, messages, missing, single = get_cache(), {}, [], []
+    for doi in dict.fromkeys(filter(None, dois)):
+        message = cache.get(doi) if cache is not None and not refresh else MISS
+        if message is not MISS:
+            capture("crossref.work", message, doi=doi)
+            messages[doi] = message
+        elif "," in doi:
+            # Una coma dentro del DOI rompería la sintaxis del filtro
+            single.append(doi)
+        else:
+            missing.append(doi)
+    for start in range(0, len(missing), CROSSREF_BATCH_SIZE):
+        chunk = missing[start : start + CROSSREF_BATCH_SIZE]
+        found = _fetch_crossref_batch(chunk)
+        if found is None:
+            single.extend(chunk)
+            continue
+        for doi, message in found.items():
+            capture("crossref.work", message, doi=doi)
+            if cache is not None:
+                cache.set(doi, message)
+            messages[doi] = message
+    for doi in single:
+        messages[doi] = fetch_crossref(doi, refresh=refresh)
+    return messages
+
+
+def merge_crossref(result: dict, message: dict) -> dict:
+    """Combina la metadata de un artículo con el registro de crossref
+
+    Args:
+        result (dict): Metadata del artículo obtenida de PubMed o Scopus
+        message (dict): Registro de crossref del artículo, None si no se encontró
+
+    Returns:
+        dict: Metadata del artículo con información de crossref
+    """
+    if message is None:
+        return dict(**result, issn=None, url=None, reference_count=None)
+    issn = message.get("ISSN", None)
+    if isinstance(issn, list):
+        issn = issn[0]
+    url = message.get("URL", None)
+    authors = []
+    if "author" not in message:
+        logger.debug(
+            "[crossref_helper] Authors not found in the response, discarding..."
+        )
+        return None
+    for author in message["author"]:
+        # Affiliations
+        affiliations = []
+        if "affiliation" in author:
+            for affiliation in author["affiliation"]:
+                affiliations.append(affiliation["name"])
+
+        authors.append(
+            {
+                "ORCID": author.get("ORCID", None),
+                "family": author.get("family", None),
+                "given": author.get("given", None),
+                "sequence": author.get("sequence", None),
+                "affiliation": affiliations,
+            }
+        )
+    funders = []
+    if "funder" in message:
+        for funder in message["funder"]:
+            funders.append(
+                {
+                    "name": funder.get("name", None),
+                    "doi": funder.get("DOI", None),
+                    "url": funder.get("url", None),
+                    "award": funder.get("award", None),
+                },
+            )
+
+    reference_count = message["reference-count"]
+    publisher = message["publisher"]
+    if authors:
+        result["authors"] = authors
+    if funders:
+        result["funders"] = funders
+
+    return dict(
+        **result,
+        issn=issn,
+        url=url,
+        reference_count=reference_count,
+        publisher=publisher,
+    )
 
 
 def crossref_helper(parse_function: callable) -> dict:
@@ -18,76 +230,14 @@ def crossref_helper(parse_function: callable) -> dict:
         dict: Metadata del artículo con información de crossref
     """
 
+    @wraps(parse_function)
     def cross_ref_appender(*args, **kwargs):
         result = parse_function(*args, **kwargs)
         if result is None:
             logger.debug("[crossref_helper] DOI not found in the result")
             return None
-        logger.info("[crossref_helper] Crossref found")
-        doi = result["doi"]
-        url = f"https://api.crossref.org/works/{doi}"
-        response = req.get(url)
-        if response.status_code != 200:
-            return dict(**result, issn=None, url=None, reference_count=None)
-        else:
-            logger.debug(
-                "[crossref_helper] Response was not sucessful. Response status code: {}".format(
-                    response.status_code
-                )
-            )
-        response = response.json()
-        issn = response["message"].get("ISSN", None)
-        if isinstance(issn, list):
-            issn = issn[0]
-        url = response["message"].get("URL", None)
-        authors = []
-        if "author" not in response["message"]:
-            logger.debug(
-                "[crossref_helper] Authors not found in the response, discarding..."
-            )
-            return None
-        for author in response["message"]["author"]:
-            # Affiliations
-            affiliations = []
-            if "affiliation" in author:
-                for affiliation in author["affiliation"]:
-                    affiliations.append(affiliation["name"])
-
-            authors.append(
-                {
-                    "ORCID": author.get("ORCID", None),
-                    "family": author.get("family", None),
-                    "given": author.get("given", None),
-                    "sequence": author.get("sequence", None),
-                    "affiliation": affiliations,
-                }
-            )
-        funders = []
-        if "funder" in response["message"]:
-            for funder in response["message"]["funder"]:
-                funders.append(
-                    {
-                        "name": funder.get("name", None),
-                        "doi": funder.get("DOI", None),
-                        "url": funder.get("url", None),
-                        "award": funder.get("award", None),
-                    },
-                )
-
-        reference_count = response["message"]["reference-count"]
-        publisher = response["message"]["publisher"]
-        if authors:
-            result["authors"] = authors
-        if funders:
-            result["funders"] = funders
-
-        return dict(
-            **result,
-            issn=issn,
-            url=url,
-            reference_count=reference_count,
-            publisher=publisher,
-        )
+        logger.debug("[crossref_helper] Crossref found")
+        return merge_crossref(result, fetch_crossref(result["doi"]))
 
     return cross_ref_appender
 
@@ -96,15 +246,26 @@ def crossref_helper(parse_function: callable) -> dict:
 class AbstractSearch(ABC):
     """Clase abstracta que representa un motor de búsqueda
 
+    Un motor debe implementar `pages`, `fetch_page` y `parse`, y recibir la sesion de sqlalchemy
+    en su constructor (`Motor(session=...)`). Los motores con un cliente asincrono pueden
+    sobreescribir `apages` y `afetch_page`, por defecto ejecutan la versión sincrona en un hilo.
+    Para que el motor se pueda habilitar con `SOURCES` se registra con `src.tools.registry.register`.
+
     Args:
         ABC (ABC): Clase abstracta de Python
     """
 
+    # Nombre del motor y host de su API, se usan para los logs y los limites de concurrencia
+    name = "abstract"
+    host = None
+    # Cantidad de artículos por página de `fetch_page`
+    page_size = 1
+
     def __init__(self) -> None:
         """Base para un motor de busqueda de articulos cientificos."""
         pass
 
-    def search(self, year: str) -> list[str]:
+    def search(self, year: str) -> Iterator[str]:
         """Método que realiza la búsqueda de artículos"""
         pass
 
@@ -116,8 +277,217 @@ class AbstractSearch(ABC):
         """Método que busca el DOI de un artículo"""
         pass
 
+    @abstractmethod
+    def pages(self, year: str, checkpoint: dict = None) -> Iterator[tuple[list[dict], dict]]:
+        """Método que entrega la metadata cruda de los artículos de un año, página por página,
+        junto al checkpoint que permite continuar despues de esa página"""
+
+    @abstractmethod
+    def fetch_page(self, year: str, page: int) -> tuple[list[dict], int]:
+        """Método que obtiene una página de resultados y el total de resultados del año"""
+
+    @abstractmethod
+    def parse(self, publication: dict) -> dict:
+        """Método que parsea la metadata de un artículo sin consultar crossref"""
+
+    def delta(self, since: date, until: date) -> Iterator[tuple[list[dict], dict]]:
+        """Método que entrega, página por página, solo los artículos agregados o modificados en
+        la fuente entre dos días (incluidos). Los motores que no lo implementan no admiten la
+        cosecha incremental."""
+        raise NotImplementedError(f"{self.name} does not support incremental harvesting")
+
+    async def apages(
+        self, year: str, checkpoint: dict = None
+    ) -> AsyncIterator[tuple[list[dict], dict]]:
+        """Versión asincrona de `pages`, cada página se obtiene en un hilo"""
+        iterator = self.pages(year, checkpoint)
+        done = object()
+        while (page := await asyncio.to_thread(next, iterator, done)) is not done:
+            yield page
+
+    async def afetch_page(self, year: str, page: int) -> tuple[list[dict], int]:
+        """Versión asincrona de `fetch_page`, se ejecuta en un hilo"""
+        return await asyncio.to_thread(self.fetch_page, year, page)
+
+    @crossref_helper
+    def parse_result(self, publication: dict) -> dict:
+        """Parsea la metadata de un artículo y usa información de crossref para completarla.
+
+        Args:
+            publication (dict): Metadata del articulo.
+
+        Returns:
+            dict: Información necesaria para el analisis.
+        """
+        return self.parse(publication)
+
+    def parse_new(self, publication: dict, known: KnownArticles) -> dict:
+        """Parsea un artículo y lo completa con crossref solo si no está en la base de datos.
+
+        Args:
+            publication (dict): Metadata del articulo.
+            known (KnownArticles): Artículos que ya están en la base de datos
+
+        Returns:
+            dict: Información necesaria para el analisis, None si el artículo ya existe o no
+            tiene DOI. El llamador confirma la reserva con `known.add` o la libera con
+            `known.release`
+        """
+        result = self.parse(publication)
+        if result is None:
+            logger.debug("[crossref_helper] DOI not found in the result")
+            return None
+        if not known.claim(result):
+            logger.debug(f"[{self.name}] Article {result['doi']} already known, skipping...")
+            return None
+        merged = merge_crossref(result, fetch_crossref(result["doi"]))
+        if merged is None:
+            known.release([result])
+        return merged
+
+    def claim_page(self, publications: list[dict], known: KnownArticles) -> tuple[list, list]:
+        """Parsea una página de artículos y reserva los que no están en la base de datos.
+
+        Args:
+            publications (list[dict]): Metadata cruda de los articulos de la página
+            known (KnownArticles): Artículos que ya están en la base de datos
+
+        Returns:
+            tuple[list, list]: Artículos reservados, que se completan con crossref, y artículos
+            ya conocidos o reservados por otra fuente, que solo se combinan con el existente
+        """
+        claimed, duplicates = [], []
+        for publication in publications:
+            result = self.parse(publication)
+            if result is None:
+                logger.debug("[crossref_helper] DOI not found in the result")
+            elif known.claim(result):
+                claimed.append(result)
+            else:
+                logger.debug(f"[{self.name}] Article {result['doi']} already known, merging...")
+                duplicates.append(result)
+        return claimed, duplicates
+
+    @staticmethod
+    def merge_page(
+        claimed: list[dict], duplicates: list[dict], messages: dict, known: KnownArticles
+    ) -> list[dict]:
+        """Combina los artículos de una página con sus registros de crossref. Los reservados que
+        se descartan (crossref no tiene sus autores) no se insertan, por lo que se libera su
+        reserva para que no queden pendientes ni se tomen como duplicados mas adelante.
+
+        Args:
+            claimed (list[dict]): Artículos reservados por `claim_page`
+            duplicates (list[dict]): Artículos ya conocidos o reservados por otra fuente
+            messages (dict): Registro de crossref de cada DOI consultado
+            known (KnownArticles): Artículos que ya están en la base de datos
+
+        Returns:
+            list[dict]: Metadata de cada artículo, None en los descartados
+        """
+        batch = [merge_crossref(result, messages.get(result["doi"])) for result in claimed]
+        known.release([result for result, merged in zip(claimed, batch) if merged is None])
+        return batch + [
+            merge_crossref(result, messages.get(result["doi"])) for result in duplicates
+        ]
+
+    def parse_page(
+        self, publications: list[dict], known: KnownArticles, refresh: bool = False
+    ) -> list[dict]:
+        """Parsea una página de artículos y completa con crossref los que no están en la base de
+        datos, resolviendo todos sus DOI en consultas por lotes. Los artículos ya conocidos se
+        entregan sin crossref para que `insert_batch` complete con ellos el registro existente.
+
+        Las reservas de la página se confirman con `known.add` despues de insertar el lote, o se
+        liberan con `known.release` si la inserción falla.
+
+        Args:
+            publications (list[dict]): Metadata cruda de los articulos de la página
+            known (KnownArticles): Artículos que ya están en la base de datos
+            refresh (bool): Si es True tambien se consultan los artículos conocidos, sin usar el
+                cache, para actualizar sus registros (ver `harvest_delta`)
+
+        Returns:
+            list[dict]: Información necesaria para el analisis de cada artículo
+        """
+        claimed, duplicates = self.claim_page(publications, known)
+        lookup = claimed + duplicates if refresh else claimed
+        try:
+            messages = fetch_crossref_many([result["doi"] for result in lookup], refresh=refresh)
+        except Exception:
+            known.release(claimed)
+            raise
+        return self.merge_page(claimed, duplicates, messages, known)
+
+    def harvest(self, year: str) -> int:
+        """Busca los artículos de un año y los inserta en la base de datos, página por página.
+        Cada página se confirma junto a su checkpoint, por lo que si el proceso se reinicia la
+        busqueda continua desde la ultima página insertada. Si una página falla el error se
+        propaga y el año no se marca como completo, la siguiente ejecución lo retoma.
+
+        Args:
+            year (str): Año de publicación de los articulos
+
+        Returns:
+            int: Cantidad de artículos insertados
+        """
+        checkpoint = load_checkpoints(self.session, self.name).get(str(year))
+        if checkpoint and checkpoint["completed"]:
+            logger.info(f"[{self.name}] Year {year} already harvested, skipping...")
+            return 0
+        if checkpoint:
+            logger.info(f"[{self.name}] Resuming year {year} from {checkpoint['offset']}")
+        inserted, known = 0, get_known(self.session)
+        for publications, progress in self.pages(year, checkpoint):
+            batch = self.parse_page(publications, known)
+            try:
+                with batch_scope(self.session) as session:
+                    ids = insert_batch(session, batch, commit=False)
+                    save_checkpoint(session, self.name, year, progress)
+            except Exception:
+                known.release(batch)
+                raise
+            known.add(batch)
+            inserted += len(ids)
+            ARTICLES_INGESTED.inc(len(ids), source=self.name, year=year)
+        with batch_scope(self.session) as session:
+            save_checkpoint(session, self.name, year, {"completed": True})
+        return inserted
+
+    def harvest_delta(self, since: date, until: date) -> int:
+        """Inserta los artículos agregados o modificados en la fuente entre dos días y avanza la
+        marca de agua del motor hasta `until`. Los artículos que ya están en la base de datos se
+        vuelven a consultar en crossref y se actualizan con los campos que cambiaron. La marca
+        solo se guarda si todo el intervalo se cosechó, si una página falla el error se propaga
+        y la siguiente ejecución repite el intervalo.
+
+        Args:
+            since (date): Primer día del intervalo
+            until (date): Ultimo día del intervalo
+
+        Returns:
+            int: Cantidad de artículos insertados
+        """
+        logger.info(f"[{self.name}] Harvesting records changed from {since} to {until}")
+        inserted, known = 0, get_known(self.session)
+        for publications, _ in self.delta(since, until):
+            batch = self.parse_page(publications, known, refresh=True)
+            try:
+                with batch_scope(self.session) as session:
+                    ids = insert_batch(session, batch, commit=False, refresh=True)
+            except Exception:
+                known.release(batch)
+                raise
+            known.add(batch)
+            inserted += len(ids)
+            ARTICLES_INGESTED.inc(len(ids), source=self.name, year="delta")
+        with batch_scope(self.session) as session:
+            save_watermark(session, self.name, until)
+        return inserted
+
 
 # Definir una estructura que represente un motor de búsqueda
+@register
 class PubMed(AbstractSearch):
     """Es un motor de busqueda de articulos cientificos que toma la información que se necesita para el analisis
     por pais y año.
@@ -136,6 +506,10 @@ class PubMed(AbstractSearch):
         AbstractSearch (AbstractSearch): Define los métodos base que debe tener un motor de busqueda
     """
 
+    name = "pubmed"
+    host = "eutils.ncbi.nlm.nih.gov"
+    page_size = PUBMED_BATCH_SIZE
+
     def __init__(self, session) -> None:
         """Inicializa el motor de busqueda de PubMed
 
@@ -145,40 +519,79 @@ class PubMed(AbstractSearch):
         AbstractSearch.__init__(self)
         self.session = session
 
-    def search(self, year: str) -> list[str]:
-        """Realiza la busqueda de articulos en PubMed, utilizando la API de eutils
-
+    def search_history(
+        self, year: str, retstart: int = 0, retmax: int = 0, window: tuple = None
+    ) -> dict:
+        """Realiza la busqueda en esearch dejando los resultados en el historial de eutils,
+        de esta forma se pueden pedir los resumenes por lotes usando `WebEnv` y `query_key`.
 
         Args:
             year (str): Año de publicación de los articulos
+            retstart (int): Indice del primer identificador a devolver.
+            retmax (int): Cantidad de identificadores a devolver, 0 solo devuelve el conteo.
+            window (tuple): Dias `(desde, hasta)` en que los articulos entraron a PubMed
+                (`datetype=edat`), si se entrega se ignora `year`.
 
         Returns:
-            list[str]: Lista de identificadores de los articulos encontrados
+            dict: Conteo total, `webenv`, `query_key` e identificadores de la pagina pedida.
+
+        Raises:
+            SearchError: Si esearch responde con un error
         """
-        url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+        url = f"{EUTILS_URL}/esearch.fcgi"
         params = {
             "term": f"{os.getenv('TOPIC', 'Climate change')}+AND+{year}",
             "db": "pubmed",
             "retmode": "json",
-            "retmax": 500,
-            "useHistory": "y",
+            "retstart": retstart,
+            "retmax": retmax,
+            "usehistory": "y",
+            **eutils_key(),
         }
+        if window:
+            since, until = window
+            params.update(
+                term=os.getenv("TOPIC", "Climate change"),
+                datetype="edat",
+                mindate=since.strftime("%Y/%m/%d"),
+                maxdate=until.strftime("%Y/%m/%d"),
+            )
 
-        response = req.get(url, params=params)
+        response = client.get(url, params=params)
         logger.debug("[PubMed] Request to PubMed API with url: {}".format(response.url))
         logger.debug("[PubMed] Response status code: {}".format(response.status_code))
 
         if not response.ok:
-            logger.error(
-                "[PubMed] Request failed with status code: {}".format(
-                    response.status_code
-                )
+            raise SearchError(
+                "[PubMed] esearch failed with status code: {}".format(response.status_code)
             )
-            logger.info("[PubMed] Fatal error, returning empty list...")
-            return []
 
-        ids = response.json()["esearchresult"]["idlist"]
-        return ids
+        result = response.json()["esearchresult"]
+        return {
+            "count": int(result.get("count", 0)),
+            "webenv": result.get("webenv"),
+            "query_key": result.get("querykey"),
+            "ids": result.get("idlist", []),
+        }
+
+    def search(self, year: str) -> Iterator[str]:
+        """Realiza la busqueda de articulos en PubMed, utilizando la API de eutils.
+        Pagina sobre los resultados de a `PUBMED_BATCH_SIZE` identificadores, pidiendo la
+        siguiente página solo cuando se consumió la anterior.
+
+        Args:
+            year (str): Año de publicación de los articulos
+
+        Yields:
+            str: Identificador de cada articulo encontrado
+        """
+        history = self.search_history(year, retmax=PUBMED_BATCH_SIZE)
+        yield from history["ids"]
+        for retstart in range(PUBMED_BATCH_SIZE, history["count"], PUBMED_BATCH_SIZE):
+            page = self.search_history(year, retstart=retstart, retmax=PUBMED_BATCH_SIZE)
+            if not page["ids"]:
+                break
+            yield from page["ids"]
 
     def search_for_article_metadata(self, id_: str) -> dict:
         """Busca la metadata de un articulo en PubMed, utilizando la API de eutils
@@ -191,14 +604,15 @@ class PubMed(AbstractSearch):
             dict: Metadata del articulo en formato JSON.
         """
 
-        url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+        url = f"{EUTILS_URL}/esummary.fcgi"
         params = {
             "db": "pubmed",
             "id": id_,
             "retmode": "json",
+            **eutils_key(),
         }
 
-        response = req.get(url, params=params)
+        response = client.get(url, params=params)
         if response.status_code != 200:
             logger.error(
                 "[PubMed] Request failed with status code: {}".format(
@@ -207,7 +621,90 @@ class PubMed(AbstractSearch):
             )
             logger.info("[PubMed] Fatal error, returning None...")
             return None
-        return response.json()["result"]
+        result = response.json()["result"]
+        capture("pubmed.esummary", result)
+        return result
+
+    def search_for_articles_metadata(
+        self,
+        ids: list[str] = None,
+        webenv: str = None,
+        query_key: str = None,
+        retstart: int = 0,
+        retmax: int = None,
+    ) -> list[dict]:
+        """Busca la metadata de varios articulos en una sola llamada a esummary.
+        Acepta una lista de identificadores separados por coma o una busqueda guardada
+        en el historial de eutils (`WebEnv` + `query_key`).
+
+        Args:
+            ids (list[str]): Identificadores de los articulos en PubMed.
+            webenv (str): `WebEnv` devuelto por esearch.
+            query_key (str): `query_key` devuelto por esearch.
+            retstart (int): Indice del primer resumen a devolver desde el historial.
+            retmax (int): Cantidad de resumenes a devolver desde el historial.
+
+        Returns:
+            list[dict]: Metadata de cada articulo con el mismo formato que `search_for_article_metadata`.
+
+        Raises:
+            SearchError: Si esummary responde con un error
+        """
+        url = f"{EUTILS_URL}/esummary.fcgi"
+        params = {"db": "pubmed", "retmode": "json", **eutils_key()}
+        if ids:
+            # eutils recomienda POST cuando la lista de identificadores es larga
+            response = client.post(url, data=dict(params, id=",".join(ids)))
+        else:
+            params.update(
+                WebEnv=webenv,
+                query_key=query_key,
+                retstart=retstart,
+                retmax=retmax or PUBMED_BATCH_SIZE,
+            )
+            response = client.get(url, params=params)
+
+        if response.status_code != 200:
+            raise SearchError(
+                "[PubMed] esummary failed with status code: {}".format(response.status_code)
+            )
+        result = response.json().get("result", {})
+        capture("pubmed.esummary", result)
+        return self.split_summary(result)
+
+    def fetch_page(self, year: str, page: int) -> tuple[list[dict], int]:
+        """Obtiene una página de `PUBMED_BATCH_SIZE` articulos de PubMed.
+
+        Args:
+            year (str): Año de publicación de los articulos
+            page (int): Número de página, empezando en 0
+
+        Returns:
+            tuple[list[dict], int]: Metadata de los articulos de la página y total de resultados
+        """
+        history = self.search_history(
+            year, retstart=page * PUBMED_BATCH_SIZE, retmax=PUBMED_BATCH_SIZE
+        )
+        if not history["ids"]:
+            return [], history["count"]
+        return self.search_for_articles_metadata(ids=history["ids"]), history["count"]
+
+    @staticmethod
+    def split_summary(result: dict) -> list[dict]:
+        """Separa una respuesta de esummary con varios articulos en un resultado por articulo,
+        cada uno con la forma `{"uids": [uid], uid: {...}}` que espera `parse_result`.
+
+        Args:
+            result (dict): Campo `result` de la respuesta de esummary.
+
+        Returns:
+            list[dict]: Metadata de cada articulo.
+        """
+        return [
+            {"uids": [uid], uid: result[uid]}
+            for uid in result.get("uids", [])
+            if uid in result and "error" not in result[uid]
+        ]
 
     def get_doi(self, publication: dict) -> str:
         """Obtiene el DOI de un articulo en PubMed, utilizando la metadata del articulo.
@@ -223,15 +720,13 @@ class PubMed(AbstractSearch):
         article_id = article_info["articleids"]
         for id_ in article_id:
             if id_["idtype"] == "doi":
-                logger.info("[PubMed] DOI found")
+                logger.debug("[PubMed] DOI found")
                 return id_["value"]
-        logger.info("[PubMed] DOI not found")
+        logger.debug("[PubMed] DOI not found")
         return None
 
-    @crossref_helper
-    def parse_result(self, publication: dict) -> dict:
+    def parse(self, publication: dict) -> dict:
         """Parsea la metadata de un articulo en PubMed, para obtener la información necesaria para el analisis.
-        además de eso usa información de crossref para completar la metadata.
 
         Args:
             publication (dict): Metadata del articulo.
@@ -251,7 +746,7 @@ class PubMed(AbstractSearch):
         authors = []
         for author in article_info["authors"]:
             authors.append(author["name"])
-        logger.info("[PubMed] Article parsed")
+        logger.debug("[PubMed] Article parsed")
         return {
             "author": authors,
             "title": title,
@@ -262,7 +757,81 @@ class PubMed(AbstractSearch):
             "language": lang,
         }
 
-    def __call__(self, year: str) -> list[str]:
+    def pages(self, year: str, checkpoint: dict = None) -> Iterator[tuple[list[dict], dict]]:
+        """Entrega la metadata de los articulos de un año en lotes de `PUBMED_BATCH_SIZE`,
+        usando el historial de eutils. Si se entrega un checkpoint se continua desde su
+        posición, reutilizando su `WebEnv` mientras siga vigente.
+
+        Args:
+            year (str): Año de publicación de los articulos
+            checkpoint (dict): Checkpoint de una ejecución anterior
+
+        Yields:
+            tuple[list[dict], dict]: Metadata de cada articulo del lote y checkpoint del lote.
+        """
+        checkpoint = checkpoint or {}
+        retstart = checkpoint.get("offset") or 0
+        history = {
+            "count": checkpoint.get("total"),
+            "webenv": checkpoint.get("webenv"),
+            "query_key": checkpoint.get("query_key"),
+        }
+        if history["count"] is None or not history["webenv"]:
+            history = self.search_history(year)
+            logger.info(
+                "[PubMed] {} articles found for year {}".format(history["count"], year)
+            )
+        refreshed = not checkpoint
+        while retstart < history["count"]:
+            if history["webenv"]:
+                articles = self.search_for_articles_metadata(
+                    webenv=history["webenv"],
+                    query_key=history["query_key"],
+                    retstart=retstart,
+                )
+                if not articles and not refreshed:
+                    # El WebEnv del checkpoint expiró, se repite la busqueda una vez
+                    logger.info("[PubMed] WebEnv expired, searching again...")
+                    history, refreshed = self.search_history(year), True
+                    continue
+                if not articles:
+                    raise SearchError(
+                        f"[PubMed] Empty esummary page at {retstart} of {history['count']}"
+                    )
+            else:
+                page = self.search_history(year, retstart=retstart, retmax=PUBMED_BATCH_SIZE)
+                articles = self.search_for_articles_metadata(ids=page["ids"])
+            retstart += PUBMED_BATCH_SIZE
+            yield articles, {
+                "offset": retstart,
+                "total": history["count"],
+                "last_id": articles[-1]["uids"][0] if articles else None,
+                "webenv": history["webenv"],
+                "query_key": history["query_key"],
+            }
+
+    def delta(self, since: date, until: date) -> Iterator[tuple[list[dict], dict]]:
+        """Entrega en lotes de `PUBMED_BATCH_SIZE` los articulos del tema que entraron a PubMed
+        entre dos dias, usando `datetype=edat` con `mindate` y `maxdate`.
+
+        Args:
+            since (date): Primer día del intervalo
+            until (date): Ultimo día del intervalo
+
+        Yields:
+            tuple[list[dict], dict]: Metadata de cada articulo del lote y avance del lote.
+        """
+        history = self.search_history(None, window=(since, until))
+        logger.info(
+            "[PubMed] {} articles added from {} to {}".format(history["count"], since, until)
+        )
+        for retstart in range(0, history["count"], PUBMED_BATCH_SIZE):
+            articles = self.search_for_articles_metadata(
+                webenv=history["webenv"], query_key=history["query_key"], retstart=retstart
+            )
+            yield articles, {"offset": retstart + len(articles), "total": history["count"]}
+
+    def __call__(self, year: str) -> int:
         """Método que realiza la busqueda de articulos en PubMed, utilizando la API de eutils
         por año y lo inserta en la base de datos."""
         logger.info(
@@ -270,16 +839,7 @@ class PubMed(AbstractSearch):
                 os.getenv("TOPIC", "Climate change"), year
             )
         )
-        ids = self.search(year)
-        for id_ in ids:
-            art = self.search_for_article_metadata(id_)
-            insert_data(self.session, self.parse_result(art))
-            logger.info(
-                "[PubMed] Article: {}. Inserted to database".format(
-                    art[art["uids"][0]]["title"]
-                )
-            )
-            sleep(15)
+        return self.harvest(year)
 
     def __del__(self) -> None:
         """Cierra la sesion de SQLAlchemy"""
@@ -287,6 +847,7 @@ class PubMed(AbstractSearch):
         logger.info("[Scopus] Session closed")
 
 
+@register
 class ScopusSearch(AbstractSearch):
     """Es un motor de busqueda de articulos cientificos que toma la información que se necesita para el analisis
     por pais y año.
@@ -305,6 +866,10 @@ class ScopusSearch(AbstractSearch):
         AbstractSearch (AbstractSearch): Define los métodos base que debe tener un motor de busqueda
     """
 
+    name = "scopus"
+    host = "api.elsevier.com"
+    page_size = SCOPUS_PAGE_SIZE
+
     def __init__(self, session) -> None:
         """Inicializa el motor de busqueda de Scopus
 
@@ -315,17 +880,25 @@ class ScopusSearch(AbstractSearch):
         AbstractSearch.__init__(self)
         self.session = session
 
-    def search(self, year: str, start=0) -> list[str]:
+    def search_results(
+        self, year: str, start: int = 0, cursor: str = None, query: str = None
+    ) -> dict:
         """Realiza la busqueda de articulos en Scopus, utilizando la API de Elsevier
            El Api key se obtiene desde las variables de entorno.
         Args:
             year (str): Año de publicación de los articulos
             start (int): Paginación de la busqueda.
+            cursor (str): Cursor de paginación profunda, `*` para la primera página. Si se
+                entrega se ignora `start`.
+            query (str): Consulta completa de Scopus, si se entrega se ignora `year`.
         Returns:
-            list[str]: Lista de identificadores de los articulos encontrados
+            dict: Campo `search-results` de la respuesta
+
+        Raises:
+            SearchError: Si Scopus responde con un error
         """
         # Using scopus search API
-        url = "https://api.elsevier.com/content/search/scopus"
+        url = SCOPUS_URL
         headers = {
             "Accept": "application/json",
             "X-ELS-APIKey": os.getenv(
@@ -338,21 +911,53 @@ class ScopusSearch(AbstractSearch):
             "query": os.getenv("TOPIC", "Climate change"),
             "date": f"{year}",
             "sort": "relevancy",
-            "count": 10,
-            "start": start,
+            "count": self.page_size,
         }
-
-        response = req.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            return response.json()["search-results"]["entry"]
+        if query:
+            params["query"] = query
+            del params["date"]
+        if cursor:
+            params["cursor"] = cursor
         else:
-            logger.error(
-                "[Scopus] Request failed with status code: {}".format(
-                    response.status_code
-                )
+            params["start"] = start
+
+        response = client.get(url, headers=headers, params=params)
+        if response.status_code != 200:
+            raise SearchError(
+                "[Scopus] Request failed with status code: {}".format(response.status_code)
             )
-            logger.info("[Scopus] Fatal error, returning empty list...")
-            return []
+        results = response.json()["search-results"]
+        capture("scopus.search", results, year=year)
+        return results
+
+    def search(self, year: str, start=0) -> list[str]:
+        """Realiza la busqueda de articulos en Scopus, utilizando la API de Elsevier
+           El Api key se obtiene desde las variables de entorno.
+        Args:
+            year (str): Año de publicación de los articulos
+            start (int): Paginación de la busqueda.
+        Returns:
+            list[str]: Lista de identificadores de los articulos encontrados
+        """
+        entries = self.search_results(year, start=start).get("entry", [])
+        # Scopus devuelve una entrada con "error" cuando no hay resultados
+        return [entry for entry in entries if "error" not in entry]
+
+    def fetch_page(self, year: str, page: int) -> tuple[list[dict], int]:
+        """Obtiene una página de resultados de Scopus.
+
+        Args:
+            year (str): Año de publicación de los articulos
+            page (int): Número de página, empezando en 0
+
+        Returns:
+            tuple[list[dict], int]: Entradas de la página y total de resultados paginables
+        """
+        results = self.search_results(year, start=page * self.page_size)
+        entries = [entry for entry in results.get("entry", []) if "error" not in entry]
+        total = int(results.get("opensearch:totalResults", 0))
+        # La paginación por `start` de Scopus no permite pasar de SCOPUS_MAX_START resultados
+        return entries, min(total, SCOPUS_MAX_START)
 
     def search_for_article_metadata(self, id_: str) -> dict:
         """Busca la metadata de un articulo en Scopus, utilizando la API de Elsevier,
@@ -365,15 +970,13 @@ class ScopusSearch(AbstractSearch):
         """Obtiene el DOI de un articulo en Scopus, utilizando la metadata del articulo."""
         doi = publication.get("prism:doi", None)
         if doi:
-            logger.info("[Scopus] DOI found")
+            logger.debug("[Scopus] DOI found")
             return doi
-        logger.info("[Scopus] DOI not found")
+        logger.debug("[Scopus] DOI not found")
         return None
 
-    @crossref_helper
-    def parse_result(self, publication: dict) -> dict:
+    def parse(self, publication: dict) -> dict:
         """Parsea la metadata de un articulo en Scopus, para obtener la información necesaria para el analisis.
-        además de eso usa información de crossref para completar la metadata.
 
         Args:
             publication (dict): Metadata del articulo.
@@ -388,7 +991,7 @@ class ScopusSearch(AbstractSearch):
         publication_date = publication["prism:coverDate"]
         authors = []
         authors.append(publication["dc:creator"])
-        logger.info("[Scopus] Article parsed")
+        logger.debug("[Scopus] Article parsed")
         return {
             "author": authors,
             "title": title,
@@ -396,7 +999,58 @@ class ScopusSearch(AbstractSearch):
             "doi": doi,
         }
 
-    def __call__(self, year: str) -> list[str]:
+    def pages(
+        self, year: str, checkpoint: dict = None, query: str = None
+    ) -> Iterator[tuple[list[dict], dict]]:
+        """Entrega las entradas de la busqueda de Scopus de un año, página por página, usando la
+        paginación profunda por cursor y terminando al llegar a `opensearch:totalResults`.
+
+        Args:
+            year (str): Año de publicación de los articulos
+            checkpoint (dict): Checkpoint de una ejecución anterior
+            query (str): Consulta completa de Scopus, si se entrega se ignora `year`
+
+        Yields:
+            tuple[list[dict], dict]: Entradas de la página de resultados y checkpoint de la página.
+        """
+        checkpoint = checkpoint or {}
+        cursor = checkpoint.get("cursor") or "*"
+        fetched, total = checkpoint.get("offset") or 0, checkpoint.get("total")
+        while cursor and (total is None or fetched < total):
+            results = self.search_results(year, cursor=cursor, query=query)
+            entries = [entry for entry in results.get("entry", []) if "error" not in entry]
+            if not entries:
+                break
+            total = int(results.get("opensearch:totalResults", 0))
+            fetched += len(entries)
+            cursor = results.get("cursor", {}).get("@next")
+            logger.info("[Scopus] Requested articles {} of {}".format(fetched, total))
+            yield entries, {
+                "offset": fetched,
+                "total": total,
+                "cursor": cursor,
+                "last_id": entries[-1].get("dc:identifier"),
+            }
+
+    def delta(self, since: date, until: date) -> Iterator[tuple[list[dict], dict]]:
+        """Entrega las entradas del tema cargadas o actualizadas en Scopus entre dos dias,
+        filtrando por `LOAD-DATE` (los operadores `AFT` y `BEF` excluyen el día indicado).
+
+        Args:
+            since (date): Primer día del intervalo
+            until (date): Ultimo día del intervalo
+
+        Yields:
+            tuple[list[dict], dict]: Entradas de la página de resultados y avance de la página.
+        """
+        query = "({}) AND LOAD-DATE AFT {:%Y%m%d} AND LOAD-DATE BEF {:%Y%m%d}".format(
+            os.getenv("TOPIC", "Climate change"),
+            since - timedelta(days=1),
+            until + timedelta(days=1),
+        )
+        return self.pages(None, query=query)
+
+    def __call__(self, year: str) -> int:
         """Método que realiza la busqueda de articulos en Scopus, utilizando la API de Elsevier
         por año y lo inserta en la base de datos."""
         logger.info(
@@ -404,17 +1058,7 @@ class ScopusSearch(AbstractSearch):
                 os.getenv("TOPIC", "Climate change"), year
             )
         )
-        for i in range(0, 500, 10):
-            logger.info("[Scopus] Requesting articles from {} to {}".format(i, i + 10))
-            for publication in self.search(year, start=i):
-                insert_data(self.session, self.parse_result(publication))
-                logger.info(
-                    "[Scopus] Article: {}. Inserted to database".format(
-                        publication["dc:title"]
-                    )
-                )
-
-                sleep(10)
+        return self.harvest(year)
 
     def __del__(self) -> None:
         """Cierra la sesion de SQLAlchemy"""
@@ -0,0 +1,89 @@
+"""Worker que procesa las unidades de la cola `harvest_jobs`, pensado para correr en varias
+replicas de Kubernetes al mismo tiempo."""
+
+import math
+import os
+import socket
+import time
+from src.database.jobs import claim, complete, enqueue, fail, in_progress
+from src.database.known import get_known
+from src.database.tools import insert_batch
+from src.logs.logger import logger
+from src.tools.metrics import ARTICLES_INGESTED
+from src.tools.search import AbstractSearch
+
+# Segundos de espera cuando no hay unidades disponibles antes de volver a intentar
+WORKER_IDLE_SECONDS = float(os.getenv("WORKER_IDLE_SECONDS", "30"))
+
+
+def process(session, job, search_instance: AbstractSearch) -> int:
+    """Procesa una unidad: descarga la página, la inserta y marca la unidad como terminada en la
+    misma transacción. Al procesar la primera página de un año se agregan las siguientes.
+
+    Args:
+        session (Session): Sesion de sqlalchemy
+        job (HarvestJob): Unidad reclamada
+        search_instance (AbstractSearch): Motor de busqueda de la unidad
+
+    Returns:
+        int: Cantidad de artículos insertados
+
+    Raises:
+        SearchError: Si la API responde con un error, la unidad no se marca como terminada y
+            `run_worker` la devuelve a la cola con `fail`
+    """
+    # La carga inicial confirma la transacción, se hace antes de escribir nada de la unidad
+    known = get_known(session)
+    publications, total = search_instance.fetch_page(str(job.year), job.page)
+    if job.page == 0:
+        pages = math.ceil(total / search_instance.page_size)
+        enqueue(session, job.source, job.year, range(1, pages))
+        logger.info(f"[Worker] {job.source} {job.year}: {total} results in {pages} pages")
+    batch = search_instance.parse_page(publications, known)
+    try:
+        inserted = insert_batch(session, batch, commit=False)
+        complete(session, job)
+        session.commit()
+    except Exception:
+        # Al reintentar la unidad sus artículos se vuelven a reservar
+        known.release(batch)
+        raise
+    known.add(batch)
+    ARTICLES_INGESTED.inc(len(inserted), source=job.source, year=job.year)
+    return len(inserted)
+
+
+def run_worker(session, sources: list[AbstractSearch], worker: str = None) -> int:
+    """Reclama y procesa unidades hasta vaciar la cola. Mientras otro worker tenga unidades en
+    curso se sigue esperando, porque al terminar una primera página se agregan unidades nuevas.
+
+    Args:
+        session (Session): Sesion de sqlalchemy del worker
+        sources (list[AbstractSearch]): Motores de busqueda que el worker sabe procesar
+        worker (str): Identificador del worker, por defecto el nombre del pod
+
+    Returns:
+        int: Cantidad de artículos insertados
+    """
+    worker = worker or os.getenv("HOSTNAME", socket.gethostname())
+    by_name = {source.name: source for source in sources}
+    # Los artículos conocidos se cargan antes de reclamar la primera unidad
+    get_known(session)
+    inserted = 0
+    while True:
+        job = claim(session, worker, list(by_name))
+        if job is None:
+            if not in_progress(session, list(by_name)):
+                break
+            time.sleep(WORKER_IDLE_SECONDS)
+            continue
+        try:
+            inserted += process(session, job, by_name[job.source])
+        except Exception as error:
+            logger.error(f"[Worker] {job} failed: {error}")
+            fail(session, job)
+        finally:
+            # Vacia el mapa de identidad y devuelve la conexion al pool entre unidades
+            session.close()
+    logger.info(f"[Worker] {worker} finished, {inserted} articles inserted")
+    return inserted
@@ -0,0 +1,107 @@
+import argparse
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import benchmark
+import src.tools.search as search
+import src.database.identity as identity_module
+import src.database.known as known_module
+import src.tools.cache as cache_module
+from src.database.models import Base
+from src.tools.ratelimit import RATE_LIMITER
+
+# Artículos por motor que sirve el servidor local
+STUB_ARTICLES = 60
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch):
+    """Sin cache de crossref en disco y con artículos conocidos e identidades nuevos por test"""
+    monkeypatch.setenv("CROSSREF_CACHE_PATH", "")
+    monkeypatch.setattr(cache_module, "_CACHE", None)
+    monkeypatch.setattr(cache_module, "_FAILED_PATH", None)
+    monkeypatch.setattr(known_module, "_KNOWN", None)
+    monkeypatch.setattr(identity_module, "_CACHES", {})
+
+
+@pytest.fixture
+def engine():
+    """Base de datos SQLite en memoria compartida por todas las sesiones del test"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def pg_engine():
+    """Motor de la base Postgres de `TEST_DATABASE_URL`, el test se omite si no hay una"""
+    url = os.getenv("TEST_DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        pytest.skip("TEST_DATABASE_URL does not point to a Postgres database")
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def stub():
+    """Servidor local de `benchmark.py` que imita eutils, Scopus y crossref"""
+    server, base = benchmark.start_stub(
+        argparse.Namespace(fixtures=benchmark.FIXTURES, articles=STUB_ARTICLES)
+    )
+    yield base
+    server.terminate()
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """Artículos que sirve el servidor local, para calcular sus DOI en los tests"""
+    return benchmark.Corpus(benchmark.load_fixtures(benchmark.FIXTURES), STUB_ARTICLES)
+
+
+@pytest.fixture
+def apis(stub, monkeypatch):
+    """Apunta los motores al servidor local sin limite de peticiones"""
+    monkeypatch.setenv("RATE_LIMIT_127_0_0_1", "1000000")
+    monkeypatch.setattr(RATE_LIMITER, "buckets", {})
+    for name, url in benchmark.stub_env(stub).items():
+        if name.endswith("_URL"):
+            monkeypatch.setattr(search, name, url)
+    return stub
+
+
+def make_article(index: int, authors=("Doe",), **fields) -> dict:
+    """Artículo parseado y completado con crossref, listo para `insert_batch`.
+
+    Args:
+        index (int): Numero del artículo, define su DOI y su titulo
+        authors (Iterable[str]): Apellidos de los autores
+        **fields: Campos que reemplazan a los valores por defecto
+    """
+    return {
+        "doi": f"10.1/{index}",
+        "title": f"Title {index}",
+        "publication_date": "2021",
+        "publisher": "P",
+        "reference_count": 1,
+        "url": None,
+        "issn": None,
+        "authors": [{"family": family, "given": "J"} for family in authors],
+        **fields,
+    }
+
+
+@pytest.fixture
+def article():
+    """Fabrica de artículos de prueba, ver `make_article`"""
+    return make_article
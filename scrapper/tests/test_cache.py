@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+import pytest
+import src.tools.cache as cache_module
+from src.tools import client
+from src.tools.cache import MISS, CrossrefCache, get_cache
+from src.tools.search import fetch_crossref, fetch_crossref_many
+
+
+def test_unwritable_path_disables_the_cache(tmp_path, monkeypatch):
+    # El directorio del cache es un archivo, no se puede crear la base SQLite
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("CROSSREF_CACHE_PATH", str(tmp_path / "file" / "crossref.sqlite"))
+    assert get_cache() is None
+    assert get_cache() is None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = CrossrefCache(str(tmp_path / "crossref.sqlite"), ttl=60)
+    cache.set("10.1/A", {"publisher": "P"})
+    assert cache.get("10.1/a") == {"publisher": "P"}
+    clock[0] += 61
+    assert cache.get("10.1/a") is MISS
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = CrossrefCache(str(tmp_path / "crossref.sqlite"), max_entries=2)
+    for doi in ("10.1/a", "10.1/b"):
+        cache.set(doi, {"doi": doi})
+        clock[0] += 1
+    cache.get("10.1/a")
+    clock[0] += 1
+    cache.set("10.1/c", {"doi": "10.1/c"})
+    assert cache.get("10.1/b") is MISS
+    assert cache.get("10.1/a") is not MISS and cache.get("10.1/c") is not MISS
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+    # El tamaño se conserva al volver a abrir el archivo
+    assert CrossrefCache(str(tmp_path / "crossref.sqlite")).size == 2
+
+
+def test_missing_dois_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("CROSSREF_CACHE_PATH", str(tmp_path / "crossref.sqlite"))
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        return SimpleNamespace(status_code=404)
+
+    monkeypatch.setattr(client, "get", get)
+    assert fetch_crossref("10.1/missing") is None
+    assert fetch_crossref("10.1/missing") is None
+    assert len(calls) == 1
+    assert get_cache().get("10.1/missing") is None
+
+
+def test_refresh_bypasses_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("CROSSREF_CACHE_PATH", str(tmp_path / "crossref.sqlite"))
+    get_cache().set("10.1/a", {"publisher": "Old"})
+    response = SimpleNamespace(status_code=200, json=lambda: {"message": {"publisher": "New"}})
+    monkeypatch.setattr(client, "get", lambda url, **kwargs: response)
+    assert fetch_crossref("10.1/a") == {"publisher": "Old"}
+    assert fetch_crossref("10.1/a", refresh=True) == {"publisher": "New"}
+    assert fetch_crossref_many(["10.1/a"]) == {"10.1/a": {"publisher": "New"}}
@@ -0,0 +1,43 @@
+import gzip
+import os
+from src.tools.capture import RawCapture, read_segments
+
+
+def segment(directory) -> str:
+    (name,) = os.listdir(directory)
+    return os.path.join(directory, name)
+
+
+def test_records_are_readable_before_close(tmp_path):
+    writer = RawCapture(str(tmp_path), segment_bytes=1 << 20)
+    for index in range(3):
+        writer.write("crossref.work", {"index": index}, doi=f"10.1/{index}")
+    # El proceso muere sin cerrar el segmento
+    records = list(read_segments(str(tmp_path)))
+    assert [record["payload"]["index"] for record in records] == [0, 1, 2]
+
+
+def test_truncated_segment_stops_cleanly(tmp_path):
+    writer = RawCapture(str(tmp_path), segment_bytes=1 << 20)
+    for index in range(3):
+        writer.write("crossref.work", {"index": index, "padding": "x" * 1000}, doi="10.1/a")
+    writer.close()
+    path = segment(tmp_path)
+    with open(path, "rb") as file:
+        content = file.read()
+    with open(path, "wb") as file:
+        file.write(content[: len(content) * 2 // 3])
+    with gzip.open(os.path.join(tmp_path, "raw-zz-next.ndjson.gz"), "wt") as file:
+        file.write('{"kind": "scopus.search", "payload": {}}\n')
+
+    records = list(read_segments(str(tmp_path)))
+    assert [record["kind"] for record in records][-1] == "scopus.search"
+    assert 1 <= len(records) <= 3
+
+
+def test_corrupt_segment_is_skipped(tmp_path):
+    with open(os.path.join(tmp_path, "raw-aa.ndjson.gz"), "wb") as file:
+        file.write(b"not a gzip file")
+    with gzip.open(os.path.join(tmp_path, "raw-bb.ndjson.gz"), "wt") as file:
+        file.write('{"kind": "crossref.work", "payload": null}\n')
+    assert [record["kind"] for record in read_segments(str(tmp_path))] == ["crossref.work"]
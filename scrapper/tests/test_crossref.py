@@ -0,0 +1,65 @@
+import pytest
+import benchmark
+from src.tools import client
+from src.tools.search import _fetch_crossref_batch, fetch_crossref_many
+
+
+@pytest.fixture
+def dois(corpus) -> tuple[list, list]:
+    """DOI de las entradas de Scopus del servidor local que existen y que no existen en
+    crossref (uno de cada `CROSSREF_MISS_EVERY`)"""
+    found, missing = [], []
+    for index in range(corpus.articles):
+        doi = corpus.entry("s", index).get("prism:doi")
+        if doi:
+            miss = index % benchmark.CROSSREF_MISS_EVERY == benchmark.CROSSREF_MISS_EVERY - 1
+            (missing if miss else found).append(doi)
+    return found[:8], missing[:2]
+
+
+def crossref_calls(stub) -> int:
+    return benchmark.stub_stats(stub)["calls"].get("crossref", 0)
+
+
+def test_batch_lookup_resolves_found_and_missing_dois(apis, dois):
+    found, missing = dois
+    messages = _fetch_crossref_batch(found + missing)
+    assert [messages[doi]["DOI"] for doi in found] == found
+    assert [messages[doi] for doi in missing] == [None, None]
+
+
+def test_many_uses_one_query_per_batch(apis, dois, monkeypatch):
+    found, missing = dois
+    monkeypatch.setattr("src.tools.search.CROSSREF_BATCH_SIZE", 4)
+    before = crossref_calls(apis)
+    messages = fetch_crossref_many(found + missing + found[:1])
+    assert crossref_calls(apis) - before == 3
+    assert list(messages) == found + missing
+    assert all(messages[doi]["author"] for doi in found)
+    assert [messages[doi] for doi in missing] == [None, None]
+
+
+def test_failed_batch_falls_back_to_single_lookups(apis, dois, monkeypatch):
+    found, missing = dois
+    get = client.get
+
+    def no_filter(url, **kwargs):
+        if "filter" in kwargs.get("params", {}):
+            raise ConnectionError("filter queries are down")
+        return get(url, **kwargs)
+
+    monkeypatch.setattr(client, "get", no_filter)
+    before = crossref_calls(apis)
+    messages = fetch_crossref_many(found[:3] + missing[:1])
+    assert crossref_calls(apis) - before == 4
+    assert [messages[doi]["DOI"] for doi in found[:3]] == found[:3]
+    assert messages[missing[0]] is None
+
+
+def test_dois_with_commas_are_looked_up_alone(apis, dois):
+    found, _ = dois
+    before = crossref_calls(apis)
+    messages = fetch_crossref_many(found[:2] + ["10.1/a,b"])
+    # Una consulta por lotes para los dos primeros y una individual para el DOI con coma
+    assert crossref_calls(apis) - before == 2
+    assert messages["10.1/a,b"]["DOI"] == "10.1/a,b"
@@ -0,0 +1,64 @@
+from sqlalchemy import func, select
+from src.database.identity import identity_cache
+from src.database.models import (
+    Affiliation,
+    Article,
+    Author,
+    Funder,
+    article_funder,
+    author_affiliation,
+    author_article,
+)
+from src.database.tools import _link, _resolve, insert_batch
+
+
+def count(session, table) -> int:
+    return session.scalar(select(func.count()).select_from(table))
+
+
+def with_relations(article: dict) -> dict:
+    article["authors"][0]["affiliation"] = ["Univ, Chile"]
+    return dict(article, funders=[{"name": "ANID", "doi": "10.13039/1", "award": None}])
+
+
+def test_reinserting_a_batch_creates_nothing(Session, article):
+    session = Session()
+    batch = [with_relations(article(index, authors=("Doe", "Roe"))) for index in range(3)]
+    assert len(insert_batch(session, batch)) == 3
+    tables = (Article, Author, Affiliation, Funder, author_article, author_affiliation)
+    before = [count(session, table) for table in tables + (article_funder,)]
+    assert before == [3, 2, 1, 1, 6, 1, 3]
+    assert insert_batch(session, batch) == []
+    assert [count(session, table) for table in tables + (article_funder,)] == before
+
+
+def test_new_articles_reuse_existing_entities(Session, article):
+    session = Session()
+    insert_batch(session, [with_relations(article(1))])
+    ids = insert_batch(session, [with_relations(article(2))])
+    assert count(session, Author) == 1 and count(session, Funder) == 1
+    assert session.scalars(
+        select(author_article.c.article_id).order_by(author_article.c.article_id)
+    ).all() == [1, ids[0]]
+
+
+def test_resolve_creates_missing_rows_once(Session):
+    session = Session()
+    rows = {"doe|j": {"family": "Doe", "given": "J"}, "roe|j": {"family": "Roe", "given": "J"}}
+    ids, created = _resolve(session, Author, "identity_key", rows)
+    assert created == set(rows)
+    session.commit()
+    assert identity_cache(Author).get_many(list(rows)) == ids
+    # Las llaves conocidas salen del cache de identidades o de la base, sin crear filas
+    identity_cache(Author).clear()
+    again, created = _resolve(session, Author, "identity_key", rows)
+    assert again == ids and created == set()
+    assert count(session, Author) == 2
+
+
+def test_link_ignores_existing_links(Session, article):
+    session = Session()
+    insert_batch(session, [article(1, authors=("Doe", "Roe"))])
+    links = [{"author_id": 1, "article_id": 1}, {"author_id": 2, "article_id": 1}]
+    _link(session, author_article, links + links[:1])
+    assert count(session, author_article) == 2
@@ -0,0 +1,57 @@
+from sqlalchemy import select
+from src.database.dedup import deduplicate, merge_records
+from src.database.models import Article, Author
+from src.database.tools import insert_batch
+
+
+def test_same_doi_with_different_case_and_prefix(article):
+    scopus = article(1, authors=(), doi="https://doi.org/10.1/ABC", publisher=None)
+    crossref = article(2, doi="doi:10.1/abc", url="https://example.org")
+    (record,) = deduplicate([scopus, crossref])
+    # El registro con autores es el preferido y el otro completa sus campos vacios
+    assert record["doi_key"] == "10.1/abc"
+    assert record["title"] == "Title 2" and record["publisher"] == "P"
+    assert record["url"] == "https://example.org"
+
+
+def test_same_title_and_year_without_doi(article):
+    pubmed = article(1, doi=None, title="Climate  Change & Health!")
+    scopus = article(2, authors=("Roe",), title="climate change health", issn="1234")
+    other_year = article(3, doi=None, title="Climate change health", publication_date="2020")
+    first, second = deduplicate([pubmed, scopus, other_year])
+    assert first["doi_key"] == "10.1/2" and first["issn"] == "1234"
+    assert [author["family"] for author in first["authors"]] == ["Doe", "Roe"]
+    assert second["publication_date"] == "2020"
+
+
+def test_merge_records_keeps_the_primary_values():
+    merged = merge_records(
+        {"publisher": "A", "url": "", "authors": [{"family": "Doe", "given": "J"}]},
+        {"publisher": "B", "url": "u", "authors": [{"family": "doe", "given": "J."}]},
+    )
+    assert merged["publisher"] == "A" and merged["url"] == "u"
+    assert len(merged["authors"]) == 1
+
+
+def test_partial_records_fill_null_columns(Session, article):
+    session = Session()
+    insert_batch(session, [article(1, publisher=None, url=None, reference_count=None)])
+    # Un registro sin autores solo completa el artículo existente
+    partial = article(1, authors=(), publisher="Elsevier", url="u", reference_count=4)
+    assert insert_batch(session, [dict(partial, doi="https://doi.org/10.1/1")]) == []
+    row = session.execute(select(Article)).scalar_one()
+    assert (row.publisher, row.url, row.reference_count) == ("Elsevier", "u", 4)
+    assert session.scalars(select(Author.family)).all() == ["Doe"]
+
+
+def test_existing_values_are_only_replaced_on_refresh(Session, article):
+    session = Session()
+    insert_batch(session, [article(1, url="old")])
+    changed = article(1, publisher="New", url="new", publication_date="2021 Dec 3")
+    insert_batch(session, [changed])
+    row = session.execute(select(Article)).scalar_one()
+    assert (row.publisher, row.url) == ("P", "old")
+    insert_batch(session, [changed], refresh=True)
+    session.refresh(row)
+    # Solo se reemplazan los campos de `REFRESHED_FIELDS`
+    assert (row.publisher, row.url, row.publication_date) == ("New", "new", "2021")
@@ -0,0 +1,19 @@
+import os
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("numpy")
+
+from src.analytics.export import export_snapshot  # noqa: E402
+from src.analytics.snapshot import Snapshot, latest_snapshot  # noqa: E402
+from src.database.tools import insert_batch  # noqa: E402
+
+
+def test_exports_in_the_same_second_do_not_collide(engine, Session, article, tmp_path):
+    with Session() as session:
+        insert_batch(session, [article(1), article(2)])
+    paths = [export_snapshot(engine, str(tmp_path)) for _ in range(3)]
+    assert len(set(paths)) == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".partial")]
+    assert latest_snapshot(str(tmp_path)) == paths[-1]
+    assert Snapshot(paths[-1]).counts()["articles"] == 2
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+from src.analytics.graph import GraphIndex  # noqa: E402
+from src.database.models import Article, author_article  # noqa: E402
+from src.database.tools import insert_batch  # noqa: E402
+
+
+def test_update_adds_articles_committed_late(Session, article, tmp_path):
+    session = Session()
+    insert_batch(session, [article(1, "AB"), article(2, "BC"), article(3, "CD")])
+    # El artículo 2 todavia no está confirmado cuando se actualiza el indice
+    row = session.execute(select(Article.__table__).where(Article.id == 2)).mappings().one()
+    links = session.execute(
+        select(author_article).where(author_article.c.article_id == 2)
+    ).mappings().all()
+    session.execute(delete(author_article).where(author_article.c.article_id == 2))
+    session.execute(delete(Article.__table__).where(Article.id == 2))
+    session.commit()
+
+    graph = GraphIndex()
+    assert graph.update(session) == 2
+    assert graph.article_ids.tolist() == [1, 3]
+
+    session.execute(insert(Article.__table__).values(**row))
+    session.execute(insert(author_article), [dict(link) for link in links])
+    session.commit()
+    graph.save(str(tmp_path / "graph"))
+    graph = GraphIndex.load(str(tmp_path / "graph"))
+    assert graph.update(session) == 1
+    assert graph.update(session) == 0
+    assert graph.article_ids.tolist() == [1, 2, 3]
+    assert graph.stats()["article_authors"] == 6
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import select
+from src.database.identity import IdentityCache, identity_cache
+from src.database.models import Article, Author, author_article
+from src.database.tools import batch_scope, insert_batch
+
+
+def test_ids_are_promoted_only_after_commit(Session, article):
+    session = Session()
+    insert_batch(session, [article(1)], commit=False)
+    assert len(identity_cache(Author)) == 0
+    session.commit()
+    assert len(identity_cache(Author)) == 1
+
+
+def test_rolled_back_ids_are_not_served(Session, article):
+    session = Session()
+    with pytest.raises(RuntimeError):
+        with batch_scope(session):
+            insert_batch(session, [article(1, authors=("Doe", "Roe"))], commit=False)
+            raise RuntimeError("checkpoint failed")
+    assert len(identity_cache(Author)) == 0
+    # Otro autor ocupa el id que tenía "Doe" en la transacción deshecha
+    insert_batch(session, [article(2, authors=("Poe",))])
+    insert_batch(session, [article(3, authors=("Roe", "Doe"))])
+    links = session.execute(
+        select(Article.title, Author.family)
+        .join(author_article, author_article.c.article_id == Article.id)
+        .join(Author, Author.id == author_article.c.author_id)
+    ).all()
+    assert sorted(links) == [("Title 2", "Poe"), ("Title 3", "Doe"), ("Title 3", "Roe")]
+    ids = {
+        f"name:{family.lower()}|j": id_
+        for family, id_ in session.execute(select(Author.family, Author.id))
+    }
+    assert dict(identity_cache(Author).entries) == ids
+
+def test_lru_keeps_the_most_recent_keys():
+    cache = IdentityCache("authors", max_entries=2)
+    cache.put_many({"a": 1, "b": 2})
+    cache.get_many(["a"])
+    cache.put_many({"c": 3})
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
@@ -0,0 +1,146 @@
+import threading
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from src.database import jobs
+from src.database.models import Article, HarvestJob
+from src.tools.search import AbstractSearch, SearchError
+from src.tools.worker import process, run_worker
+
+
+class FakeSource(AbstractSearch):
+    """Motor con dos páginas de un artículo por año, `fail_pages` responde con un error"""
+
+    name = "fake"
+    page_size = 1
+
+    def __init__(self, session, fail_pages=()) -> None:
+        self.session = session
+        self.fail_pages = set(fail_pages)
+
+    def pages(self, year, checkpoint=None):
+        raise NotImplementedError
+
+    def fetch_page(self, year, page):
+        if page in self.fail_pages:
+            raise SearchError("[Fake] Request failed with status code: 502")
+        return [{"doi": f"10.1/{year}-{page}"}], 2
+
+    def parse(self, publication):
+        return {"doi": publication["doi"], "title": publication["doi"], "publication_date": "2020"}
+
+
+@pytest.fixture
+def crossref(monkeypatch):
+    monkeypatch.setattr(
+        "src.tools.search.fetch_crossref_many",
+        lambda dois, refresh=False: {
+            doi: {"author": [{"family": "Doe"}], "publisher": "P", "reference-count": 1}
+            for doi in dois
+        },
+    )
+
+
+@pytest.fixture
+def idle(monkeypatch):
+    monkeypatch.setattr("src.tools.worker.WORKER_IDLE_SECONDS", 0)
+
+
+def test_worker_processes_every_page(Session, crossref, idle):
+    session = Session()
+    jobs.seed(session, ["fake"], "2020", "2022")
+    assert run_worker(session, [FakeSource(session)], worker="w1") == 4
+    statuses = session.scalars(select(HarvestJob.status)).all()
+    assert sorted(statuses) == ["done"] * 4
+
+
+def test_failed_first_page_is_not_completed(Session, crossref, idle, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 2)
+    session = Session()
+    jobs.seed(session, ["fake"], "2020", "2021")
+    assert run_worker(session, [FakeSource(session, fail_pages={0})], worker="w1") == 0
+    (job,) = session.scalars(select(HarvestJob)).all()
+    assert (job.page, job.status, job.attempts) == (0, "failed", 2)
+    assert session.scalar(select(Article.id)) is None
+
+
+def test_failed_job_is_retried(Session, crossref, idle, monkeypatch):
+    session = Session()
+    jobs.seed(session, ["fake"], "2020", "2021")
+    source = FakeSource(session)
+    process(session, jobs.claim(session, "w1", ["fake"]), source)
+
+    def unreachable(dois, refresh=False):
+        raise ConnectionError("crossref timeout")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("src.tools.search.fetch_crossref_many", unreachable)
+        job = jobs.claim(session, "w1", ["fake"])
+        with pytest.raises(ConnectionError):
+            process(session, job, source)
+        jobs.fail(session, job)
+    # Los artículos de la unidad fallida se pueden volver a reservar al reintentarla
+    assert run_worker(session, [source], worker="w1") == 1
+    assert sorted(session.scalars(select(HarvestJob.status)).all()) == ["done", "done"]
+    assert len(session.scalars(select(Article.id)).all()) == 2
+
+
+def test_failed_first_page_does_not_enqueue_the_rest(Session, idle, monkeypatch):
+    session = Session()
+    jobs.seed(session, ["fake"], "2020", "2021")
+
+    def unreachable(dois, refresh=False):
+        raise ConnectionError("crossref timeout")
+
+    monkeypatch.setattr("src.tools.search.fetch_crossref_many", unreachable)
+    job = jobs.claim(session, "w1", ["fake"])
+    with pytest.raises(ConnectionError):
+        process(session, job, FakeSource(session))
+    jobs.fail(session, job)
+    # Las páginas siguientes se agregan junto al lote de la primera, no antes
+    assert session.scalars(select(HarvestJob.page)).all() == [0]
+
+
+@pytest.fixture
+def pg_session(pg_engine):
+    HarvestJob.__table__.drop(pg_engine, checkfirst=True)
+    HarvestJob.__table__.create(pg_engine)
+    yield sessionmaker(bind=pg_engine)
+    HarvestJob.__table__.drop(pg_engine)
+
+
+def test_claim_skips_locked_jobs(pg_session):
+    session = pg_session()
+    jobs.enqueue(session, "fake", 2020, range(2))
+    session.commit()
+    locker = pg_session()
+    first = locker.scalars(
+        select(HarvestJob).order_by(HarvestJob.id).limit(1).with_for_update()
+    ).one()
+    job = jobs.claim(pg_session(), "w1", ["fake"])
+    assert job.id != first.id
+    locker.rollback()
+
+
+def test_concurrent_claims_are_disjoint(pg_session):
+    session = pg_session()
+    jobs.enqueue(session, "fake", 2020, range(200))
+    session.commit()
+    claimed, barrier = [], threading.Barrier(8)
+
+    def worker(name):
+        session = pg_session()
+        barrier.wait()
+        while (job := jobs.claim(session, name, ["fake"])) is not None:
+            claimed.append(job.id)
+            jobs.complete(session, job)
+            session.commit()
+        session.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == 200
+    assert len(set(claimed)) == 200
@@ -0,0 +1,33 @@
+from src.database.known import KnownArticles
+from src.database.tools import insert_batch
+
+
+def test_load_merges_sorted_runs(Session, article, monkeypatch):
+    session = Session()
+    insert_batch(session, [article(index) for index in range(20)])
+    monkeypatch.setattr(KnownArticles, "SORT_RUN", 7)
+    known = KnownArticles()
+    known.load(session)
+    assert len(known) == 40
+    assert list(known.sorted) == sorted(known.sorted)
+    assert all(known.contains(article(index)) for index in range(20))
+    assert not known.contains(article(20))
+
+
+def test_claim_release_and_add(article):
+    known, record = KnownArticles(), article(1)
+    assert known.claim(record)
+    assert not known.claim(record)
+    known.release([record])
+    assert known.claim(record)
+    known.add([record])
+    assert known.contains(record) and not known.pending
+    assert not known.claim(record)
+
+
+def test_articles_without_authors_are_not_known(article):
+    known, record = KnownArticles(), dict(article(1), authors=None)
+    assert known.claim(record)
+    known.add([record])
+    assert not known.contains(record)
+    assert known.claim(record)
@@ -0,0 +1,80 @@
+from sqlalchemy import MetaData, inspect, text
+from src.database.migrations import _backfill, upgrade
+from src.database.models import Base
+from src.database.normalize import normalize_doi
+
+# Tablas de la versión anterior a las llaves naturales
+LEGACY_SCHEMA = [
+    "CREATE TABLE articles (id SERIAL PRIMARY KEY, doi VARCHAR(500), title VARCHAR(500), "
+    "publication_date VARCHAR(20), publisher VARCHAR(200), reference_count INTEGER, "
+    "url VARCHAR(500), issn VARCHAR(20))",
+    'CREATE TABLE article_authors (id SERIAL PRIMARY KEY, family VARCHAR(45), '
+    'given VARCHAR(45), sequence VARCHAR(45), "ORCID" VARCHAR(200))',
+    "CREATE TABLE affiliations (id SERIAL PRIMARY KEY, name VARCHAR(200))",
+    "CREATE TABLE article_funders (id SERIAL PRIMARY KEY, name VARCHAR(200), "
+    "doi VARCHAR(200), url VARCHAR(200), award VARCHAR(200))",
+    "CREATE TABLE article_authors_relationship (author_id INTEGER, article_id INTEGER)",
+    "CREATE TABLE author_affiliation_relationship (author_id INTEGER, affiliation_id INTEGER)",
+    "CREATE TABLE article_funder_relationship (article_id INTEGER, funder_id INTEGER)",
+]
+LEGACY_ROWS = [
+    "INSERT INTO articles (doi, title, publication_date, publisher) VALUES "
+    "('10.1/A', 'Title', '2021', 'P'), ('https://doi.org/10.1/a', 'Title', '2021', 'P'), "
+    "(NULL, 'Other', '2020 Jan', NULL)",
+    "INSERT INTO article_authors (family, given) VALUES ('Doe', 'J'), ('Doe', 'J')",
+    "INSERT INTO affiliations (name) VALUES ('Univ, Chile')",
+    "INSERT INTO article_authors_relationship VALUES (1, 1), (1, 1), (2, 3), (NULL, 2)",
+]
+
+
+def test_backfill_keeps_the_oldest_duplicate(engine):
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE legacy (id INTEGER PRIMARY KEY, doi TEXT, doi_key TEXT)")
+        )
+        connection.execute(
+            text(
+                "INSERT INTO legacy (doi, doi_key) VALUES "
+                "('10.1/B', '10.1/b'), ('10.1/A', NULL), ('doi:10.1/a', NULL), "
+                "('https://doi.org/10.1/b', NULL), (NULL, NULL)"
+            )
+        )
+        _backfill(
+            connection, "legacy", ["doi"], lambda row: {"doi_key": normalize_doi(row["doi"])}
+        )
+        keys = connection.execute(text("SELECT doi_key FROM legacy ORDER BY id")).scalars()
+        assert keys.all() == ["10.1/b", "10.1/a", None, None, None]
+
+
+def test_upgrade_adds_natural_keys_to_a_legacy_schema(pg_engine):
+    Base.metadata.drop_all(pg_engine)
+    with pg_engine.begin() as connection:
+        for statement in LEGACY_SCHEMA + LEGACY_ROWS:
+            connection.execute(text(statement))
+    Base.metadata.create_all(pg_engine)
+    upgrade(pg_engine)
+    # Las revisiones son idempotentes
+    upgrade(pg_engine)
+    with pg_engine.connect() as connection:
+        articles = connection.execute(
+            text("SELECT doi_key, title_hash IS NOT NULL FROM articles ORDER BY id")
+        ).all()
+        assert articles == [("10.1/a", True), (None, False), (None, True)]
+        authors = connection.execute(
+            text("SELECT identity_key IS NOT NULL FROM article_authors ORDER BY id")
+        ).scalars()
+        assert authors.all() == [True, False]
+        links = connection.execute(
+            text("SELECT author_id, article_id FROM article_authors_relationship ORDER BY 1, 2")
+        ).all()
+        assert links == [(1, 1), (2, 3)]
+        years = connection.execute(
+            text("SELECT year, articles FROM article_rollups WHERE dimension = 'year' ORDER BY 1")
+        ).all()
+        assert years == [(2020, 1), (2021, 2)]
+    inspector = inspect(pg_engine)
+    assert inspector.get_pk_constraint("article_authors_relationship")["constrained_columns"]
+    assert "ix_articles_doi_key" in {index["name"] for index in inspector.get_indexes("articles")}
+    metadata = MetaData()
+    metadata.reflect(pg_engine)
+    metadata.drop_all(pg_engine)
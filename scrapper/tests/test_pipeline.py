@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+import src.tools.search as search
+from src.database.checkpoints import load_checkpoints
+from src.database.models import Article, Base
+from src.tools.pipeline import AsyncPipeline
+from src.tools.search import PubMed, ScopusSearch, SearchError
+
+# Puerto reservado sin servidor, las peticiones fallan con ConnectionError
+UNREACHABLE = "http://127.0.0.1:9"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Base SQLite en un archivo, cada motor escribe desde su hilo con su propia conexión"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pipeline.sqlite'}")
+
+    @event.listens_for(engine, "connect")
+    def unsynced(connection, record):
+        connection.execute("PRAGMA synchronous=OFF")
+
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def stored(Session) -> int:
+    with Session() as session:
+        return session.scalar(select(func.count()).select_from(Article))
+
+
+def completed(Session, source: str) -> bool:
+    with Session() as session:
+        checkpoint = load_checkpoints(session, source).get("2021")
+        return bool(checkpoint and checkpoint["completed"])
+
+
+def test_pipeline_ingests_every_source(apis, Session):
+    pipeline = AsyncPipeline([PubMed(session=Session()), ScopusSearch(session=Session())])
+    totals = asyncio.run(pipeline.run("2021", "2022"))
+    assert totals["pubmed"] > 0 and totals["scopus"] > 0
+    assert sum(totals.values()) == stored(Session)
+    assert completed(Session, "pubmed") and completed(Session, "scopus")
+
+
+def test_unreachable_api_leaves_the_year_pending(apis, Session, monkeypatch):
+    monkeypatch.setattr(search, "SCOPUS_URL", UNREACHABLE)
+    pipeline = AsyncPipeline([PubMed(session=Session()), ScopusSearch(session=Session())])
+    totals = asyncio.run(pipeline.run("2021", "2022"))
+    assert totals["pubmed"] > 0 and totals["scopus"] == 0
+    assert completed(Session, "pubmed")
+    assert not completed(Session, "scopus")
+
+
+def test_failing_source_does_not_stop_the_others(apis, Session):
+    # Base de datos sin tablas, el motor falla al leer sus checkpoints
+    broken = sessionmaker(
+        bind=create_engine("sqlite://", connect_args={"check_same_thread": False})
+    )
+    pipeline = AsyncPipeline([PubMed(session=Session()), ScopusSearch(session=broken())])
+    totals = asyncio.run(pipeline.run("2021", "2022"))
+    assert totals["pubmed"] > 0 and totals["scopus"] is None
+    assert completed(Session, "pubmed")
+
+
+def test_harvest_raises_on_api_errors(apis, Session, monkeypatch):
+    monkeypatch.setattr(search, "SCOPUS_URL", f"{apis}/missing")
+    with pytest.raises(SearchError):
+        ScopusSearch(session=Session()).harvest("2021")
+    assert not completed(Session, "scopus")
+    assert stored(Session) == 0
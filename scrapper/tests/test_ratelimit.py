@@ -0,0 +1,108 @@
+from email.utils import formatdate
+import pytest
+import src.tools.client as client
+import src.tools.ratelimit as ratelimit
+from src.tools.ratelimit import RateLimiter, TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    """Reloj que solo avanza con `sleep`"""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+def test_burst_then_refill_rate(clock):
+    bucket = TokenBucket(rate=4, burst=2)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    # Sin tokens, cada petición espera 1/rate segundos
+    assert bucket.acquire() == pytest.approx(0.25)
+    clock.sleep(10)
+    # El bucket no acumula mas de `burst` tokens
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, pytest.approx(0.25)]
+
+
+def test_penalize_halves_the_rate_and_respects_retry_after(clock):
+    bucket = TokenBucket(rate=8)
+    bucket.penalize(retry_after=3)
+    assert bucket.rate == 4
+    assert bucket.acquire() == pytest.approx(3)
+    for _ in range(20):
+        bucket.penalize()
+    assert bucket.rate == 8 * ratelimit.MIN_RATE_FACTOR
+    for _ in range(40):
+        bucket.reward()
+    assert bucket.rate == 8
+
+
+def test_parse_retry_after(clock):
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0
+    assert parse_retry_after(formatdate(clock.now + 30, usegmt=True)) == pytest.approx(30)
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_rate_and_scale_per_host(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_API_CROSSREF_ORG", "40")
+    monkeypatch.setenv("RATE_LIMIT_SCALE", "0.5")
+    monkeypatch.setenv("RATE_LIMIT_SCALE_API_CROSSREF_ORG", "0.25")
+    monkeypatch.setenv("RATE_BURST_API_ELSEVIER_COM", "3")
+    limiter = RateLimiter()
+    assert limiter.bucket("api.crossref.org").rate == 10
+    assert limiter.bucket("api.elsevier.com").rate == 3
+    assert limiter.bucket("api.elsevier.com").burst == 3
+
+
+def test_eutils_default_follows_the_api_key(monkeypatch):
+    monkeypatch.delenv("RATE_LIMIT_EUTILS_NCBI_NLM_NIH_GOV", raising=False)
+    monkeypatch.delenv("RATE_LIMIT_SCALE", raising=False)
+    monkeypatch.delenv("NCBI_API_KEY", raising=False)
+    assert RateLimiter().bucket("eutils.ncbi.nlm.nih.gov").rate == 3
+    monkeypatch.setenv("NCBI_API_KEY", "key")
+    assert RateLimiter().bucket("eutils.ncbi.nlm.nih.gov").rate == 10
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict = None) -> None:
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, responses: list) -> None:
+        self.responses = responses
+
+    def request(self, method, url, **kwargs):
+        return self.responses.pop(0)
+
+
+def test_throttled_requests_are_retried(clock, monkeypatch):
+    limiter = RateLimiter()
+    monkeypatch.setattr(client, "RATE_LIMITER", limiter)
+    session = FakeSession(
+        [FakeResponse(429, {"Retry-After": "5"}), FakeResponse(503), FakeResponse(200)]
+    )
+    monkeypatch.setattr(client, "get_session", lambda host: session)
+    started = clock.now
+    assert client.get("https://api.example.org/works").status_code == 200
+    assert not session.responses
+    # Se esperó el `Retry-After` de la primera respuesta y la tasa bajó en cada una
+    assert clock.now - started >= 5
+    assert limiter.bucket("api.example.org").rate < ratelimit.DEFAULT_RATE
@@ -0,0 +1,74 @@
+import pytest
+from src.tools import registry
+from src.tools.search import AbstractSearch, PubMed, ScopusSearch
+
+
+class ExternalSource(AbstractSearch):
+    name = "external"
+
+    def pages(self, year, checkpoint=None):
+        return iter(())
+
+    def fetch_page(self, year, page):
+        return [], 0
+
+    def parse(self, publication):
+        return None
+
+
+class FakeEntryPoint:
+    def __init__(self, name: str, target) -> None:
+        self.name = name
+        self.target = target
+
+    def load(self):
+        if isinstance(self.target, Exception):
+            raise self.target
+        return self.target
+
+
+@pytest.fixture
+def entry_points(monkeypatch):
+    """Registro vacio de entry points, se recargan en cada test"""
+    points = []
+    monkeypatch.setattr(registry, "_REGISTRY", dict(registry._REGISTRY))
+    monkeypatch.setattr(registry, "_LOADED", False)
+    monkeypatch.setattr(
+        registry,
+        "entry_points",
+        lambda group: points if group == registry.ENTRY_POINT_GROUP else [],
+    )
+    return points
+
+
+def test_builtin_sources_are_registered(entry_points):
+    sources = registry.available_sources()
+    assert sources["pubmed"] is PubMed
+    assert sources["scopus"] is ScopusSearch
+
+
+def test_register_rejects_a_duplicate_name(entry_points):
+    class Impostor(ExternalSource):
+        name = "pubmed"
+
+    assert registry.register(PubMed) is PubMed
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(Impostor)
+
+
+def test_entry_points_are_discovered(entry_points):
+    entry_points.append(FakeEntryPoint("external", ExternalSource))
+    entry_points.append(FakeEntryPoint("broken", ImportError("No module named 'missing'")))
+    assert registry.available_sources()["external"] is ExternalSource
+    assert registry.enabled_sources("external, pubmed") == [ExternalSource, PubMed]
+
+
+def test_sources_default_to_the_environment(entry_points, monkeypatch):
+    monkeypatch.setenv("SOURCES", "scopus")
+    assert registry.enabled_sources() == [ScopusSearch]
+
+
+def test_unknown_source_is_rejected(entry_points, monkeypatch):
+    monkeypatch.setenv("SOURCES", "pubmed,openalex")
+    with pytest.raises(ValueError, match="Unknown source openalex, available sources: pubmed"):
+        registry.enabled_sources()
@@ -0,0 +1,39 @@
+from sqlalchemy import select
+from src.database.models import ArticleRollup
+from src.database.rollups import articles_per_year, rebuild_rollups, top
+from src.database.tools import insert_batch
+
+
+def rollups(session) -> set:
+    """Filas de los resumenes con artículos, las que quedan en 0 no cambian las consultas"""
+    return set(
+        session.execute(
+            select(
+                ArticleRollup.dimension,
+                ArticleRollup.year,
+                ArticleRollup.key,
+                ArticleRollup.label,
+                ArticleRollup.articles,
+            ).where(ArticleRollup.articles != 0)
+        ).all()
+    )
+
+
+def test_incremental_rollups_match_a_rebuild(Session, article):
+    session = Session()
+    funders = [{"name": "ANID", "doi": "10.13039/1", "award": None}]
+    batch = [
+        article(1, funders=funders),
+        article(2, publisher="Elsevier", publication_date="2020 Jan"),
+        article(3, publisher=None),
+    ]
+    batch[0]["authors"][0]["affiliation"] = ["Univ, Chile"]
+    insert_batch(session, batch)
+    # Cambio de editorial al cosechar cambios y editorial que completa un campo vacio
+    insert_batch(session, [article(1, publisher="Springer")], refresh=True)
+    insert_batch(session, [article(3, authors=(), publisher="Elsevier")])
+    assert top(session, "publisher") == [("Elsevier", "Elsevier", 2), ("Springer", "Springer", 1)]
+    assert articles_per_year(session) == {2020: 1, 2021: 2}
+    incremental = rollups(session)
+    assert rebuild_rollups(session) == 3
+    assert rollups(session) == incremental
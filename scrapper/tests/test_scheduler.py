@@ -0,0 +1,32 @@
+import pytest
+from src.database.connection import pool_size
+from src.tools.ratelimit import RateLimiter
+from src.tools.scheduler import host_processes
+from src.tools.search import PubMed, ScopusSearch
+
+
+def test_each_host_is_shared_by_the_processes_that_call_it():
+    assert host_processes([PubMed, ScopusSearch], workers=4) == {
+        "eutils.ncbi.nlm.nih.gov": 4,
+        "api.elsevier.com": 4,
+        "api.crossref.org": 8,
+    }
+
+
+def test_host_scale_overrides_the_process_scale(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_SCALE", "0.25")
+    monkeypatch.setenv("RATE_LIMIT_SCALE_API_CROSSREF_ORG", "0.125")
+    monkeypatch.setenv("RATE_LIMIT_API_CROSSREF_ORG", "20")
+    monkeypatch.setenv("RATE_LIMIT_API_ELSEVIER_COM", "6")
+    limiter = RateLimiter()
+    assert limiter.bucket("api.crossref.org").rate == pytest.approx(2.5)
+    assert limiter.bucket("api.elsevier.com").rate == pytest.approx(1.5)
+
+
+def test_db_pool_covers_the_year_workers_of_every_source(monkeypatch):
+    monkeypatch.delenv("DB_POOL_SIZE", raising=False)
+    monkeypatch.setenv("YEAR_WORKERS", "4")
+    monkeypatch.setenv("SOURCES", "pubmed,scopus")
+    assert pool_size() == 10
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    assert pool_size() == 3
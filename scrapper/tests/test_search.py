@@ -0,0 +1,97 @@
+from datetime import date
+import pytest
+from sqlalchemy import select
+from src.database.known import KnownArticles
+from src.database.models import Article
+from src.database.tools import insert_batch
+from src.database.watermarks import load_watermark, save_watermark
+from src.tools.search import AbstractSearch, SearchError
+
+
+class FakeSource(AbstractSearch):
+    """Motor que entrega las publicaciones que recibe, ya parseadas. `delta` entrega las
+    páginas de `changes` y falla en la página `fail_page`"""
+
+    name = "fake"
+
+    def __init__(self, session=None, changes=(), fail_page=None) -> None:
+        self.session = session
+        self.changes = changes
+        self.fail_page = fail_page
+
+    def delta(self, since, until):
+        for page, publications in enumerate(self.changes):
+            if page == self.fail_page:
+                raise SearchError("[Fake] Request failed with status code: 502")
+            yield publications, {"offset": page + 1}
+
+    def pages(self, year, checkpoint=None):
+        raise NotImplementedError
+
+    def fetch_page(self, year, page):
+        raise NotImplementedError
+
+    def parse(self, publication):
+        return {"title": publication["doi"], "publication_date": "2021", **publication}
+
+
+def message(authors=True) -> dict:
+    authors = {"author": [{"family": "Doe"}]} if authors else {}
+    return {"publisher": "P", "reference-count": 1, **authors}
+
+
+def test_discarded_claims_are_released(monkeypatch):
+    monkeypatch.setattr(
+        "src.tools.search.fetch_crossref_many",
+        lambda dois, refresh=False: {"10.1/a": message(), "10.1/b": message(authors=False)},
+    )
+    known, source = KnownArticles(), FakeSource()
+    batch = source.parse_page([{"doi": "10.1/a"}, {"doi": "10.1/b"}], known)
+    assert batch[0]["authors"] and batch[1] is None
+    # Solo queda reservado el artículo que se va a insertar
+    known.add(batch)
+    assert not known.pending
+    assert known.claim(source.parse({"doi": "10.1/b"}))
+
+
+@pytest.fixture
+def crossref(monkeypatch):
+    """Crossref falso, `publishers` indica la editorial de cada DOI y `calls` registra las
+    consultas con su valor de `refresh`"""
+    publishers, calls = {}, []
+
+    def fetch(dois, refresh=False):
+        calls.append((sorted(dois), refresh))
+        return {doi: dict(message(), publisher=publishers.get(doi, "P")) for doi in dois}
+
+    monkeypatch.setattr("src.tools.search.fetch_crossref_many", fetch)
+    return publishers, calls
+
+
+def test_delta_refreshes_known_articles_and_advances_the_watermark(Session, article, crossref):
+    publishers, calls = crossref
+    session = Session()
+    insert_batch(session, [article(1, title="10.1/1")])
+    publishers["10.1/1"] = "Elsevier"
+    source = FakeSource(session, changes=[[{"doi": "10.1/1"}, {"doi": "10.1/2"}]])
+    assert source.harvest_delta(date(2024, 1, 1), date(2024, 1, 7)) == 1
+    # El artículo conocido tambien se consulta, sin usar el cache
+    assert calls == [(["10.1/1", "10.1/2"], True)]
+    rows = session.execute(select(Article.doi, Article.publisher).order_by(Article.id)).all()
+    assert rows == [("10.1/1", "Elsevier"), ("10.1/2", "P")]
+    assert load_watermark(session, "fake") == date(2024, 1, 7)
+
+
+def test_failed_delta_does_not_advance_the_watermark(Session, crossref):
+    session = Session()
+    save_watermark(session, "fake", date(2024, 1, 1))
+    session.commit()
+    source = FakeSource(session, changes=[[{"doi": "10.1/1"}], [{"doi": "10.1/2"}]], fail_page=1)
+    with pytest.raises(SearchError):
+        source.harvest_delta(date(2024, 1, 1), date(2024, 1, 7))
+    assert load_watermark(session, "fake") == date(2024, 1, 1)
+    # Las páginas confirmadas se conservan y se vuelven a procesar en el siguiente intento
+    assert session.scalars(select(Article.doi)).all() == ["10.1/1"]
+    source.fail_page = None
+    assert source.harvest_delta(date(2024, 1, 1), date(2024, 1, 7)) == 1
+    assert load_watermark(session, "fake") == date(2024, 1, 7)
@@ -0,0 +1,76 @@
+import benchmark
+import src.tools.search as search
+from src.tools.search import PubMed, ScopusSearch
+
+
+def calls(stub, api: str) -> int:
+    return benchmark.stub_stats(stub)["calls"].get(api, 0)
+
+
+def scopus(Session, page_size: int = 25) -> ScopusSearch:
+    source = ScopusSearch(session=Session())
+    source.page_size = page_size
+    return source
+
+
+def test_scopus_pages_follow_the_cursor_until_the_total(apis, Session, corpus):
+    before = calls(apis, "scopus")
+    pages = list(scopus(Session).pages("2021"))
+    assert [len(entries) for entries, _ in pages] == [25, 25, 10]
+    assert [progress["cursor"] for _, progress in pages] == ["25", "50", None]
+    assert pages[-1][1]["offset"] == pages[-1][1]["total"] == corpus.articles
+    assert calls(apis, "scopus") - before == 3
+
+
+def test_scopus_resumes_from_the_checkpoint(apis, Session, corpus):
+    checkpoint = {"cursor": "50", "offset": 50, "total": corpus.articles}
+    [(entries, progress)] = list(scopus(Session).pages("2021", checkpoint))
+    assert entries[0]["dc:identifier"] == "SCOPUS_ID: s50"
+    assert progress["offset"] == corpus.articles
+    # Un checkpoint que ya llegó al total no pide mas páginas
+    before = calls(apis, "scopus")
+    assert list(scopus(Session).pages("2021", progress)) == []
+    assert calls(apis, "scopus") == before
+
+
+def test_scopus_start_paging_is_capped(apis, Session, monkeypatch):
+    monkeypatch.setattr(search, "SCOPUS_MAX_START", 30)
+    entries, total = scopus(Session, page_size=20).fetch_page("2021", 1)
+    assert entries[0]["dc:identifier"] == "SCOPUS_ID: s20"
+    assert total == 30
+
+
+def pubmed(Session, monkeypatch, batch_size: int = 25) -> PubMed:
+    monkeypatch.setattr(search, "PUBMED_BATCH_SIZE", batch_size)
+    return PubMed(session=Session())
+
+
+def test_pubmed_pages_use_the_history_server(apis, Session, corpus, monkeypatch):
+    before = calls(apis, "eutils")
+    pages = list(pubmed(Session, monkeypatch).pages("2021"))
+    assert [len(articles) for articles, _ in pages] == [25, 25, 10]
+    assert [progress["offset"] for _, progress in pages] == [25, 50, 75]
+    assert pages[-1][1]["last_id"] == str(corpus.articles - 1)
+    assert {(progress["webenv"], progress["query_key"]) for _, progress in pages} == {
+        ("BENCH", "1")
+    }
+    # Una busqueda en esearch y un esummary por página
+    assert calls(apis, "eutils") - before == 4
+
+
+def test_pubmed_resumes_with_the_checkpoint_webenv(apis, Session, corpus, monkeypatch):
+    checkpoint = {"offset": 50, "total": corpus.articles, "webenv": "BENCH", "query_key": "1"}
+    before = calls(apis, "eutils")
+    [(articles, progress)] = list(pubmed(Session, monkeypatch).pages("2021", checkpoint))
+    assert articles[0]["uids"] == ["50"]
+    assert progress["offset"] == 75
+    # Sin volver a buscar en esearch
+    assert calls(apis, "eutils") - before == 1
+
+
+def test_pubmed_searches_again_when_the_webenv_expired(apis, Session, corpus, monkeypatch):
+    # El historial ya no tiene resultados desde `offset`, se repite la busqueda una vez
+    checkpoint = {"offset": corpus.articles, "total": 100, "webenv": "OLD", "query_key": "1"}
+    before = calls(apis, "eutils")
+    assert list(pubmed(Session, monkeypatch).pages("2021", checkpoint)) == []
+    assert calls(apis, "eutils") - before == 2